@@ -0,0 +1,75 @@
+"""
+before_model_callback del Coordinator que enruta por embeddings sin llamar al LLM.
+
+El catálogo de sub-agentes (`AgentData.to_dict`) se embebe una sola vez y cada
+mensaje se compara contra él (`routing.agent_router`). Si el mejor agente gana
+con claridad, se devuelve una respuesta sintética que avisa la derivación y
+llama a `transfer_to_agent`: la consulta llega al sub-agente (p. ej. el triage
+de un RAG) con un salto de modelo menos. Si es ambigua (consultas mixtas
+IAX + Workana, clima, preguntas sobre la plataforma...) decide el LLM del
+Coordinator con sus reglas y herramientas de siempre.
+
+Solo actúa con `RAG_AGENT_ROUTER=true`; umbrales en `RAG_AGENT_ROUTER_MIN_SCORE`
+y `RAG_AGENT_ROUTER_MIN_MARGIN`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Callable, Optional, Sequence
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+
+from agents.agrag.retrieval_stage_agent import content_text
+from agents.agrag.triage_fast_path_callbacks import answers_user_message, transfer_response
+from routing.agent_router import EmbeddingAgentRouter
+
+logger = logging.getLogger(__name__)
+
+AGENT_ROUTER_ENABLED = os.getenv("RAG_AGENT_ROUTER", "false").lower() in ("1", "true", "yes")
+
+
+def agent_router_callback(
+    catalog: Sequence[dict[str, Any]],
+    enabled: bool = AGENT_ROUTER_ENABLED,
+    router: Optional[EmbeddingAgentRouter] = None,
+) -> Callable:
+    """before_model_callback para el Coordinator.
+
+    Params:
+        catalog: Entradas `AgentData.to_dict` de los sub-agentes enrutables.
+    """
+    router = router or EmbeddingAgentRouter(catalog)
+    descriptions = {entry["name"]: entry.get("description", "") for entry in catalog}
+
+    async def route_to_sub_agent(
+        callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        if not enabled or not answers_user_message(llm_request):
+            return None
+        message = content_text(callback_context.user_content)
+        if not message:
+            return None
+        try:
+            decision = await router.route(message)
+        except Exception as exc:  # Sin embeddings, enruta el LLM como siempre
+            logger.warning("Agent router failed: %s", exc)
+            return None
+        logger.info(
+            "Agent router: %s (score %.3f, margin %.3f, %s)",
+            decision.agent,
+            decision.score,
+            decision.margin,
+            "transfer" if decision.confident else "LLM fallback",
+        )
+        if not decision.confident:
+            return None
+        return transfer_response(
+            decision.agent,
+            f"Te derivo a **{decision.agent}**: {descriptions[decision.agent]}",
+            {"agent_router": {"score": decision.score, "margin": decision.margin}},
+        )
+
+    return route_to_sub_agent
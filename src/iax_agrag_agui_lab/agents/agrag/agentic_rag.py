@@ -6,7 +6,11 @@ Pipeline: Triage + Retrieval + Synthesis
 from google.adk.agents import LlmAgent, SequentialAgent
 from google.adk.tools import FunctionTool
 
+from agents.agrag.blob_ref_callbacks import resolve_blob_refs
+from agents.agrag.prefetch_callbacks import prefetch_callbacks, prefetched_chunks_callback
 from agents.agrag.query_iax_docs_tool import query_iax_documentation_rag
+from agents.agrag.triage_fast_path_callbacks import triage_fast_path_callbacks
+from retrieval.registry import IAX_DOCS
 
 # ==================== HERRAMIENTAS ====================
 vector_search_tool = FunctionTool(
@@ -17,6 +21,16 @@ vector_search_tool = FunctionTool(
 from google.adk.models.lite_llm import LiteLlm
 llm = LiteLlm(model="openai/gpt-4.1-mini", stream_options={"include_usage": True})
 
+# Prefetch: la pregunta original se busca mientras el triage clasifica
+# (RAG_PREFETCH_ENABLED); el RetrievalAgent recibe esos chunks en el estado.
+start_prefetch, cancel_prefetch = prefetch_callbacks(index=IAX_DOCS.name)
+
+# Fast path: el clasificador local decide las consultas ESPECÍFICAS obvias y
+# transfiere sin llamar al LLM de triage (RAG_TRIAGE_FAST_PATH).
+triage_fast_path, log_triage_decision = triage_fast_path_callbacks(
+    domain=IAX_DOCS.name, target_agent="RetrievalAgent"
+)
+
 # 1) TRIAGE AGENT - Clasifica consultas
 triage_agent = LlmAgent(
     name="TriageAgent",
@@ -35,7 +49,11 @@ triage_agent = LlmAgent(
     Responde en el mismo idioma del usuario.
     """,
     output_key="triage_result",
-    sub_agents=[]  # Se configurará después
+    sub_agents=[],  # Se configurará después
+    before_agent_callback=start_prefetch,
+    after_agent_callback=cancel_prefetch,
+    before_model_callback=triage_fast_path,
+    after_model_callback=log_triage_decision,
 )
 
 
@@ -47,21 +65,25 @@ retrieval_agent = LlmAgent(
     instruction="""
     Eres un experto en recuperación de información.
 
+    Resultados ya recuperados para la pregunta original (puede estar vacío): {prefetched_chunks?}
+
     Tareas:
-    1) Identifica keywords de la consulta del usuario.
-    2) USA la herramienta `vector_search` con dichas keywords.
+    1) Si los resultados ya recuperados responden la consulta, transfiere directamente a 'SynthesizerAgent' (sin buscar de nuevo).
+    2) Si no, identifica keywords de la consulta y USA la herramienta `vector_search` con dichas keywords.
     3) Evalúa la relevancia de los resultados.
     4) Si hay buenos resultados, transfiere a 'SynthesizerAgent' con transfer_to_agent.
     5) Si no encuentras nada útil, informa con cortesía.
 
     Reglas:
-    - Siempre usa `vector_search` antes de decidir.
+    - Si no hay resultados ya recuperados útiles, usa `vector_search` antes de decidir.
     - No inventes información.
     - Resume claramente qué encontraste (máx. 3 líneas) antes de transferir.
     """,
     output_key="retrieved_chunks",
     tools=[vector_search_tool],
-    sub_agents=[]  # Se configurará después
+    sub_agents=[],  # Se configurará después
+    before_agent_callback=prefetched_chunks_callback(IAX_DOCS.name, "prefetched_chunks"),
+    before_model_callback=resolve_blob_refs,  # Chunks guardados fuera del estado (AGUI_BLOB_STATE)
 )
 from google.adk.models.lite_llm import LiteLlm
 llm = LiteLlm(model="openai/gpt-4.1-mini", stream_options={"include_usage": True})
@@ -76,6 +98,7 @@ synthesizer_agent = LlmAgent(
     Eres un redactor técnico experto.
 
     Los chunks recuperados están en: {retrieved_chunks?}
+    Resultados recuperados para la pregunta original: {prefetched_chunks?}
 
     Tareas:
     1) Lee cuidadosamente los chunks recuperados.
@@ -87,7 +110,8 @@ synthesizer_agent = LlmAgent(
     - Párrafo(s) de respuesta (1–3 párrafos).
     - Sección final "Fuentes:" con lista de referencias. Incluye título/ID y URL si está disponible en metadata.
     """,
-    output_key="final_response"
+    output_key="final_response",
+    before_model_callback=resolve_blob_refs,
 )
 
 
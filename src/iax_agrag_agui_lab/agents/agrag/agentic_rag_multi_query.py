@@ -4,21 +4,40 @@ Pipeline: Triage + Query Generation + Multi-Retrieval + Synthesis
 """
 
 from google.adk.agents import LlmAgent, SequentialAgent
-from google.adk.tools import FunctionTool
 
-from agents.agrag.query_iax_docs_tool import query_iax_documentation_rag
+from agents.agrag.blob_ref_callbacks import resolve_blob_refs
+from agents.agrag.prefetch_callbacks import prefetch_callbacks
+from agents.agrag.retrieval_stage_agent import PipelinedRetrievalStageAgent
+from agents.agrag.semantic_cache_callbacks import semantic_cache_callbacks
+from agents.agrag.triage_fast_path_callbacks import triage_fast_path_callbacks
 from google.adk.models.lite_llm import LiteLlm
-
-# ==================== HERRAMIENTAS ====================
-vector_search_tool = FunctionTool(
-    func=query_iax_documentation_rag,
-)
+from retrieval.registry import IAX_DOCS
 
 # ==================== AGENTES ====================
 
 # 1) TRIAGE AGENT - Clasifica consultas (OpenAI)
 llm = LiteLlm(model="openai/gpt-4.1-mini", stream_options={"include_usage": True})
 
+# Caché semántico: preguntas parafraseadas reciben la respuesta ya sintetizada
+check_answer_cache, store_answer_in_cache = semantic_cache_callbacks(
+    namespace=IAX_DOCS.name,
+    index=IAX_DOCS.name,
+    final_key="MultiRetrievalAgent.final_response",
+    chunks_key="MultiRetrievalAgent.retrieved_chunks",
+)
+
+# Prefetch: la pregunta original se busca mientras el triage clasifica
+# (RAG_PREFETCH_ENABLED); la etapa de retrieval reutiliza esos resultados.
+start_prefetch, cancel_prefetch = prefetch_callbacks(index=IAX_DOCS.name)
+
+# Fast path: el clasificador local decide las consultas ESPECÍFICAS obvias y
+# transfiere sin llamar al LLM de triage (RAG_TRIAGE_FAST_PATH).
+triage_fast_path, log_triage_decision = triage_fast_path_callbacks(
+    domain=IAX_DOCS.name,
+    target_agent="ResearchPipeline",
+    message="Déjame buscar esa información en la documentación...",
+)
+
 triage_agent = LlmAgent(
     name="TriageAgent",
     model=llm,
@@ -36,6 +55,10 @@ triage_agent = LlmAgent(
     """,
     output_key="TriageAgent.response",
     sub_agents=[],
+    before_agent_callback=[check_answer_cache, start_prefetch],
+    after_agent_callback=[store_answer_in_cache, cancel_prefetch],
+    before_model_callback=triage_fast_path,
+    after_model_callback=log_triage_decision,
 )
 
 
@@ -62,38 +85,19 @@ query_generator_agent = LlmAgent(
 )
 
 
-# 3) MULTI-RETRIEVAL AGENT - Ejecuta búsquedas con las 3 consultas
-multi_retrieval_agent = LlmAgent(
+# 3) MULTI-RETRIEVAL STAGE - Ejecuta las 3 consultas en código (sin LLM)
+# Corre el QueryGenerator y lanza cada consulta en cuanto termina de llegar en
+# el stream (no espera al arreglo completo); después fusiona los resultados
+# (RRF + dedup) y escribe {"retrieved_chunks": [...], "by_query": {...}}.
+multi_retrieval_agent = PipelinedRetrievalStageAgent(
     name="MultiRetrievalAgent",
-    model=llm,
     description="Ejecuta búsquedas vectoriales con las consultas generadas",
-    instruction="""
-    Las consultas generadas están en: {QueryGeneratorAgent.generated_queries}
-
-    Tareas:
-    1) Usa la herramienta `vector_search` con CADA una de las 3 consultas.
-    2) Reúne todos los resultados obtenidos.
-
-    Formato de salida (JSON estricto):
-    {
-      "retrieved_chunks": [
-         {"content": "...", "source": "...", "score": 0.0},
-         ...
-      ],
-      "by_query": {
-        "<consulta_1>": [ {"content": "...", "source": "..."}, ... ],
-        "<consulta_2>": [ ... ],
-        "<consulta_3>": [ ... ]
-      }
-    }
-
-    Notas:
-    - Ejecuta las 3 búsquedas aunque algunas den pocos resultados.
-    - Extrae "source" de la metadata de los documentos cuando esté disponible.
-    """,
+    index=IAX_DOCS.name,
+    queries_state_key="QueryGeneratorAgent.generated_queries",
     output_key="MultiRetrievalAgent.retrieved_chunks",
-    tools=[vector_search_tool],
-    sub_agents=[],
+    top_k=5,
+    max_chunks=8,
+    sub_agents=[query_generator_agent],
 )
 
 
@@ -106,8 +110,8 @@ synthesizer_agent = LlmAgent(
     Los chunks recuperados de múltiples búsquedas están en: {MultiRetrievalAgent.retrieved_chunks}
 
     Tareas:
-    1) Lee TODOS los chunks recuperados.
-    2) Identifica complementariedades y elimina redundancias.
+    1) Lee TODOS los chunks recuperados (ya vienen fusionados, sin duplicados y ordenados por relevancia).
+    2) Identifica complementariedades entre ellos.
     3) Redacta respuesta clara y bien estructurada.
     4) Cita fuentes (título/ID y URL si existe) al final.
     5) Si hay contradicciones, menciónalas.
@@ -118,13 +122,14 @@ synthesizer_agent = LlmAgent(
     - Sección final "Fuentes:" con una lista de referencias
     """,
     output_key="MultiRetrievalAgent.final_response",
+    before_model_callback=resolve_blob_refs,  # Chunks guardados fuera del estado (AGUI_BLOB_STATE)
 )
 
 
 # ==================== CONFIGURACIÓN DE SUB-AGENTES ====================
 research_pipeline = SequentialAgent(
     name="ResearchPipeline",
-    sub_agents=[query_generator_agent, multi_retrieval_agent, synthesizer_agent],
+    sub_agents=[multi_retrieval_agent, synthesizer_agent],
 )
 
 triage_agent.sub_agents = [research_pipeline]
@@ -0,0 +1,30 @@
+"""
+before_model_callback que expande las referencias a blobs en las instrucciones.
+
+Con `AGUI_BLOB_STATE=true` los valores grandes del estado (los payloads de
+chunks) se guardan en `sessions.blob_store` y el estado solo lleva
+`blob:sha256:<digest>`. ADK interpola `{retrieved_chunks?}` y compañía con esa
+referencia; este callback la reemplaza por el contenido justo antes de llamar
+al modelo, así que solo los agentes que de verdad leen los chunks (y solo en
+el prompt) pagan por cargarlos.
+
+Sin referencias en la instrucción no hace nada.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+
+from sessions.blob_store import BLOB_REF_PREFIX, blob_store
+
+
+def resolve_blob_refs(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    instruction = llm_request.config.system_instruction
+    if isinstance(instruction, str) and BLOB_REF_PREFIX in instruction:
+        llm_request.config.system_instruction = blob_store.resolve_text(instruction)
+    return None
@@ -0,0 +1,39 @@
+
+from typing import List
+
+from agents.agrag.retrieval_stage_agent import chunk_to_dict
+from retrieval.context_packer import CONTEXT_TOKEN_BUDGET, pack_chunks
+from retrieval.federated import federated_search
+from retrieval.registry import retriever_registry
+
+
+async def federated_documentation_rag(question: str, top_k: int = 6) -> List[dict]:
+    """Busca a la vez en TODAS las bases documentales (IAX y Help Desk de Workana)
+    y devuelve una sola lista de resultados, ordenada por relevancia.
+
+    Úsala cuando la pregunta involucre más de un dominio (por ejemplo, IAX y
+    Workana): una sola búsqueda reemplaza delegar a dos agentes RAG.
+
+    Params:
+        question: Pregunta a buscar.
+        top_k: Número máximo de documentos a devolver en total (por defecto 6).
+
+    Returns:
+        List[dict]: Documentos relevantes ({id, content, source, title, score, index}),
+        donde `index` indica de qué base proviene cada uno ("iax", "workana", ...).
+    """
+    result = await federated_search(retriever_registry, question, top_k=top_k)
+    print("--------------------------------")
+    print(f"Búsqueda federada: {question}")
+    for hit in result.hits:
+        print(f"  [{hit.index}] {hit.score:.3f} {hit.document.metadata.get('title')}")
+    for name, error in result.errors.items():
+        print(f"  [{name}] error: {error}")
+    print("--------------------------------")
+    if not result.hits and result.errors:
+        return [{"status": "error", "error_message": "; ".join(result.errors.values())}]
+    chunks = [
+        {**chunk_to_dict(hit.document, hit.score), "index": hit.index} for hit in result.hits
+    ]
+    packed, _ = pack_chunks(chunks, CONTEXT_TOKEN_BUDGET)
+    return packed
@@ -0,0 +1,77 @@
+"""
+Callbacks de ADK para la recuperación especulativa (prefetch) durante el triage.
+
+Se instalan en el agente de triage, después del caché semántico:
+- before_agent_callback: lanza en segundo plano el embedding y la búsqueda
+  top-k de la pregunta tal cual la escribió el usuario; el LLM de triage
+  clasifica mientras tanto.
+- after_agent_callback: al terminar el turno cancela lo que nadie consumió
+  (consulta GENERAL, error, etc.).
+
+La etapa de recuperación toma el resultado con `retrieval_prefetcher.take`
+(ver `RetrievalStageAgent` y `prefetched_chunks_callback`).
+
+Solo actúan con `RAG_PREFETCH_ENABLED=true`.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Callable, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from agents.agrag.retrieval_stage_agent import chunk_to_dict, content_text
+from retrieval.context_packer import CONTEXT_TOKEN_BUDGET, pack_chunks
+from retrieval.prefetch import PREFETCH_ENABLED, RetrievalPrefetcher, retrieval_prefetcher
+
+
+def prefetch_callbacks(
+    index: str,
+    top_k: int = 5,
+    prefetcher: RetrievalPrefetcher = retrieval_prefetcher,
+    enabled: bool = PREFETCH_ENABLED,
+) -> tuple[Callable, Callable]:
+    """(before_agent_callback, after_agent_callback) para el agente de triage.
+
+    Params:
+        index: Clave del índice en el registry.
+        top_k: Documentos a recuperar de forma especulativa.
+    """
+
+    async def start_prefetch(callback_context: CallbackContext) -> Optional[types.Content]:
+        question = content_text(callback_context.user_content)
+        if enabled and question:
+            prefetcher.start(callback_context.invocation_id, index, question, top_k)
+        return None
+
+    async def cancel_prefetch(callback_context: CallbackContext) -> Optional[types.Content]:
+        prefetcher.cancel(callback_context.invocation_id)
+        return None
+
+    return start_prefetch, cancel_prefetch
+
+
+def prefetched_chunks_callback(
+    index: str,
+    state_key: str,
+    prefetcher: RetrievalPrefetcher = retrieval_prefetcher,
+) -> Callable:
+    """before_agent_callback que deja en `state_key` los chunks precargados.
+
+    Para pipelines donde un LLM decide la búsqueda: con los chunks ya en el
+    estado puede saltarse la llamada a la herramienta.
+    """
+
+    async def load_prefetched(callback_context: CallbackContext) -> Optional[types.Content]:
+        prefetched = await prefetcher.take(callback_context.invocation_id, index)
+        chunks = []
+        if prefetched is not None:
+            chunks, _ = pack_chunks(
+                [chunk_to_dict(doc, score) for doc, score in prefetched[1]], CONTEXT_TOKEN_BUDGET
+            )
+        callback_context.state[state_key] = json.dumps(chunks, ensure_ascii=False)
+        return None
+
+    return load_prefetched
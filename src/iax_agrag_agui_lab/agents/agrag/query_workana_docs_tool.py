@@ -1,36 +1,44 @@
 
-from langchain_pinecone import Pinecone
-from langchain_openai import OpenAIEmbeddings
-from langchain_core.documents import Document
-from google.adk.agents import Agent
-from typing import List
+from typing import List, Optional
 
-async def query_workana_documentation_rag(question: str, top_k: int = 2) -> List[dict]:
+from retrieval.async_retriever import RetrievalTimeoutError
+from retrieval.context_packer import CONTEXT_TOKEN_BUDGET, pack_documents
+from retrieval.metadata_index import build_metadata_filter
+from retrieval.registry import WORKANA_DOCS, retriever_registry
+
+async def query_workana_documentation_rag(
+    question: str,
+    top_k: int = 2,
+    source: Optional[str] = None,
+) -> List[dict]:
     """Busca en el Help Desk de Workana para encontrar información relevante.
 
     Params:
         question: Pregunta a buscar.
         top_k: Número máximo de documentos a recuperar (por defecto 5).
+        source: Solo documentos de esta fuente (URL o archivo), opcional.
 
     Returns:
-        List[dict]: Lista de documentos relevantes como dicts (con metadata de fuente cuando esté disponible).
+        List[dict]: Documentos relevantes ({content, source, title, score}), recortados al presupuesto de tokens.
     """
-    pinecone_vector_store = Pinecone.from_existing_index(
-        index_name="iax-workana-discord-doc-files",
-        embedding=OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            dimensions=1536,
-        ),
-    )
-    retrived_documents = pinecone_vector_store.similarity_search(
-        question,
-        k=top_k,
-        # namespace="iax-workana-discord-doc-files-namespace",
-    )
+    # Filters are applied by the index before scoring, not on the results.
+    # Only fields ingestion writes are offered: a filter on a field no chunk
+    # has matches nothing, in Pinecone and in the local indexes alike.
+    filter = build_metadata_filter(source=source)
+    # Async embedding + thread-pool vector lookup: never blocks the event loop
+    try:
+        retrived_documents = await retriever_registry.retriever(
+            WORKANA_DOCS.name
+        ).search_with_scores(question, top_k=top_k, filter=filter)
+    except (RetrievalTimeoutError, ValueError) as e:
+        return [{"status": "error", "error_message": str(e)}]
     print("--------------------------------")
-    print(f"Buscando: {question}")
+    print(f"Buscando: {question}" + (f" (filtro: {filter})" if filter else ""))
     print(f"Documentos encontrados: {len(retrived_documents)}")
+
+    # Only content/source/title/score, trimmed to the prompt's token budget
+    packed, report = pack_documents(retrived_documents, CONTEXT_TOKEN_BUDGET)
+    print(f"Tokens de contexto: {report.tokens_before} -> {report.tokens_after}")
     print("--------------------------------")
+    return packed
 
-    # Convert Documents to dicts to make them JSON serializable
-    return [doc.model_dump() for doc in retrived_documents]
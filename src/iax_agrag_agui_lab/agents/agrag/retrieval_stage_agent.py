@@ -0,0 +1,441 @@
+"""
+Etapa de retrieval determinística (sin LLM) para los pipelines de investigación.
+
+Reemplaza al LlmAgent intermedio de `ResearchPipeline` / `WorkanaResearchPipeline`,
+que solo llamaba al tool de búsqueda y reformateaba los hits como JSON para el
+sintetizador. Aquí lo mismo se hace en código: se leen las consultas generadas
+desde el estado, se buscan todas en paralelo (embedding en lote) y se escribe el
+payload `{"retrieved_chunks": [...], "by_query": {...}}` bajo el mismo output_key.
+Ahorra una llamada al modelo por pregunta.
+
+Los resultados de las distintas consultas se fusionan con RRF y se eliminan los
+chunks duplicados o casi duplicados antes de llegar al sintetizador, que ya no
+tiene que deduplicarlos él mismo (ver `retrieval.fusion`).
+
+Si el triage lanzó una recuperación especulativa (`agents.agrag.prefetch_callbacks`),
+sus resultados entran como una consulta más (la pregunta original) sin volver a
+buscarla.
+
+`PipelinedRetrievalStageAgent` además corre el generador de consultas como
+sub-agente y, con streaming (SSE), lanza cada búsqueda apenas la consulta
+termina de llegar, parseando el JSON incremental (`IncrementalQueryParser`):
+generación y recuperación se solapan en lugar de ir una tras otra.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import re
+from typing import Any, AsyncGenerator, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from langchain_core.documents import Document
+
+from retrieval.async_retriever import AsyncRetriever, RetrievalTimeoutError
+from retrieval.context_packer import (
+    CONTEXT_TOKEN_BUDGET,
+    PackingReport,
+    pack_chunks,
+    project_document,
+)
+from retrieval.fusion import chunk_key, fuse_hits
+from retrieval.prefetch import retrieval_prefetcher
+from retrieval.registry import retriever_registry
+from sessions.blob_store import resolve_state_value
+
+logger = logging.getLogger(__name__)
+
+_CODE_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+# Keys the query generators use for the search-ready text, in priority order.
+_QUERY_KEYS = ("optmized_question", "optimized_question", "query", "question")
+
+
+def parse_generated_queries(raw: Any) -> list[str]:
+    """Extract the list of search queries written by a query-generator agent.
+
+    Accepts the shapes our prompts ask for: a JSON array of strings, or
+    `{"queries": [{"question": ..., "optmized_question": ...}, ...]}`, optionally
+    wrapped in a Markdown code fence. When the model's JSON is not strictly
+    valid (the Workana prompt asks for unquoted keys) the text goes through
+    `IncrementalQueryParser`, so each object still yields only its best
+    `_QUERY_KEYS` value.
+    """
+    if raw is None:
+        return []
+    if isinstance(raw, str):
+        text = _CODE_FENCE.sub("", raw.strip())
+        try:
+            raw = json.loads(text)
+        except json.JSONDecodeError:
+            return IncrementalQueryParser().feed(text)
+
+    if isinstance(raw, dict):
+        raw = raw.get("queries") or raw.get("search_queries") or list(raw.values())
+    if isinstance(raw, str):
+        raw = [raw]
+
+    queries: list[str] = []
+    for item in raw or []:
+        if isinstance(item, dict):
+            item = next((item[k] for k in _QUERY_KEYS if item.get(k)), None)
+        if isinstance(item, str):
+            queries.append(item)
+    return _dedupe(queries)
+
+
+def _dedupe(queries: Any) -> list[str]:
+    seen: dict[str, None] = {}
+    for query in queries:
+        query = query.strip()
+        if query:
+            seen.setdefault(query, None)
+    return list(seen)
+
+
+class IncrementalQueryParser:
+    """Pulls search queries out of a query generator's output while it streams.
+
+    `feed` takes the next piece of text and returns the queries completed by
+    it: a string that is an element of an array as soon as its closing quote
+    arrives, or the best `_QUERY_KEYS` value of an object when the object
+    closes. Same shapes as `parse_generated_queries`, including the unquoted
+    keys of the Workana prompt (`{queries: [{question: "...", ...}]}`); text
+    outside arrays and objects (code fences, prose) is ignored.
+    """
+
+    def __init__(self) -> None:
+        self._stack: list[str] = []  # "[" or "{"
+        self._objects: list[dict[str, str]] = []  # Values seen in each open object
+        self._in_string = False
+        self._escaped = False
+        self._chars: list[str] = []
+        self._key: Optional[str] = None  # Key whose value comes next
+        self._expect_key = False
+        self._bare_key: list[str] = []
+        self._emitted: set[str] = set()
+
+    def feed(self, text: str) -> list[str]:
+        completed: list[str] = []
+        for char in text:
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._string_done("".join(self._chars), completed)
+                    continue
+                self._chars.append(char)
+            elif char == '"':
+                self._in_string, self._chars = True, []
+            elif char in "[{":
+                self._stack.append(char)
+                if char == "{":
+                    self._objects.append({})
+                self._expect_key, self._key = char == "{", None
+            elif char in "]}":
+                if not self._stack or self._stack[-1] != {"]": "[", "}": "{"}[char]:
+                    continue  # Unbalanced: not part of the JSON we are after
+                self._stack.pop()
+                if char == "}":
+                    values = self._objects.pop()
+                    best = next((values[k] for k in _QUERY_KEYS if values.get(k)), None)
+                    if best is not None:
+                        self._emit(best, completed)
+                self._key, self._expect_key = None, False
+            elif self._stack and self._stack[-1] == "{":
+                if char == ":":
+                    if self._bare_key:
+                        self._key, self._bare_key = "".join(self._bare_key), []
+                    self._expect_key = False
+                elif char == ",":
+                    self._key, self._expect_key = None, True
+                elif self._expect_key and (char.isalnum() or char == "_"):
+                    self._bare_key.append(char)
+        return completed
+
+    def _string_done(self, raw: str, completed: list[str]) -> None:
+        try:
+            value = json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            value = raw
+        if not self._stack:
+            return
+        if self._stack[-1] == "[":
+            self._emit(value, completed)
+        elif self._expect_key:
+            self._key = value
+        elif self._key is not None:
+            self._objects[-1][self._key] = value
+
+    def _emit(self, query: str, completed: list[str]) -> None:
+        query = query.strip()
+        if query and query not in self._emitted:
+            self._emitted.add(query)
+            completed.append(query)
+
+
+def chunk_to_dict(doc: Document, score: float) -> dict[str, Any]:
+    """Shape of a chunk in the synthesizer payload."""
+    return {"id": doc.id or chunk_key(doc), **project_document(doc, score)}
+
+
+def build_retrieval_payload(
+    queries: list[str],
+    hits: list[list[tuple[Document, float]]],
+    limit: Optional[int] = None,
+    vectors: Optional[dict[str, list[float]]] = None,
+    mmr_lambda: Optional[float] = None,
+    token_budget: Optional[int] = None,
+) -> tuple[dict[str, Any], Optional[PackingReport]]:
+    """`{"retrieved_chunks": [...], "by_query": {query: [chunk ids]}}` and its packing report.
+
+    Chunks are fused across queries (see `retrieval.fusion`), so each one
+    appears once, tagged with the queries that found it; `by_query` only keeps
+    the ids so the per-query view does not repeat the content. With a
+    `token_budget` the list is packed with `retrieval.context_packer`.
+    """
+    fused = fuse_hits(queries, hits, limit=limit, vectors=vectors, mmr_lambda=mmr_lambda)
+    retrieved = []
+    for hit in fused:
+        chunk = chunk_to_dict(hit.document, hit.best_score)
+        chunk["queries"] = hit.queries
+        retrieved.append(chunk)
+    report = None
+    if token_budget is not None:
+        retrieved, report = pack_chunks(retrieved, token_budget)
+    by_query = {
+        query: [chunk["id"] for chunk in retrieved if query in chunk["queries"]]
+        for query in queries
+    }
+    return {"retrieved_chunks": retrieved, "by_query": by_query}, report
+
+
+class RetrievalStageAgent(BaseAgent):
+    """Runs the generated queries against an index and stores the hits in state.
+
+    Attributes:
+        index: Registry key of the index to search (see `retrieval.registry`).
+        queries_state_key: State key holding the query generator's output.
+        output_key: State key the synthesizer reads the payload from.
+        top_k: Documents per query.
+        max_chunks: Cap on the fused chunks handed to the synthesizer.
+        mmr_lambda: When set, chunks are embedded (through the embedding
+            cache) and diversified with MMR; 1.0 is pure relevance.
+        token_budget: Tokens the packed chunks may take in the synthesizer
+            prompt (None disables packing).
+        metadata_filter: Metadata filter applied by the index before scoring
+            (see `retrieval.metadata_index.build_metadata_filter`).
+        use_prefetch: Reuse the hits triage prefetched for the user's message
+            (see `retrieval.prefetch`); ignored when `metadata_filter` is set,
+            since the prefetch ran unfiltered.
+    """
+
+    index: str
+    queries_state_key: str
+    output_key: str
+    top_k: int = 5
+    max_chunks: Optional[int] = None
+    mmr_lambda: Optional[float] = None
+    token_budget: Optional[int] = CONTEXT_TOKEN_BUDGET
+    metadata_filter: Optional[dict[str, Any]] = None
+    use_prefetch: bool = True
+
+    def _queries_for(self, ctx: InvocationContext) -> list[str]:
+        raw = resolve_state_value(ctx.session.state.get(self.queries_state_key))
+        queries = parse_generated_queries(raw)
+        if not queries:
+            # Generator produced nothing usable: search with the user's message.
+            user_text = content_text(ctx.user_content)
+            queries = [user_text] if user_text else []
+        return queries
+
+    @staticmethod
+    async def _chunk_vectors(
+        retriever: AsyncRetriever, hits: list[list[tuple[Document, float]]]
+    ) -> dict[str, list[float]]:
+        # The backends do not return the stored vectors, so the candidates are
+        # re-embedded; repeated chunks are served by the embedding cache.
+        docs = {chunk_key(doc): doc for per_query in hits for doc, _ in per_query}
+        vectors = await retriever.embed_many([doc.page_content for doc in docs.values()])
+        return dict(zip(docs, vectors))
+
+    async def _take_prefetch(
+        self, ctx: InvocationContext
+    ) -> Optional[tuple[str, list[tuple[Document, float]]]]:
+        if not self.use_prefetch:
+            return None
+        # Always taken, so an unusable prefetch is not left running.
+        prefetched = await retrieval_prefetcher.take(ctx.invocation_id, self.index)
+        return None if self.metadata_filter else prefetched
+
+    async def _build_payload(
+        self,
+        retriever: AsyncRetriever,
+        queries: list[str],
+        hits: list[list[tuple[Document, float]]],
+    ) -> tuple[dict[str, Any], Optional[PackingReport]]:
+        vectors = None
+        if self.mmr_lambda is not None:
+            vectors = await self._chunk_vectors(retriever, hits)
+        return build_retrieval_payload(
+            queries,
+            hits,
+            limit=self.max_chunks,
+            vectors=vectors,
+            mmr_lambda=self.mmr_lambda,
+            token_budget=self.token_budget,
+        )
+
+    def _failed_payload(self, error: Exception) -> dict[str, Any]:
+        """Empty payload for a failed search: the synthesizer answers without context.
+
+        Any retrieval error lands here (timeouts, a missing or stale local
+        index, Pinecone or embeddings API errors), as the RAG tools return an
+        error payload instead of aborting the turn.
+        """
+        if isinstance(error, RetrievalTimeoutError):
+            logger.warning("%s: %s", self.name, error)
+        else:
+            logger.warning("%s: retrieval failed: %s", self.name, error, exc_info=error)
+        return {"retrieved_chunks": [], "by_query": {}, "error": str(error)}
+
+    def _payload_event(
+        self,
+        ctx: InvocationContext,
+        queries: list[str],
+        hits: list[list[tuple[Document, float]]],
+        payload: dict[str, Any],
+        report: Optional[PackingReport],
+    ) -> Event:
+        logger.info(
+            "%s: %d queries -> %d hits -> %d fused chunks",
+            self.name,
+            len(queries),
+            sum(len(per_query) for per_query in hits),
+            len(payload["retrieved_chunks"]),
+        )
+        if report is not None:
+            logger.info(
+                "%s: context %d -> %d tokens (%d chunks truncated)",
+                self.name,
+                report.tokens_before,
+                report.tokens_after,
+                report.truncated,
+            )
+        return Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(
+                state_delta={self.output_key: json.dumps(payload, ensure_ascii=False)}
+            ),
+        )
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        queries = self._queries_for(ctx)
+        retriever = retriever_registry.retriever(self.index)
+        prefetched = await self._take_prefetch(ctx)
+        try:
+            if prefetched is None:
+                hits = await retriever.search_many_with_scores(
+                    queries, top_k=self.top_k, filter=self.metadata_filter
+                )
+            else:
+                # The user's question was already searched while triage ran.
+                question, prefetched_hits = prefetched
+                queries = [question] + [q for q in queries if q != question]
+                hits = [prefetched_hits[: self.top_k]] + await retriever.search_many_with_scores(
+                    queries[1:], top_k=self.top_k
+                )
+            payload, report = await self._build_payload(retriever, queries, hits)
+        except Exception as e:
+            hits, report = [], None
+            payload = self._failed_payload(e)
+        yield self._payload_event(ctx, queries, hits, payload, report)
+
+
+class PipelinedRetrievalStageAgent(RetrievalStageAgent):
+    """Runs the query generator (its only sub-agent) and searches while it streams.
+
+    Each query is dispatched to the index as soon as `IncrementalQueryParser`
+    sees it complete, so generation and retrieval overlap instead of running
+    back to back. When the generator finishes, its output (already in state
+    under `queries_state_key`) is parsed once more and any query the stream
+    did not yield is searched too, so the searched set is the same one
+    `RetrievalStageAgent` would use; without streaming (no SSE) this is the
+    only dispatch. The payload goes to the same `output_key`.
+
+    Queries are embedded one request each instead of in one batch: the price
+    of not waiting for the last one.
+    """
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        if len(self.sub_agents) != 1:
+            raise ValueError(f"{self.name} needs exactly one sub-agent, the query generator")
+        retriever = retriever_registry.retriever(self.index)
+        prefetch = asyncio.create_task(self._take_prefetch(ctx))
+        searches: dict[str, asyncio.Future] = {}
+
+        def dispatch(queries: list[str]) -> None:
+            for query in queries:
+                if query not in searches:
+                    logger.debug("%s: dispatching %r", self.name, query)
+                    searches[query] = asyncio.ensure_future(
+                        retriever.search_with_scores(
+                            query, top_k=self.top_k, filter=self.metadata_filter
+                        )
+                    )
+
+        parser = IncrementalQueryParser()
+        queries: list[str] = []
+        hits: list[list[tuple[Document, float]]] = []
+        try:
+            async for event in self.sub_agents[0].run_async(ctx):
+                if event.partial and event.content and event.content.parts:
+                    dispatch(parser.feed("".join(part.text or "" for part in event.content.parts)))
+                yield event
+            raw = resolve_state_value(ctx.session.state.get(self.queries_state_key))
+            dispatch(parse_generated_queries(raw))
+
+            # Only the retrieval half degrades to an empty payload; errors of
+            # the generator itself propagate as for any other agent.
+            try:
+                prefetched = await prefetch
+                queries = list(searches)
+                if prefetched is not None:
+                    question, prefetched_hits = prefetched
+                    queries = [question] + [q for q in queries if q != question]
+                    hits = [prefetched_hits[: self.top_k]]
+                elif not queries:
+                    # Generator produced nothing usable: search with the user's message.
+                    dispatch([q for q in [content_text(ctx.user_content)] if q])
+                    queries = list(searches)
+                hits += await asyncio.gather(*(searches[q] for q in queries[len(hits):]))
+                payload, report = await self._build_payload(retriever, queries, hits)
+            except Exception as e:
+                hits, report = [], None
+                payload = self._failed_payload(e)
+        finally:
+            prefetch.cancel()
+            for search in searches.values():
+                search.cancel()
+        yield self._payload_event(ctx, queries, hits, payload, report)
+
+
+def content_text(content: Optional[types.Content]) -> Optional[str]:
+    """Concatenated text parts of a message, or None when it has no text."""
+    if not content or not content.parts:
+        return None
+    text = "".join(part.text or "" for part in content.parts).strip()
+    return text or None
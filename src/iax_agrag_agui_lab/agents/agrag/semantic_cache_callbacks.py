@@ -0,0 +1,107 @@
+"""
+Callbacks de ADK que ponen el caché semántico de respuestas delante de un pipeline RAG.
+
+Se instalan en el agente raíz (triage) del pipeline:
+- before_agent_callback: embebe la pregunta y, si hay una respuesta cacheada
+  suficientemente similar, la devuelve directamente (el pipeline no corre).
+- after_agent_callback: si esta invocación produjo una respuesta final nueva,
+  la guarda junto con el embedding de la pregunta y las fuentes recuperadas.
+
+Las respuestas GENERALES (saludos, etc.) no se cachean: solo se guarda cuando
+cambia el `final_key` que escribe el sintetizador.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from agents.agrag.retrieval_stage_agent import content_text
+from retrieval.registry import retriever_registry
+from retrieval.semantic_cache import SemanticAnswerCache, semantic_answer_cache
+from sessions.blob_store import resolve_state_value
+
+logger = logging.getLogger(__name__)
+
+_MAX_PENDING = 1024  # Invocations that errored never reach the after callback
+
+
+def _sources(raw_chunks: Any) -> list[Any]:
+    try:
+        raw_chunks = resolve_state_value(raw_chunks)
+        payload = json.loads(raw_chunks) if isinstance(raw_chunks, str) else raw_chunks
+        chunks = payload.get("retrieved_chunks", [])
+    except (AttributeError, TypeError, json.JSONDecodeError):
+        return []
+    return list(dict.fromkeys(c.get("source") for c in chunks if c.get("source")))
+
+
+def semantic_cache_callbacks(
+    namespace: str,
+    index: str,
+    final_key: str,
+    chunks_key: Optional[str] = None,
+    cache: SemanticAnswerCache = semantic_answer_cache,
+) -> tuple[Callable, Callable]:
+    """(before_agent_callback, after_agent_callback) for one RAG pipeline.
+
+    Params:
+        namespace: Cache namespace, invalidated together when `index` is re-indexed.
+        index: Registry key whose embedding model is used for the question.
+        final_key: State key where the synthesizer writes the final answer.
+        chunks_key: State key with the retrieval payload (to record the sources).
+    """
+    pending: OrderedDict[str, tuple[str, list[float], Any, float]] = OrderedDict()
+
+    async def before_agent_callback(callback_context: CallbackContext) -> Optional[types.Content]:
+        question = content_text(callback_context.user_content)
+        if not question:
+            return None
+        try:
+            spec = retriever_registry.spec(index)
+            embeddings = retriever_registry.embeddings(spec.embedding_model, spec.dimensions)
+            vector = await embeddings.aembed_query(question)
+        except Exception as exc:  # Sin embeddings, el turno corre sin caché
+            logger.warning("Semantic cache lookup failed: %s", exc)
+            return None
+
+        hit = cache.lookup(namespace, vector)
+        if hit is not None:
+            callback_context.state[final_key] = hit.answer
+            return types.Content(role="model", parts=[types.Part(text=hit.answer)])
+
+        pending[callback_context.invocation_id] = (
+            question,
+            vector,
+            resolve_state_value(callback_context.state.get(final_key)),
+            time.perf_counter(),
+        )
+        while len(pending) > _MAX_PENDING:
+            pending.popitem(last=False)
+        return None
+
+    async def after_agent_callback(callback_context: CallbackContext) -> Optional[types.Content]:
+        entry = pending.pop(callback_context.invocation_id, None)
+        if entry is None:
+            return None
+        question, vector, previous_answer, started = entry
+        # Con AGUI_BLOB_STATE una respuesta larga está en state como referencia
+        answer = resolve_state_value(callback_context.state.get(final_key))
+        if answer and answer != previous_answer:
+            cache.store(
+                namespace,
+                question,
+                vector,
+                answer,
+                sources=_sources(callback_context.state.get(chunks_key)) if chunks_key else [],
+                latency_seconds=time.perf_counter() - started,
+            )
+        return None
+
+    return before_agent_callback, after_agent_callback
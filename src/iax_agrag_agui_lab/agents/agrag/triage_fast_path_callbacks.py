@@ -0,0 +1,144 @@
+"""
+Callbacks de ADK que ponen el clasificador local de triage delante del LLM.
+
+Se instalan en el agente de triage (GENERAL vs ESPECÍFICA):
+- before_model_callback: clasifica el mensaje del usuario en proceso
+  (`routing.triage_classifier`). Si es ESPECÍFICA con confianza suficiente,
+  devuelve una respuesta sintética con el aviso de búsqueda y la llamada a
+  `transfer_to_agent`, sin llamar al modelo; ADK la ejecuta igual que si la
+  hubiera generado el LLM. En cualquier otro caso (GENERAL, poca confianza)
+  decide el LLM, que además tiene que redactar la respuesta.
+- after_model_callback: si `RAG_TRIAGE_TRAFFIC_LOG` está configurado, registra
+  la decisión que tomó el LLM para reentrenar el clasificador con tráfico real.
+  Las decisiones del propio clasificador no se registran.
+
+Solo actúan con `RAG_TRIAGE_FAST_PATH=true`; el umbral se ajusta con
+`RAG_TRIAGE_FAST_PATH_THRESHOLD` (ver `benchmarks.eval_triage_classifier`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Callable, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from agents.agrag.retrieval_stage_agent import content_text
+from routing.triage_classifier import (
+    GENERAL,
+    SPECIFIC,
+    TRIAGE_TRAFFIC_LOG,
+    TriageClassifier,
+    TriageTrafficLog,
+    load_triage_classifier,
+)
+
+logger = logging.getLogger(__name__)
+
+TRIAGE_FAST_PATH_ENABLED = os.getenv("RAG_TRIAGE_FAST_PATH", "false").lower() in ("1", "true", "yes")
+TRIAGE_FAST_PATH_THRESHOLD = float(os.getenv("RAG_TRIAGE_FAST_PATH_THRESHOLD", "0.9"))
+_FAST_PATH_METADATA_KEY = "triage_fast_path"
+
+
+def answers_user_message(llm_request: LlmRequest) -> bool:
+    """True en la primera llamada al modelo del turno: la que responde al mensaje del usuario."""
+    last = llm_request.contents[-1] if llm_request.contents else None
+    return (
+        last is not None
+        and last.role == "user"
+        and not any(p.function_response for p in last.parts or [])
+    )
+
+
+def transfer_response(
+    target_agent: str, message: str, custom_metadata: Optional[dict] = None
+) -> LlmResponse:
+    """Respuesta de modelo sintética: `message` + llamada a `transfer_to_agent`.
+
+    Devuelta desde un before_model_callback reemplaza la llamada al LLM; ADK
+    ejecuta la transferencia igual que si la hubiera pedido el modelo.
+    """
+    return LlmResponse(
+        content=types.Content(
+            role="model",
+            parts=[
+                types.Part(text=message),
+                types.Part(
+                    function_call=types.FunctionCall(
+                        name="transfer_to_agent", args={"agent_name": target_agent}
+                    )
+                ),
+            ],
+        ),
+        custom_metadata=custom_metadata,
+    )
+
+
+def triage_fast_path_callbacks(
+    domain: str,
+    target_agent: str,
+    message: str = "Déjame buscar esa información para ti...",
+    threshold: float = TRIAGE_FAST_PATH_THRESHOLD,
+    enabled: bool = TRIAGE_FAST_PATH_ENABLED,
+    traffic_log: Optional[str] = TRIAGE_TRAFFIC_LOG,
+    classifier: Optional[TriageClassifier] = None,
+) -> tuple[Callable, Callable]:
+    """(before_model_callback, after_model_callback) para el agente de triage.
+
+    Params:
+        domain: Dominio del clasificador (clave del índice en el registry).
+        target_agent: Agente al que transfiere el triage en una consulta ESPECÍFICA.
+        message: Texto que acompaña la transferencia (el que pide el prompt del triage).
+        threshold: Confianza mínima en ESPECÍFICA para saltarse el LLM.
+    """
+    log = TriageTrafficLog(traffic_log) if traffic_log else None
+    model: list[TriageClassifier] = [classifier] if classifier else []
+    loading = asyncio.Lock()
+
+    async def get_classifier() -> TriageClassifier:
+        # Se entrena/carga en el primer turno, no al importar; en un hilo, porque
+        # sin el .npz entrenar bloquearía el loop para todos los streams.
+        if not model:
+            async with loading:
+                if not model:
+                    model.append(await asyncio.to_thread(load_triage_classifier, domain))
+        return model[0]
+
+    async def before_model_callback(
+        callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        if not enabled or not answers_user_message(llm_request):
+            return None
+        question = content_text(callback_context.user_content)
+        if not question:
+            return None
+        prediction = (await get_classifier()).predict(question)
+        if prediction.label != SPECIFIC or prediction.confidence < threshold:
+            return None
+        logger.info("Triage fast path (%s, %.3f): %r -> %s", domain, prediction.confidence, question, target_agent)
+        return transfer_response(
+            target_agent, message, {_FAST_PATH_METADATA_KEY: round(prediction.confidence, 4)}
+        )
+
+    async def after_model_callback(
+        callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        if log is None or llm_response.partial or not llm_response.content:
+            return None
+        if _FAST_PATH_METADATA_KEY in (llm_response.custom_metadata or {}):
+            return None
+        question = content_text(callback_context.user_content)
+        if question:
+            transferred = any(
+                p.function_call and p.function_call.name == "transfer_to_agent"
+                for p in llm_response.content.parts or []
+            )
+            # Escritura a disco fuera del loop
+            await asyncio.to_thread(log.append, domain, question, SPECIFIC if transferred else GENERAL)
+        return None
+
+    return before_model_callback, after_model_callback
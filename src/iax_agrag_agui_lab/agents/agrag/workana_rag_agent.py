@@ -6,7 +6,13 @@ Versión simple: Triage -> Retrieval -> Synthesis
 from google.adk.agents import LlmAgent, SequentialAgent
 from google.adk.tools import FunctionTool
 
+from agents.agrag.blob_ref_callbacks import resolve_blob_refs
 from agents.agrag.query_workana_docs_tool import query_workana_documentation_rag
+from agents.agrag.prefetch_callbacks import prefetch_callbacks
+from agents.agrag.retrieval_stage_agent import PipelinedRetrievalStageAgent
+from agents.agrag.semantic_cache_callbacks import semantic_cache_callbacks
+from agents.agrag.triage_fast_path_callbacks import triage_fast_path_callbacks
+from retrieval.registry import WORKANA_DOCS
 
 # ==================== HERRAMIENTAS ====================
 workana_helpdesk_retriever = FunctionTool(
@@ -72,6 +78,24 @@ from google.adk.models.lite_llm import LiteLlm
 
 llm = LiteLlm(model="openai/gpt-4.1-mini", stream_options={"include_usage": True})
 
+# Caché semántico: preguntas parafraseadas reciben la respuesta ya sintetizada
+check_answer_cache, store_answer_in_cache = semantic_cache_callbacks(
+    namespace=WORKANA_DOCS.name,
+    index=WORKANA_DOCS.name,
+    final_key="WorkanaSynthesizerAgent.final_response",
+    chunks_key="MultiRetrievalAgent.retrieved_chunks",
+)
+
+# Prefetch: la pregunta original se busca mientras el triage clasifica
+# (RAG_PREFETCH_ENABLED); la etapa de retrieval reutiliza esos resultados.
+start_prefetch, cancel_prefetch = prefetch_callbacks(index=WORKANA_DOCS.name, top_k=2)
+
+# Fast path: el clasificador local decide las consultas ESPECÍFICAS obvias y
+# transfiere sin llamar al LLM de triage (RAG_TRIAGE_FAST_PATH).
+triage_fast_path, log_triage_decision = triage_fast_path_callbacks(
+    domain=WORKANA_DOCS.name, target_agent="WorkanaResearchPipeline"
+)
+
 # 1) TRIAGE AGENT - Clasifica consultas
 triage_agent = LlmAgent(
     name="WorkanaTriageAgent",
@@ -85,6 +109,10 @@ triage_agent = LlmAgent(
     """,
     output_key="WorkanaTriageAgent.triage_result",
     sub_agents=[],
+    before_agent_callback=[check_answer_cache, start_prefetch],
+    after_agent_callback=[store_answer_in_cache, cancel_prefetch],
+    before_model_callback=triage_fast_path,
+    after_model_callback=log_triage_decision,
 )
 
 
@@ -106,26 +134,18 @@ search_query_generator = LlmAgent(
 )
 
 
-# 4) MULTI-RETRIEVAL AGENT - Ejecuta las búsquedas con workana_helpdesk_retriever
-multi_retrieval_agent = LlmAgent(
+# 4) MULTI-RETRIEVAL STAGE - Ejecuta las queries en código (sin LLM)
+# Corre el SearchQueryGenerator y lanza cada query en cuanto termina de llegar
+# en el stream (no espera al JSON completo); después fusiona los resultados
+# (RRF + dedup) y escribe {"retrieved_chunks": [...], "by_query": {...}}.
+multi_retrieval_agent = PipelinedRetrievalStageAgent(
     name="WorkanaMultiRetrievalAgent",
-    model=llm,
     description="Ejecuta búsquedas con las queries generadas y recopila resultados",
-    instruction="""
-    Las consultas generadas están en: {SearchQueryGenerator.search_queries}
-
-    Tareas:
-    1) Ejecuta `workana_helpdesk_retriever` para CADA query (3–5 consultas).
-    2) Recolecta los documentos retornados y agrúpalos.
-    3) Devuelve un JSON con la estructura:
-       {"retrieved_chunks": [...], "by_query": {"query1": [...], ...}}
-
-    Importante: Ejecuta todas las búsquedas aunque algunas retornen pocos resultados.
-    Extrae "source" de metadata cuando esté disponible.
-    """,
+    index=WORKANA_DOCS.name,
+    queries_state_key="SearchQueryGenerator.search_queries",
     output_key="MultiRetrievalAgent.retrieved_chunks",
-    tools=[workana_helpdesk_retriever],
-    sub_agents=[],
+    top_k=2,
+    sub_agents=[search_query_generator],
 )
 
 
@@ -158,6 +178,7 @@ synthesizer_agent = LlmAgent(
     - Si no sabes, di "No sé" o "No tengo esa información".
     """,
     output_key="WorkanaSynthesizerAgent.final_response",
+    before_model_callback=resolve_blob_refs,  # Chunks guardados fuera del estado (AGUI_BLOB_STATE)
 )
 
 
@@ -165,7 +186,7 @@ synthesizer_agent = LlmAgent(
 
 research_pipeline = SequentialAgent(
     name="WorkanaResearchPipeline",
-    sub_agents=[search_query_generator, multi_retrieval_agent, synthesizer_agent],
+    sub_agents=[multi_retrieval_agent, synthesizer_agent],
 )
 
 triage_agent.sub_agents = [research_pipeline]
@@ -3,7 +3,10 @@
 from typing import List
 from google.adk.agents import LlmAgent, BaseAgent
 
+from agents.agent_router_callbacks import agent_router_callback
+from routing.agent_router import EmbeddingAgentRouter
 from agents.agrag.agentic_rag_multi_query import agentic_rag_multi_query_bot
+from agents.agrag.federated_search_tool import federated_documentation_rag
 from agents.agrag.workana_rag_agent import workana_rag_bot
 from agents.web_search_agent import web_search_agent
 from agents.coder_agent import coder_agent
@@ -77,6 +80,21 @@ def get_weather(location: str) -> str:
 
 
 
+coordinator_sub_agents = [
+    agentic_rag_multi_query_bot,
+    workana_rag_bot,
+    web_search_agent,
+    platform_specialist,
+    coder_agent,
+]
+
+# Router por embeddings: las consultas que claramente son de un sub-agente se
+# transfieren sin pasar por el LLM del Coordinator (RAG_AGENT_ROUTER). El
+# catálogo se embebe en el warm-up de run_agents (`coordinator_router.warm_up`).
+coordinator_catalog = [AgentData(agent).to_dict() for agent in coordinator_sub_agents]
+coordinator_router = EmbeddingAgentRouter(coordinator_catalog)
+route_to_sub_agent = agent_router_callback(coordinator_catalog, router=coordinator_router)
+
 # Create parent agent and assign children via sub_agents
 coordinator = LlmAgent(
     name="Coordinator",
@@ -90,6 +108,8 @@ coordinator = LlmAgent(
     - Consultas de Workana (políticas, help desk, pagos, disputas) -> Workana RAG.
     - Consultas sobre iattraxia/IAX (arquitectura, funcionalidades, agentes) -> Agentic RAG Multi-Query.
     - Búsquedas generales en la web (noticias, conocimiento abierto) -> WebSearchAgent.
+    - Consultas que combinan IAX y Workana -> usa tú mismo la herramienta `federated_documentation_rag`
+      (una sola búsqueda en ambas bases) y responde citando la base (`index`) y la fuente de cada dato.
     - Si tienes dudas, consulta al PlatformSpecialist usando la herramienta `transfer_to_agent`.
 
     # Instrucciones
@@ -97,16 +117,12 @@ coordinator = LlmAgent(
     - Responde siempre en el idioma del usuario.
     - Usa formato Markdown.
     """,
-    sub_agents=[
-        agentic_rag_multi_query_bot,
-        workana_rag_bot,
-        web_search_agent,
-        platform_specialist,
-        coder_agent,
-    ], 
-    tools=[FunctionTool(
-        func=get_weather,
-    )],
+    sub_agents=coordinator_sub_agents,
+    tools=[
+        FunctionTool(func=get_weather),
+        FunctionTool(func=federated_documentation_rag),
+    ],
+    before_model_callback=route_to_sub_agent,
 )
 
 # Framework automatically sets:
@@ -17,7 +17,7 @@ from __future__ import annotations
 from typing import Any, Optional
 
 from ag_ui.core import RunAgentInput
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from starlette.middleware.cors import CORSMiddleware
 
 from adk_agui_middleware import (
@@ -28,9 +28,11 @@ from adk_agui_middleware import (
 )
 from adk_agui_middleware.data_model.config import (
     HistoryConfig,
+    HistoryPathConfig,
     PathConfig,
     RunnerConfig,
     StateConfig,
+    StatePathConfig,
 )
 from adk_agui_middleware.data_model.context import ConfigContext
 from adk_agui_middleware.service.history_service import HistoryService
@@ -49,46 +51,66 @@ except Exception:  # pragma: no cover - dev convenience
         state: dict[str, Any]
 
 from google.adk.agents import Agent
-from google.adk.sessions import InMemorySessionService
+from google.adk.sessions import BaseSessionService
+
+from agui.agent_registry import LazyAgent
+from sessions.backends import create_session_service
+from sessions.blob_store import BLOB_REF, BLOB_REF_PREFIX
+
+
+class LazySSEService(SSEService):
+    """`SSEService` whose agent is imported on the first run request."""
+
+    def __init__(self, agent: LazyAgent, **kwargs: Any) -> None:
+        super().__init__(agent=None, **kwargs)  # type: ignore[arg-type]
+        self.lazy_agent = agent
+
+    async def get_runner(self, agui_content: RunAgentInput, request: Request):
+        if self.agent is None:
+            self.agent = await self.lazy_agent.aload()
+        return await super().get_runner(agui_content, request)
+
 
 class AdkAguiAgentServer:
-    def __init__(self, agent: Agent, agui_main_path: str = "/agui") -> None:
+    def __init__(
+        self,
+        agent: Agent | LazyAgent,
+        agui_main_path: str = "/agui",
+        session_service: Optional[BaseSessionService] = None,
+        session_backend: Optional[str] = None,
+        app_name: Optional[str] = None,
+    ) -> None:
         self.agent = agent
         self.agui_main_path = agui_main_path
-
-        
-
+        # Sessions are keyed by app name, so it comes from the mount path rather
+        # than the agent: two endpoints serving agents with the same name (both
+        # RAG triages are "TriageAgent") would otherwise share threads.
+        self.app_name = app_name or (agui_main_path.strip("/").replace("/", "_") or "agui") + "_app"
+        # One session per (user, AG-UI thread), shared by the SSE, history and
+        # state services so they all see the same conversations. The backend
+        # ("memory" / "sqlite") defaults to AGUI_SESSION_BACKEND.
+        self.session_service = session_service or create_session_service(session_backend)
 
     async def register_app(self, app: FastAPI, initialState: Optional[dict[str, Any]]) -> None:
         
-        self.app_name = self.agent.name + "_app"
-        self.user_id = self.agent.name + "_user"
-        self.session_id = self.agent.name + "_session_01"
-            
-        # Initialize a session service and a session
-        session_service = InMemorySessionService()
-        self.session = await session_service.create_session(
-            app_name=self.app_name,
-            user_id=self.user_id,
-            session_id=self.session_id, 
-            state= {
-                **initialState
-            }
-        )
+        self.initial_state = dict(initialState or {})
+
         # Main configuration context for the SSE service
         self.config_context = ConfigContext(
             app_name=self.app_name,  # Application identifier
             user_id=self.extract_user_id_main,  # User ID extraction for main endpoint
-            session_id=self.session_id,  # Fixed session ID for simplicity
-
-        
+            session_id=self.extract_session_id_main,  # Session per AG-UI thread
+            extract_initial_state=self.extract_initial_state,  # State of new threads
             event_source_response_mode=False,  # Enable EventSourceResponse mode
         )
 
-        # SSE service handles the main chat/agent interaction endpoint
-        self.sse_service = SSEService(
+        # SSE service handles the main chat/agent interaction endpoint. A lazy
+        # agent is only imported on the first request (see agui.agent_registry).
+        sse_service_class = LazySSEService if isinstance(self.agent, LazyAgent) else SSEService
+        self.sse_service = sse_service_class(
             agent=self.agent,  # The agent that processes user requests
             config_context=self.config_context,  # Context extraction configuration
+            runner_config=RunnerConfig(session_service=self.session_service),
             )
 
         # History service manages conversation threads and message history
@@ -96,9 +118,9 @@ class AdkAguiAgentServer:
             HistoryConfig(
                 app_name=self.app_name,  # Must match SSE service app name
                 user_id=self.extract_user_id_history,  # User ID extraction for history endpoints
-                # session_id=self.extract_session_id_history,  # Session/thread ID extraction
-                session_id=self.session_id,
+                session_id=self.extract_session_id_history,  # Session/thread ID extraction
                 get_thread_list=self.format_thread_list,  # Custom thread list formatting
+                session_service=self.session_service,
             )
         )
 
@@ -107,7 +129,8 @@ class AdkAguiAgentServer:
             StateConfig(
                 app_name=self.app_name,  # Must match SSE service app name
                 user_id=self.extract_user_id_history,  # User ID extraction for state endpoints
-                session_id=self.session_id,  # Fixed session ID for simplicity
+                session_id=self.extract_session_id_history,  # Session/thread ID extraction
+                session_service=self.session_service,
             )
         )
 
@@ -121,11 +144,19 @@ class AdkAguiAgentServer:
         )
 
         # History endpoints (GET list, DELETE thread, GET message snapshot)
-        # These endpoints manage conversation history and thread management
+        # These endpoints manage conversation history and thread management.
+        # Prefixed with the main path: the middleware's defaults are the same
+        # for every server, so only the first one registered would answer.
         register_agui_history_endpoint(
             app=app,
             history_service=self.history_service,
-            # Provides: GET /threads, DELETE /threads/{thread_id}, GET /threads/{thread_id}/messages
+            path_config=HistoryPathConfig(
+                agui_main_path=self.agui_main_path,
+                agui_message_snapshot_path=f"{self.agui_main_path}/message_snapshot/{{thread_id}}",
+                agui_thread_list_path=f"{self.agui_main_path}/thread/list",
+                agui_thread_delete_path=f"{self.agui_main_path}/thread/{{thread_id}}",
+            ),
+            # Provides: GET {main}/thread/list, DELETE {main}/thread/{thread_id}, GET {main}/message_snapshot/{thread_id}
         )
 
         # State endpoints (PATCH state, GET state snapshot)
@@ -133,8 +164,35 @@ class AdkAguiAgentServer:
         register_state_endpoint(
             app=app,
             state_service=self.state_service,
-            # Provides: PATCH /threads/{thread_id}/state, GET /threads/{thread_id}/state
+            path_config=StatePathConfig(
+                agui_main_path=self.agui_main_path,
+                agui_patch_state_path=f"{self.agui_main_path}/state/{{thread_id}}",
+                agui_state_snapshot_path=f"{self.agui_main_path}/state_snapshot/{{thread_id}}",
+            ),
+            # Provides: PATCH {main}/state/{thread_id}, GET {main}/state_snapshot/{thread_id}
+        )
+
+        # Memory held by this endpoint's sessions (see sessions.compaction)
+        app.add_api_route(
+            f"{self.agui_main_path}/sessions/memory", self.memory_usage, methods=["GET"]
         )
+        # Large state values swapped out of state (AGUI_BLOB_STATE), by digest
+        app.add_api_route(f"{self.agui_main_path}/blobs/{{digest}}", self.get_blob, methods=["GET"])
+
+    async def get_blob(self, digest: str) -> Any:
+        """Value behind a `blob:sha256:<digest>` reference found in this endpoint's state."""
+        store = getattr(self.session_service, "blob_store", None)
+        if store is None or not BLOB_REF.fullmatch(BLOB_REF_PREFIX + digest):
+            raise HTTPException(status_code=404, detail="Unknown blob")
+        try:
+            return store.get(BLOB_REF_PREFIX + digest)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Unknown blob") from None
+
+    async def memory_usage(self) -> dict[str, int]:
+        """Sessions, events and estimated bytes held for this endpoint, plus compaction counters."""
+        usage = getattr(self.session_service, "memory_usage", None)
+        return usage(self.app_name).get(self.app_name, {}) if usage else {}
 
     async def extract_user_id_main(self, _: RunAgentInput, request: Request) -> str:
         """User id for the main SSE endpoint (from `X-User-Id`, defaults to `guest`).
@@ -146,6 +204,19 @@ class AdkAguiAgentServer:
         # Extract user ID from HTTP header for authentication/authorization
         return request.headers.get("X-User-Id", "guest")
 
+    async def extract_session_id_main(self, agui_content: RunAgentInput, _: Request) -> str:
+        """Session id for the main SSE endpoint: the AG-UI thread id.
+
+        Together with the user id this keys the session, so every conversation
+        thread has its own events and state.
+        """
+        return agui_content.thread_id
+
+    async def extract_initial_state(self, agui_content: RunAgentInput, _: Request) -> dict[str, Any]:
+        """State of a new thread: the endpoint's initial state plus the client's."""
+        client_state = agui_content.state if isinstance(agui_content.state, dict) else {}
+        return {**self.initial_state, **client_state}
+
     async def extract_user_id_history(self, request: Request) -> str:
         """User id for history/state endpoints (from `X-User-Id`, defaults to `guest`).
 
@@ -0,0 +1,122 @@
+"""Lazy registry of the agents served by the app.
+
+Importing an agent module builds its whole tree at import time: model
+clients, tools (Tavily), observability (logfire, langfuse) and even external
+connections (`hello_agent` queries Neo4j). `run_agents.py` used to import all
+of them before the server could start, so every cold start and every
+`--reload` paid for all of it.
+
+Agents are now registered by name and import path, and imported on first
+use:
+
+    hello = agent_registry.register("hello_agent_v1", "agents.hello_agent:hello_agent")
+    AdkAguiAgentServer(hello, agui_main_path="/hello-adk-agui")
+
+The server mounts its endpoints right away (the app name only needs the
+agent's name) and loads the agent on the first request to it. With
+`AGUI_AGENT_WARM_UP=true` the app loads every registered agent in the
+background after startup instead, so first requests do not wait either.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Iterable, Optional
+
+from google.adk.agents import BaseAgent
+
+logger = logging.getLogger(__name__)
+
+AGENT_WARM_UP_ENABLED = os.getenv("AGUI_AGENT_WARM_UP", "false").lower() in ("1", "true", "yes")
+
+
+class LazyAgent:
+    """An agent known by name, imported from `module:attribute` on first `load`."""
+
+    def __init__(self, name: str, target: str) -> None:
+        module, _, attribute = target.partition(":")
+        if not module or not attribute:
+            raise ValueError(f"Agent target must look like 'package.module:attribute', got {target!r}")
+        self.name = name
+        self.target = target
+        self.load_seconds: Optional[float] = None
+        self._module = module
+        self._attribute = attribute
+        self._agent: Optional[BaseAgent] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._agent is not None
+
+    def load(self) -> BaseAgent:
+        """Import the agent (once; concurrent callers wait for the first)."""
+        if self._agent is not None:
+            return self._agent
+        with self._lock:
+            if self._agent is None:
+                started = time.perf_counter()
+                agent = getattr(importlib.import_module(self._module), self._attribute)
+                self.load_seconds = time.perf_counter() - started
+                if agent.name != self.name:
+                    logger.warning(
+                        "Agent %s registered as %r is named %r; sessions use the registered name",
+                        self.target,
+                        self.name,
+                        agent.name,
+                    )
+                logger.info("Loaded agent %s in %.2fs", self.name, self.load_seconds)
+                self._agent = agent
+        return self._agent
+
+    async def aload(self) -> BaseAgent:
+        """`load` off the event loop: imports may do blocking network I/O."""
+        if self._agent is not None:
+            return self._agent
+        return await asyncio.to_thread(self.load)
+
+
+class AgentRegistry:
+    """Lazy agents by import target (two endpoints may serve agents with the same name)."""
+
+    def __init__(self) -> None:
+        self._agents: dict[str, LazyAgent] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, target: str) -> LazyAgent:
+        """The lazy agent at `target`; registering it twice returns the same one."""
+        with self._lock:
+            existing = self._agents.get(target)
+            if existing is not None:
+                if existing.name != name:
+                    raise ValueError(f"{target} already registered as {existing.name!r}")
+                return existing
+            agent = self._agents[target] = LazyAgent(name, target)
+            return agent
+
+    def get(self, target: str) -> LazyAgent:
+        return self._agents[target]
+
+    async def warm_up(self, targets: Optional[Iterable[str]] = None) -> None:
+        """Load the given agents (default: all), one at a time; failures are logged, not raised."""
+        for target in list(targets or self._agents):
+            try:
+                await self._agents[target].aload()
+            except Exception:
+                logger.exception("Warm-up of agent %s failed; it will be retried on first request", target)
+
+    def stats(self) -> dict[str, dict[str, object]]:
+        with self._lock:
+            agents = list(self._agents.values())
+        return {
+            agent.target: {"name": agent.name, "loaded": agent.loaded, "load_seconds": agent.load_seconds}
+            for agent in agents
+        }
+
+
+agent_registry = AgentRegistry()
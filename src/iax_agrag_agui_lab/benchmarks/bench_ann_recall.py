@@ -0,0 +1,103 @@
+"""IVF-flat vs exact search: build time, memory, QPS and recall@k.
+
+For every corpus size a synthetic clustered index is written to a temp dir,
+IVF structures are built on it and a sweep of `nprobe` values is measured
+against brute-force search (`LocalVectorIndex`) as ground truth. Pass
+`--index-dir` to also run on a real exported index (see `retrieval.local_index`).
+
+Run (from src/iax_agrag_agui_lab):
+    python -m benchmarks.bench_ann_recall --sizes 20000,100000 --dimensions 1536
+    python -m benchmarks.bench_ann_recall --index-dir data/indexes/iax-documentation
+"""
+
+from __future__ import annotations
+
+import argparse
+import resource
+import shutil
+import tempfile
+import time
+from typing import Callable
+
+import numpy as np
+
+from benchmarks.synthetic import (
+    directory_bytes,
+    recall_at_k,
+    sample_queries,
+    write_synthetic_index,
+)
+from retrieval.ivf_index import build_ivf, IVFFlatIndex
+from retrieval.local_index import LocalVectorIndex
+
+
+def _measure(
+    search: Callable[[np.ndarray], tuple[np.ndarray, np.ndarray]], queries: np.ndarray
+) -> tuple[float, list[np.ndarray]]:
+    started = time.perf_counter()
+    results = [search(q)[0] for q in queries]
+    return len(queries) / (time.perf_counter() - started), results
+
+
+def _max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(path: str, label: str, args: argparse.Namespace) -> None:
+    exact = LocalVectorIndex(path)
+    queries = sample_queries(exact, args.queries)
+
+    started = time.perf_counter()
+    params = build_ivf(path, nlist=args.nlist, iterations=args.iterations)
+    build_seconds = time.perf_counter() - started
+    ivf = IVFFlatIndex(path)
+
+    print("=" * 78)
+    print(
+        f"{label}: {exact.count} x {exact.dimensions}  nlist={params['nlist']}  "
+        f"build={build_seconds:.2f}s  maxrss={_max_rss_mb():.0f} MB"
+    )
+    print(
+        f"  on disk: vectors={directory_bytes(path, 'vectors') / 2**20:.1f} MB  "
+        f"ivf={directory_bytes(path, 'ivf') / 2**20:.1f} MB  "
+        f"(resident centroids {ivf.centroids.nbytes / 2**20:.2f} MB)"
+    )
+    print("=" * 78)
+
+    exact_qps, truth = _measure(lambda q: exact.search_rows(q, args.k), queries)
+    print(f"  {'exact':<12} qps={exact_qps:9.1f}  recall@{args.k}=1.000")
+    for nprobe in args.nprobe:
+        qps, found = _measure(lambda q: ivf.search_rows(q, args.k, nprobe=nprobe), queries)
+        print(
+            f"  {'nprobe=' + str(nprobe):<12} qps={qps:9.1f}  "
+            f"recall@{args.k}={recall_at_k(truth, found, args.k):.3f}  speedup={qps / exact_qps:5.1f}x"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="20000,100000")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--nprobe", type=lambda v: [int(x) for x in v.split(",")], default=[1, 4, 8, 16, 32])
+    parser.add_argument("--index-dir", default=None, help="Also benchmark a real local index")
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",") if s):
+        workdir = tempfile.mkdtemp(prefix="bench-ann-")
+        try:
+            write_synthetic_index(workdir, size, args.dimensions)
+            run(workdir, "synthetic", args)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.index_dir:
+        # IVF files are written next to the real index, like `ivf_index build` does.
+        run(args.index_dir, "real", args)
+
+
+if __name__ == "__main__":
+    main()
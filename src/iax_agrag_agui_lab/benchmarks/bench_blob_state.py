@@ -0,0 +1,91 @@
+"""Benchmark: session state with large values inline vs swapped into the blob store.
+
+A session whose state holds the chunk payloads of `--keys` retrieval stages
+(`--payload-chars` each, rewritten every turn like `output_key` does) runs
+`--turns` turns. Reported per mode: bytes of the state snapshot a client gets
+(GET /state, STATE_SNAPSHOT), `get_session` p50 (the per-turn copy), the cost
+of appending one state-delta event, and of resolving a reference the way the
+synthesizer's prompt does.
+
+Run (from src/iax_agrag_agui_lab):
+    python -m benchmarks.bench_blob_state --payload-chars 30000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from typing import Optional
+
+import numpy as np
+from google.adk.events import Event, EventActions
+
+from sessions.blob_store import BlobStore
+from sessions.sharded_session_service import ShardedInMemorySessionService
+
+APP_NAME = "blob_app"
+
+
+def payload(turn: int, key: int, chars: int) -> str:
+    chunks = [{"id": f"{turn}-{key}-{i}", "content": "x" * 500} for i in range(chars // 540)]
+    return json.dumps({"retrieved_chunks": chunks, "by_query": {}})
+
+
+async def run_mode(store: Optional[BlobStore], args: argparse.Namespace) -> dict[str, float]:
+    service = ShardedInMemorySessionService(blob_store=store)
+    session = await service.create_session(app_name=APP_NAME, user_id="user", session_id="thread")
+    append_times = []
+    for turn in range(args.turns):
+        for key in range(args.keys):
+            event = Event(
+                author="Stage",
+                invocation_id=f"inv_{turn}",
+                actions=EventActions(state_delta={f"Stage{key}.retrieved_chunks": payload(turn, key, args.payload_chars)}),
+            )
+            started = time.perf_counter()
+            await service.append_event(session, event)
+            append_times.append(time.perf_counter() - started)
+
+    get_times = []
+    for _ in range(args.repeats):
+        started = time.perf_counter()
+        session = await service.get_session(app_name=APP_NAME, user_id="user", session_id="thread")
+        get_times.append(time.perf_counter() - started)
+
+    resolve_ms = 0.0
+    if store is not None:
+        ref = session.state["Stage0.retrieved_chunks"]
+        started = time.perf_counter()
+        for _ in range(args.repeats):
+            store.resolve_text(f"Los chunks recuperados están en: {ref}")
+        resolve_ms = (time.perf_counter() - started) / args.repeats * 1000
+    return {
+        "snapshot_bytes": len(json.dumps(session.state)),
+        "get_ms": float(np.percentile(get_times, 50) * 1000),
+        "append_ms": float(np.percentile(append_times, 50) * 1000),
+        "resolve_ms": resolve_ms,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"keys={args.keys}  payload={args.payload_chars} chars  turns={args.turns}")
+    print(f"{'mode':<8} {'snapshot KiB':>13} {'get p50 ms':>11} {'append p50 ms':>14} {'resolve ms':>11}")
+    modes = {"inline": None, "blobs": BlobStore(tempfile.mkdtemp(prefix="bench_blobs_"))}
+    for name, store in modes.items():
+        row = await run_mode(store, args)
+        print(
+            f"{name:<8} {row['snapshot_bytes'] / 1024:>13.1f} {row['get_ms']:>11.3f} "
+            f"{row['append_ms']:>14.3f} {row['resolve_ms']:>11.3f}"
+        )
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, default=3)
+    parser.add_argument("--payload-chars", type=int, default=30000)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
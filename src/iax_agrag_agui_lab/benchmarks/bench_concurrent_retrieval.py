@@ -0,0 +1,95 @@
+"""Concurrency check: N simultaneous RAG searches on one event loop.
+
+Each `/agentic-rag` request ends up awaiting `query_iax_documentation_rag` on
+the worker's event loop. This fires N of those tool calls at once against the
+local stand-in (see `standin_server.py`) and compares:
+- blocking: the previous tool body, a synchronous `similarity_search`
+- async: the current tool, async embedding + thread-pool vector lookup
+
+A heartbeat task ticks every 10 ms meanwhile; its worst lag is how long every
+other SSE stream on the worker would have been frozen.
+
+Run (from src/iax_agrag_agui_lab):
+    python -m benchmarks.bench_concurrent_retrieval --requests 16 --request-delay 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable
+
+from benchmarks.standin_server import StandinServer
+
+HEARTBEAT_SECONDS = 0.01
+
+
+async def _heartbeat(stop: asyncio.Event) -> float:
+    worst_lag = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        worst_lag = max(worst_lag, time.perf_counter() - started - HEARTBEAT_SECONDS)
+    return worst_lag
+
+
+async def _fan_out(call: Callable[[int], Awaitable[list]], requests: int) -> tuple[float, float]:
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return elapsed, await heartbeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--request-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StandinServer(request_delay=args.request_delay) as server:
+        # Point the shared registry at the stand-in before it is imported.
+        os.environ["OPENAI_BASE_URL"] = server.url
+        os.environ["PINECONE_IAX_HOST"] = server.url
+        os.environ.setdefault("OPENAI_API_KEY", "standin")
+        os.environ.setdefault("PINECONE_API_KEY", "standin")
+
+        from agents.agrag.query_iax_docs_tool import query_iax_documentation_rag
+        from retrieval.registry import IAX_DOCS, retriever_registry
+
+        retriever_registry.warm_up([IAX_DOCS.name])
+
+        async def blocking_call(i: int) -> list:
+            store = retriever_registry.vector_store(IAX_DOCS.name)
+            return store.similarity_search(f"pregunta {i}", k=5, namespace=IAX_DOCS.namespace)
+
+        async def async_call(i: int) -> list:
+            return await query_iax_documentation_rag(f"pregunta {i}", top_k=5)
+
+        async def run() -> None:
+            print("=" * 60)
+            print(f"{args.requests} concurrent searches, {args.request_delay * 1000:.0f} ms per remote call")
+            print("=" * 60)
+            results = {}
+            for label, call in (("blocking", blocking_call), ("async", async_call)):
+                elapsed, lag = await _fan_out(call, args.requests)
+                results[label] = elapsed
+                print(f"{label:<9} wall={elapsed * 1000:8.1f} ms  worst loop stall={lag * 1000:8.1f} ms")
+
+            # Two remote calls per search: sequential ~ requests * 2 * delay.
+            serial_floor = args.requests * 2 * args.request_delay
+            if results["async"] < serial_floor / 2:
+                print("✅ async searches overlap instead of queueing")
+            else:
+                print("❌ async searches still queue behind each other")
+            await retriever_registry.aclose()
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
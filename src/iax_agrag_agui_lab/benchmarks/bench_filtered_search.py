@@ -0,0 +1,114 @@
+"""Filtered vector search cost vs filter selectivity.
+
+Every synthetic chunk gets a `shard_<n>` metadata field per selectivity (for
+`shard_10`, value 0 matches 10% of the corpus), the metadata postings are
+built with `retrieval.metadata_index`, and each backend is queried with
+`{"shard_<n>": 0}`. Reports QPS per selectivity next to the unfiltered QPS,
+and checks the filtered results against a brute-force scan of the matching
+rows (recall@k; exact search must be 1.000).
+
+Run (from src/iax_agrag_agui_lab):
+    python -m benchmarks.bench_filtered_search --size 100000 --dimensions 1536
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import tempfile
+import time
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from benchmarks.synthetic import clustered_blocks, recall_at_k, sample_queries
+from retrieval.ivf_index import IVFFlatIndex, build_ivf
+from retrieval.local_index import LocalIndexWriter, LocalVectorIndex, top_k_indices
+from retrieval.metadata_index import build_metadata_index
+from retrieval.quantized_index import INT8, QuantizedIndex, build_quantized
+
+SELECTIVITIES = (2, 10, 100, 1000)  # 1 / fraction of the corpus that matches
+
+
+def write_index(path: str, count: int, dimensions: int) -> None:
+    rng = np.random.default_rng(2)
+    with LocalIndexWriter(path, dimensions, model="synthetic") as writer:
+        row = 0
+        for block in clustered_blocks(count, dimensions):
+            ids = [f"chunk-{row + i}" for i in range(block.shape[0])]
+            shards = {n: rng.integers(0, n, block.shape[0]) for n in SELECTIVITIES}
+            metadatas = [
+                {f"shard_{n}": int(shards[n][i]) for n in SELECTIVITIES}
+                for i in range(block.shape[0])
+            ]
+            writer.add(ids=ids, texts=ids, vectors=block, metadatas=metadatas)
+            row += block.shape[0]
+
+
+def _measure(
+    search: Callable[[np.ndarray], tuple[np.ndarray, np.ndarray]], queries: np.ndarray
+) -> tuple[float, list[np.ndarray]]:
+    search(queries[0])  # Fault the pages in before timing
+    started = time.perf_counter()
+    results = [search(q)[0] for q in queries]
+    return len(queries) / (time.perf_counter() - started), results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-filter-")
+    try:
+        write_index(workdir, args.size, args.dimensions)
+        started = time.perf_counter()
+        build_metadata_index(workdir)
+        print(f"metadata postings built in {time.perf_counter() - started:.2f}s")
+        build_ivf(workdir)
+        build_quantized(workdir, (INT8,))
+
+        exact = LocalVectorIndex(workdir)
+        queries = sample_queries(exact, args.queries)
+        backends = {
+            "flat": exact,
+            "ivf": IVFFlatIndex(workdir),
+            "int8": QuantizedIndex(workdir, mode=INT8),
+        }
+        filters: list[Optional[dict[str, Any]]] = [None] + [
+            {f"shard_{n}": 0} for n in SELECTIVITIES
+        ]
+
+        print("=" * 78)
+        print(f"{exact.count} x {exact.dimensions}, k={args.k}")
+        print("=" * 78)
+        for filter in filters:
+            rows = exact.filter_rows(filter)
+            label = "no filter" if filter is None else f"{next(iter(filter))}=0"
+            matching = exact.count if rows is None else rows.shape[0]
+            # Ground truth: brute force over every row, then keep the matching ones.
+            allowed = np.ones(exact.count, dtype=bool)
+            if rows is not None:
+                allowed[:] = False
+                allowed[rows] = True
+            truth = []
+            for query in queries:
+                scores = np.where(allowed, exact.scores(query), -np.inf)
+                truth.append(top_k_indices(scores, args.k))
+            line = f"  {label:<12} {matching:>8} rows"
+            for name, index in backends.items():
+                resolve = (lambda: index.filter_rows(filter)) if filter else (lambda: None)
+                qps, found = _measure(
+                    lambda q: index.search_rows(q, args.k, rows=resolve()), queries
+                )
+                line += f"  {name}: {qps:8.1f} qps r={recall_at_k(truth, found, args.k):.3f}"
+            print(line)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Hybrid (vector + BM25) vs vector-only retrieval: latency and hit quality.
+
+A synthetic help-desk corpus is written as a local index: chunks are grouped
+by topic, and each one documents an exact identifier (a project state, plan
+code or fee) the way the Workana articles do. Chunk embeddings only encode the
+topic, which is the failure mode we care about: an embedding model places
+"estado TRABAJANDO" and "estado FINALIZADO" articles next to each other.
+
+Two query sets are measured for vector-only, BM25-only and hybrid search:
+- exact-term queries ("¿Qué significa el estado X?"): hit@k and MRR of the one
+  chunk documenting X;
+- topical queries without identifiers: precision@k of chunks on the topic,
+  to check that hybrid does not degrade semantic questions.
+
+Hybrid runs both searches concurrently on a thread pool, as `AsyncRetriever`
+does, and fuses them with `retrieval.fusion.hybrid_fuse`.
+
+Run (from src/iax_agrag_agui_lab):
+    python -m benchmarks.bench_hybrid_retrieval --topics 50 --per-topic 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+
+from retrieval.bm25_index import BM25Index, build_bm25
+from retrieval.fusion import hybrid_fuse
+from retrieval.local_index import LocalIndexWriter, LocalVectorIndex, normalize_rows
+
+_KINDS = ("estado", "plan", "comisión", "nivel", "método de pago")
+_FILLER = (
+    "el freelancer puede consultar esta información desde su panel y el cliente "
+    "recibe una notificación cuando cambia; si tienes dudas escribe a soporte"
+).split()
+
+
+def _identifier(rng: np.random.Generator) -> str:
+    letters = "ABCDEFGHJKLMNPQRSTUVWXYZ"
+    return "".join(rng.choice(list(letters), 6)) + str(rng.integers(10, 99))
+
+
+def build_corpus(
+    path: str, topics: int, per_topic: int, dimensions: int, seed: int = 0
+) -> tuple[list[str], list[int], np.ndarray]:
+    """Writes the local index; returns (identifiers, topic of each row, topic centres)."""
+    rng = np.random.default_rng(seed)
+    centres = normalize_rows(rng.standard_normal((topics, dimensions), dtype=np.float32))
+    topic_words = [f"tema{t}" for t in range(topics)]
+    identifiers: list[str] = []
+    row_topics: list[int] = []
+    with LocalIndexWriter(path, dimensions, model="synthetic") as writer:
+        for topic in range(topics):
+            ids, texts, metadatas = [], [], []
+            for _ in range(per_topic):
+                identifier = _identifier(rng)
+                kind = _KINDS[topic % len(_KINDS)]
+                filler = " ".join(rng.choice(_FILLER, 25))
+                texts.append(
+                    f"Sobre {topic_words[topic]}: el {kind} {identifier} indica "
+                    f"una situación concreta de {topic_words[topic]}. {filler}."
+                )
+                ids.append(f"chunk-{len(identifiers)}")
+                metadatas.append({"title": f"{kind.capitalize()} en {topic_words[topic]}"})
+                identifiers.append(identifier)
+                row_topics.append(topic)
+            noise = rng.standard_normal((per_topic, dimensions), dtype=np.float32)
+            vectors = centres[topic] + noise * 0.6 / np.sqrt(dimensions)
+            writer.add(ids=ids, texts=texts, vectors=vectors, metadatas=metadatas)
+    return identifiers, row_topics, centres
+
+
+def _query_vector(centre: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    noise = rng.standard_normal(centre.shape, dtype=np.float32) * 0.6 / np.sqrt(centre.shape[0])
+    return normalize_rows(centre + noise)
+
+
+def _timed(search: Callable[[], list], samples: list[float]) -> list:
+    started = time.perf_counter()
+    hits = search()
+    samples.append((time.perf_counter() - started) * 1000)
+    return hits
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(0, int(round(q * len(ordered))) - 1)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--per-topic", type=int, default=200)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--alpha", type=float, default=0.5, help="Vector weight in hybrid mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-hybrid-") as path:
+        started = time.perf_counter()
+        identifiers, row_topics, centres = build_corpus(
+            path, args.topics, args.per_topic, args.dimensions
+        )
+        vectors = LocalVectorIndex(path)
+        params = build_bm25(path)
+        lexical = BM25Index(path)
+        print(
+            f"Corpus: {vectors.count} chunks, {params['terms']} terms, "
+            f"{params['postings']} postings (built in {time.perf_counter() - started:.1f}s)"
+        )
+
+        rng = np.random.default_rng(1)
+        rows = rng.choice(vectors.count, min(args.queries, vectors.count), replace=False)
+        exact_queries = [
+            (f"¿Qué significa el {_KINDS[row_topics[r] % len(_KINDS)]} {identifiers[r]}?",
+             _query_vector(centres[row_topics[r]], rng), f"chunk-{r}", row_topics[r])
+            for r in rows
+        ]
+        topical_queries = [
+            (f"¿Cómo funciona tema{row_topics[r]} para el freelancer?",
+             _query_vector(centres[row_topics[r]], rng), None, row_topics[r])
+            for r in rows
+        ]
+        candidates = args.k * 3
+        pool = ThreadPoolExecutor(max_workers=2)
+
+        def vector_search(text: str, vector: np.ndarray, k: int) -> list:
+            return vectors.similarity_search_by_vector_with_score(vector, k=k)
+
+        def lexical_search(text: str, vector: np.ndarray, k: int) -> list:
+            return lexical.similarity_search_with_score(text, k=k)
+
+        def hybrid_search(text: str, vector: np.ndarray, k: int) -> list:
+            vector_hits = pool.submit(vector_search, text, vector, candidates)
+            lexical_hits = pool.submit(lexical_search, text, vector, candidates)
+            return hybrid_fuse(vector_hits.result(), lexical_hits.result(), k, args.alpha)
+
+        modes = {"vector": vector_search, "bm25": lexical_search, "hybrid": hybrid_search}
+        print(
+            f"\n{'mode':<8} {'hit@k':>7} {'MRR':>7} {'topic P@k':>10} "
+            f"{'p50 ms':>8} {'p95 ms':>8}"
+        )
+        for mode, search in modes.items():
+            latencies: list[float] = []
+            hit, reciprocal = 0, 0.0
+            for text, vector, relevant, _ in exact_queries:
+                ids = [doc.id for doc, _ in _timed(lambda: search(text, vector, args.k), latencies)]
+                if relevant in ids:
+                    hit += 1
+                    reciprocal += 1 / (ids.index(relevant) + 1)
+            on_topic = 0
+            for text, vector, _, topic in topical_queries:
+                docs = _timed(lambda: search(text, vector, args.k), latencies)
+                on_topic += sum(1 for doc, _ in docs if row_topics[int(doc.id.split("-")[1])] == topic)
+            print(
+                f"{mode:<8} {hit / len(exact_queries):>7.3f} "
+                f"{reciprocal / len(exact_queries):>7.3f} "
+                f"{on_topic / (args.k * len(topical_queries)):>10.3f} "
+                f"{statistics.median(latencies):>8.2f} {_percentile(latencies, 0.95):>8.2f}"
+            )
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""int8 / binary quantized scan + float rescoring vs exact float32 search.
+
+Reports, for each storage mode: bytes scanned per vector, size of the codes
+(what each worker keeps hot in the page cache), QPS and recall@k against the
+exact float32 results, with and without the rescoring stage. Corpora are
+synthetic clustered embeddings (see `benchmarks.synthetic`); pass `--index-dir`
+to also run on a real exported index.
+
+Run (from src/iax_agrag_agui_lab):
+    python -m benchmarks.bench_quantized --sizes 20000,100000 --dimensions 1536
+    python -m benchmarks.bench_quantized --index-dir data/indexes/iax-documentation
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import tempfile
+import time
+from typing import Callable
+
+import numpy as np
+
+from benchmarks.synthetic import recall_at_k, sample_queries, write_synthetic_index
+from retrieval.local_index import LocalVectorIndex
+from retrieval.quantized_index import BINARY, INT8, QuantizedIndex, build_quantized
+
+
+def _measure(
+    search: Callable[[np.ndarray], tuple[np.ndarray, np.ndarray]], queries: np.ndarray
+) -> tuple[float, list[np.ndarray]]:
+    search(queries[0])  # Fault the pages in before timing
+    started = time.perf_counter()
+    results = [search(q)[0] for q in queries]
+    return len(queries) / (time.perf_counter() - started), results
+
+
+def run(path: str, label: str, args: argparse.Namespace) -> None:
+    exact = LocalVectorIndex(path)
+    queries = sample_queries(exact, args.queries)
+    started = time.perf_counter()
+    build_quantized(path, (INT8, BINARY))
+    build_seconds = time.perf_counter() - started
+
+    print("=" * 78)
+    print(f"{label}: {exact.count} x {exact.dimensions}  quantize={build_seconds:.2f}s")
+    print("=" * 78)
+    float_bytes = exact.dimensions * 4
+    exact_qps, truth = _measure(lambda q: exact.search_rows(q, args.k), queries)
+    print(
+        f"  {'float32':<18} {float_bytes:>6} B/vec  {exact.count * float_bytes / 2**20:8.1f} MB  "
+        f"qps={exact_qps:8.1f}  recall@{args.k}=1.000"
+    )
+    for mode in (INT8, BINARY):
+        index = QuantizedIndex(path, mode=mode)
+        codes_mb = index.count * index.code_bytes / 2**20
+        for factor in sorted({0, index.rescore_factor, *args.rescore}):
+            qps, found = _measure(
+                lambda q: index.search_rows(q, args.k, rescore_factor=factor), queries
+            )
+            name = f"{mode} rescore={factor}x" if factor else f"{mode} (no rescore)"
+            print(
+                f"  {name:<18} {index.code_bytes:>6} B/vec  {codes_mb:8.1f} MB  "
+                f"qps={qps:8.1f}  recall@{args.k}={recall_at_k(truth, found, args.k):.3f}  "
+                f"speedup={qps / exact_qps:4.1f}x"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="20000,100000")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--rescore", type=lambda v: [int(x) for x in v.split(",")], default=[2, 8, 32]
+    )
+    parser.add_argument("--index-dir", default=None, help="Also benchmark a real local index")
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",") if s):
+        workdir = tempfile.mkdtemp(prefix="bench-quant-")
+        try:
+            write_synthetic_index(workdir, size, args.dimensions)
+            run(workdir, "synthetic", args)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.index_dir:
+        # Codes are written next to the real index, like `quantized_index build` does.
+        run(args.index_dir, "real", args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Per-call setup cost of the RAG tools: fresh clients vs. the shared registry.
+
+Runs the same `similarity_search` against a local stand-in for OpenAI and
+Pinecone (see `standin_server.py`) two ways:
+- per-call: new `OpenAIEmbeddings` + Pinecone client on every search (old tools)
+- registry: one pooled embedder/store from `RetrieverRegistry` (current tools)
+
+The stand-in charges `--connect-delay` per TCP connection to emulate TLS/DNS,
+so the cold-connection cost of the per-call path shows up in the numbers.
+
+Run (from src/iax_agrag_agui_lab):
+    python -m benchmarks.bench_retriever_registry --calls 50 --connect-delay 0.03
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+from typing import Callable
+
+from langchain_openai import OpenAIEmbeddings
+from langchain_pinecone import PineconeVectorStore
+from pinecone import Pinecone as PineconeClient
+
+from benchmarks.standin_server import StandinServer
+from retrieval.registry import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL, IndexSpec, RetrieverRegistry
+
+QUESTION = "¿Cómo funciona el depósito en garantía?"
+
+
+def _time_calls(search: Callable[[], list], calls: int) -> list[float]:
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        search()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _report(label: str, timings: list[float], connections: int) -> None:
+    first = timings[0]
+    timings = sorted(timings)
+    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+    print(
+        f"{label:<10} mean={statistics.mean(timings):7.2f} ms  "
+        f"p50={statistics.median(timings):7.2f} ms  p95={p95:7.2f} ms  "
+        f"first={first:7.2f} ms  connections={connections}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--connect-delay", type=float, default=0.03)
+    parser.add_argument("--request-delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    with StandinServer(connect_delay=args.connect_delay, request_delay=args.request_delay) as server:
+        os.environ.setdefault("OPENAI_API_KEY", "standin")
+        os.environ.setdefault("PINECONE_API_KEY", "standin")
+
+        def per_call_search() -> list:
+            store = PineconeVectorStore(
+                index=PineconeClient(api_key=os.environ["PINECONE_API_KEY"]).Index(host=server.url),
+                embedding=OpenAIEmbeddings(
+                    model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS, base_url=server.url
+                ),
+            )
+            return store.similarity_search(QUESTION, k=args.top_k)
+
+        registry = RetrieverRegistry(embeddings_base_url=server.url)
+        registry.register(IndexSpec(name="bench", index_name="bench", host=server.url))
+        registry.warm_up()
+
+        def registry_search() -> list:
+            return registry.vector_store("bench").similarity_search(QUESTION, k=args.top_k)
+
+        print("=" * 60)
+        print(f"Per-call setup cost ({args.calls} calls, connect_delay={args.connect_delay}s)")
+        print("=" * 60)
+
+        server.reset_stats()
+        _report("per-call", _time_calls(per_call_search, args.calls), server.stats["connections"])
+
+        server.reset_stats()
+        _report("registry", _time_calls(registry_search, args.calls), server.stats["connections"])
+
+        registry.close()
+
+
+if __name__ == "__main__":
+    main()
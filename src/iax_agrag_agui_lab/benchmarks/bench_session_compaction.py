@@ -0,0 +1,119 @@
+"""Benchmark: session size and load cost of long conversations, with and without compaction.
+
+Drives the real ADK `Runner` with a stand-in agent whose turns look like a RAG
+turn: a tool call, a tool response of `--payload-chars` (the retrieved
+documents) and an answer. After `--turns` turns it reports, per mode, the
+events kept, the estimated bytes held, the size of the contents ADK would send
+to the model for the next turn, and `get_session` p50.
+
+Modes: `off` (compaction disabled: nothing is ever old enough) and
+`keep=<n>` for each of `--keep-turns`.
+
+Run (from src/iax_agrag_agui_lab):
+    python -m benchmarks.bench_session_compaction --turns 50 --keep-turns 2,4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import AsyncGenerator
+
+import numpy as np
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.flows.llm_flows.contents import _get_contents
+from google.adk.runners import Runner
+from google.genai import types
+
+from sessions.compaction import EventCompactor, SessionMemory
+from sessions.sharded_session_service import ShardedInMemorySessionService
+
+APP_NAME = "compaction_app"
+
+
+class ToolTurnAgent(BaseAgent):
+    """Calls a search tool, gets the documents back and answers."""
+
+    payload_chars: int = 20000
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        call_id = f"call_{len(ctx.session.events)}"
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            content=types.Content(
+                role="model",
+                parts=[types.Part(function_call=types.FunctionCall(id=call_id, name="search", args={"q": "iax"}))],
+            ),
+        )
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            content=types.Content(
+                role="user",
+                parts=[
+                    types.Part(
+                        function_response=types.FunctionResponse(
+                            id=call_id, name="search", response={"documents": "d" * self.payload_chars}
+                        )
+                    )
+                ],
+            ),
+            actions=EventActions(state_delta={"retrieved_chunks": "c" * (self.payload_chars // 4)}),
+        )
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            content=types.Content(role="model", parts=[types.Part(text="respuesta " * 40)]),
+        )
+
+
+async def run_mode(keep_turns: int, args: argparse.Namespace) -> dict[str, float]:
+    memory = SessionMemory(EventCompactor(keep_turns=keep_turns), max_session_bytes=2**62)
+    service = ShardedInMemorySessionService(memory=memory)
+    agent = ToolTurnAgent(name="ToolTurnAgent", payload_chars=args.payload_chars)
+    runner = Runner(app_name=APP_NAME, agent=agent, session_service=service)
+    await service.create_session(app_name=APP_NAME, user_id="user", session_id="thread")
+    for turn in range(args.turns):
+        message = types.Content(role="user", parts=[types.Part(text=f"pregunta {turn}")])
+        async for _ in runner.run_async(user_id="user", session_id="thread", new_message=message):
+            pass
+
+    latencies = []
+    for _ in range(args.repeats):
+        started = time.perf_counter()
+        session = await service.get_session(app_name=APP_NAME, user_id="user", session_id="thread")
+        latencies.append(time.perf_counter() - started)
+    contents = _get_contents(None, session.events, agent.name)
+    usage = service.memory_usage(APP_NAME)[APP_NAME]
+    return {
+        "events": usage["events"],
+        "bytes": usage["bytes"],
+        "prompt_chars": sum(len(json.dumps(c.model_dump(mode="json", exclude_none=True))) for c in contents),
+        "get_ms": float(np.percentile(latencies, 50) * 1000),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"turns={args.turns}  tool payload={args.payload_chars} chars")
+    print(f"{'mode':<8} {'events':>7} {'KiB held':>9} {'prompt KiB':>11} {'get p50 ms':>11}")
+    modes = [("off", args.turns + 1)] + [(f"keep={k}", int(k)) for k in args.keep_turns.split(",")]
+    for name, keep_turns in modes:
+        row = await run_mode(keep_turns, args)
+        print(
+            f"{name:<8} {row['events']:>7} {row['bytes'] / 1024:>9.0f} "
+            f"{row['prompt_chars'] / 1024:>11.0f} {row['get_ms']:>11.2f}"
+        )
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--keep-turns", default="2,4")
+    parser.add_argument("--payload-chars", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,142 @@
+"""Benchmark: SQLite session service vs the in-memory ones.
+
+Two measurements, with events shaped like a RAG turn (a short text part and a
+state delta of `--payload-chars`):
+
+- appends/s: `--concurrency` sessions appending `--appends` events each,
+  concurrently. `sqlite write-through` awaits a flush after every event (one
+  transaction per event, what a synchronous database service does);
+  `sqlite write-behind` is the default queued mode, and its time includes the
+  final `flush()`.
+- load latency: `get_session` p50 / p95 for sessions of `--sizes` events.
+  `sqlite hot` is served from the LRU tier (plus the freshness check against
+  the database), `sqlite cold` from a fresh service on the same file (a
+  restart, or another worker).
+
+Run (from src/iax_agrag_agui_lab):
+    python -m benchmarks.bench_session_service --concurrency 32 --sizes 10,100,1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import numpy as np
+from google.adk.events import Event, EventActions
+from google.adk.sessions import BaseSessionService, InMemorySessionService
+from google.genai import types
+
+from sessions.sharded_session_service import ShardedInMemorySessionService
+from sessions.sqlite_session_service import SqliteSessionService
+
+APP_NAME = "bench_app"
+
+
+def make_event(i: int, payload_chars: int) -> Event:
+    return Event(
+        author="BenchAgent",
+        invocation_id=f"inv_{i // 4}",
+        content=types.Content(role="model", parts=[types.Part(text=f"paso {i}")]),
+        actions=EventActions(state_delta={f"step_{i % 8}": "x" * payload_chars, "turn": i}),
+    )
+
+
+async def bench_appends(
+    service: BaseSessionService, args: argparse.Namespace, after_append: Callable[[], Awaitable]
+) -> float:
+    sessions = [
+        await service.create_session(app_name=APP_NAME, user_id=f"user_{i}", session_id=f"thread_{i}")
+        for i in range(args.concurrency)
+    ]
+
+    async def writer(session) -> None:
+        for i in range(args.appends):
+            await service.append_event(session, make_event(i, args.payload_chars))
+            await after_append()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(session) for session in sessions))
+    if isinstance(service, SqliteSessionService):
+        await service.flush()
+    return args.concurrency * args.appends / (time.perf_counter() - started)
+
+
+async def fill(service: BaseSessionService, size: int, args: argparse.Namespace) -> str:
+    session = await service.create_session(app_name=APP_NAME, user_id="loader", session_id=f"size_{size}")
+    for i in range(size):
+        await service.append_event(session, make_event(i, args.payload_chars))
+    return session.id
+
+
+async def load_latencies(service: BaseSessionService, session_id: str, repeats: int) -> np.ndarray:
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await service.get_session(app_name=APP_NAME, user_id="loader", session_id=session_id)
+        latencies.append(time.perf_counter() - started)
+    return np.array(latencies) * 1000
+
+
+async def main(args: argparse.Namespace) -> None:
+    workdir = Path(tempfile.mkdtemp(prefix="bench_sessions_"))
+    print(
+        f"sessions={args.concurrency}  appends/session={args.appends}  "
+        f"payload={args.payload_chars} chars  db={workdir}"
+    )
+
+    async def nothing() -> None:
+        return None
+
+    print(f"\n{'append mode':<22} {'appends/s':>10}")
+    modes = {
+        "in-memory": (InMemorySessionService, None),
+        "sharded in-memory": (ShardedInMemorySessionService, None),
+        "sqlite write-through": (lambda: SqliteSessionService(workdir / "through.sqlite"), "flush"),
+        "sqlite write-behind": (lambda: SqliteSessionService(workdir / "behind.sqlite"), None),
+    }
+    for name, (make_service, after) in modes.items():
+        service = make_service()
+        rate = await bench_appends(service, args, service.flush if after else nothing)
+        print(f"{name:<22} {rate:>10.0f}")
+        if isinstance(service, SqliteSessionService):
+            await service.close()
+
+    print(f"\n{'load':<22} {'events':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        memory = InMemorySessionService()
+        path = workdir / f"load_{size}.sqlite"
+        sqlite = SqliteSessionService(path)
+        memory_id = await fill(memory, size, args)
+        sqlite_id = await fill(sqlite, size, args)
+        await sqlite.flush()
+        rows = {
+            "in-memory": await load_latencies(memory, memory_id, args.repeats),
+            "sqlite hot": await load_latencies(sqlite, sqlite_id, args.repeats),
+        }
+        await sqlite.close()
+        cold = []
+        for _ in range(args.repeats):
+            fresh = SqliteSessionService(path)
+            cold.extend(await load_latencies(fresh, sqlite_id, 1))
+            await fresh.close()
+        rows["sqlite cold"] = np.array(cold)
+        for name, latencies in rows.items():
+            print(
+                f"{name:<22} {size:>7} "
+                f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f}"
+            )
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--appends", type=int, default=50)
+    parser.add_argument("--payload-chars", type=int, default=2000)
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--repeats", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
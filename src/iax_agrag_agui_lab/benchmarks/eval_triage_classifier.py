@@ -0,0 +1,98 @@
+"""Offline evaluation of the local triage classifier (`routing.triage_classifier`).
+
+Runs stratified k-fold cross-validation over labelled JSONL rows (by default
+the seed set plus `RAG_TRIAGE_TRAFFIC_LOG`, whose labels are the triage LLM's
+own decisions) and reports, for each confidence threshold:
+
+- accuracy of the plain argmax decision,
+- fast-path rate: fraction of turns classified ESPECÍFICA with enough
+  confidence to skip the triage LLM call (the calls avoided),
+- fast-path precision, and how many GENERAL messages would have been sent to
+  retrieval by mistake,
+- recall: fraction of the ESPECÍFICA turns that took the fast path.
+
+Run (from src/iax_agrag_agui_lab):
+    python -m benchmarks.eval_triage_classifier --domain iax
+    python -m benchmarks.eval_triage_classifier --domain workana --data logs/triage.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from routing.triage_classifier import (
+    SPECIFIC,
+    TriageClassifier,
+    load_examples,
+    training_paths,
+)
+
+
+def cross_validate(
+    examples: list[tuple[str, str]], folds: int, seed: int
+) -> tuple[np.ndarray, np.ndarray, float]:
+    """(P(ESPECÍFICA) per example, true labels as bool, mean classify µs)."""
+    rng = random.Random(seed)
+    by_label: dict[str, list[int]] = {}
+    for i, (_, label) in enumerate(examples):
+        by_label.setdefault(label, []).append(i)
+    fold_of = np.zeros(len(examples), dtype=int)
+    for indices in by_label.values():  # Stratified: every fold keeps the label mix
+        rng.shuffle(indices)
+        for position, i in enumerate(indices):
+            fold_of[i] = position % folds
+
+    probabilities = np.zeros(len(examples))
+    elapsed = 0.0
+    for fold in range(folds):
+        train = [examples[i] for i in np.flatnonzero(fold_of != fold)]
+        classifier = TriageClassifier.train(train)
+        started = time.perf_counter()
+        for i in np.flatnonzero(fold_of == fold):
+            probabilities[i] = classifier.probability(examples[i][0])
+        elapsed += time.perf_counter() - started
+    truth = np.array([label == SPECIFIC for _, label in examples])
+    return probabilities, truth, elapsed / len(examples) * 1e6
+
+
+def report(probabilities: np.ndarray, truth: np.ndarray, thresholds: list[float]) -> None:
+    accuracy = float(((probabilities >= 0.5) == truth).mean())
+    print(f"  accuracy (argmax) = {accuracy:.3f}   ESPECÍFICA share = {truth.mean():.3f}")
+    print(f"  {'threshold':>9} {'fast-path':>10} {'precision':>10} {'misrouted':>10} {'recall':>8}")
+    for threshold in thresholds:
+        fast = probabilities >= threshold
+        taken = int(fast.sum())
+        precision = float(truth[fast].mean()) if taken else 1.0
+        misrouted = int((fast & ~truth).sum())
+        recall = float(fast[truth].mean()) if truth.any() else 0.0
+        print(
+            f"  {threshold:>9.2f} {fast.mean():>10.3f} {precision:>10.3f} "
+            f"{misrouted:>10d} {recall:>8.3f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--domain", default="iax,workana", help="Comma-separated domains")
+    parser.add_argument("--data", nargs="*", default=None, help="Labelled JSONL files (default: seed + traffic log)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--thresholds", default="0.6,0.7,0.8,0.9,0.95")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    thresholds = [float(t) for t in args.thresholds.split(",")]
+
+    for domain in args.domain.split(","):
+        examples = load_examples(args.data or training_paths(), domain)
+        probabilities, truth, micros = cross_validate(examples, args.folds, args.seed)
+        print("=" * 60)
+        print(f"{domain}: {len(examples)} examples, {args.folds}-fold CV, {micros:.0f} µs/classify")
+        print("=" * 60)
+        report(probabilities, truth, thresholds)
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    main()
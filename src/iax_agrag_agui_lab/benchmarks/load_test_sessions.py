@@ -0,0 +1,127 @@
+"""Load test: one fixed session per endpoint vs per-thread sharded sessions.
+
+Drives the real ADK `Runner` with a stand-in agent that "thinks" for
+`--latency-ms` (the model call) and then emits `--events` events carrying
+state deltas, like a RAG turn does. Each conversation thread runs `--turns`
+turns back to back, and like the AG-UI middleware every run holds the lock of
+its session. Reported per mode and concurrency: turns/s and p50 / p95 turn
+latency.
+
+Modes:
+- fixed: every thread shares one session in an `InMemorySessionService`
+  (the old `AdkAguiAgentServer` behaviour): runs serialise on the session
+  lock and each `get_session` deep-copies the ever-growing shared history.
+- per-thread: session per (user, thread) in an `InMemorySessionService`.
+- sharded: session per (user, thread) in `ShardedInMemorySessionService`.
+
+Run (from src/iax_agrag_agui_lab):
+    python -m benchmarks.load_test_sessions --concurrency 1,8,32,128
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import AsyncGenerator, Callable
+
+import numpy as np
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService, InMemorySessionService
+from google.genai import types
+
+from sessions.sharded_session_service import ShardedInMemorySessionService
+
+APP_NAME = "load_test_app"
+
+
+class StandInAgent(BaseAgent):
+    """Waits like a model call, then writes state like a RAG turn."""
+
+    latency_seconds: float = 0.05
+    events: int = 4
+    payload_chars: int = 2000
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        await asyncio.sleep(self.latency_seconds)
+        for i in range(self.events):
+            yield Event(
+                author=self.name,
+                invocation_id=ctx.invocation_id,
+                branch=ctx.branch,
+                content=types.Content(role="model", parts=[types.Part(text=f"paso {i}")]),
+                actions=EventActions(state_delta={f"step_{i}": "x" * self.payload_chars}),
+            )
+
+
+async def run_mode(
+    make_service: Callable[[], BaseSessionService],
+    shared_session: bool,
+    concurrency: int,
+    args: argparse.Namespace,
+) -> tuple[float, np.ndarray]:
+    service = make_service()
+    agent = StandInAgent(
+        name="StandInAgent",
+        latency_seconds=args.latency_ms / 1000,
+        events=args.events,
+        payload_chars=args.payload_chars,
+    )
+    runner = Runner(app_name=APP_NAME, agent=agent, session_service=service)
+    locks: dict[tuple[str, str], asyncio.Lock] = {}
+    latencies: list[float] = []
+
+    async def conversation(thread: int) -> None:
+        user_id, session_id = ("shared_user", "shared_session") if shared_session else (f"user_{thread}", f"thread_{thread}")
+        key = (user_id, session_id)
+        if key not in locks:
+            locks[key] = asyncio.Lock()
+            await service.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        for turn in range(args.turns):
+            message = types.Content(role="user", parts=[types.Part(text=f"pregunta {turn}")])
+            started = time.perf_counter()
+            async with locks[key]:  # The middleware's per-session lock
+                async for _ in runner.run_async(user_id=user_id, session_id=session_id, new_message=message):
+                    pass
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(conversation(thread) for thread in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return concurrency * args.turns / elapsed, np.array(latencies) * 1000
+
+
+async def main(args: argparse.Namespace) -> None:
+    modes = {
+        "fixed": (InMemorySessionService, True),
+        "per-thread": (InMemorySessionService, False),
+        "sharded": (lambda: ShardedInMemorySessionService(args.shards), False),
+    }
+    print(
+        f"latency={args.latency_ms:.0f}ms  events/turn={args.events}  "
+        f"payload={args.payload_chars} chars  turns/thread={args.turns}"
+    )
+    print(f"{'mode':<11} {'threads':>7} {'turns/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        for mode in args.modes.split(","):
+            make_service, shared = modes[mode]
+            throughput, latencies = await run_mode(make_service, shared, concurrency, args)
+            print(
+                f"{mode:<11} {concurrency:>7} {throughput:>9.1f} "
+                f"{np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 95):>8.1f}"
+            )
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,8,32,128")
+    parser.add_argument("--modes", default="fixed,per-thread,sharded")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--events", type=int, default=4)
+    parser.add_argument("--payload-chars", type=int, default=2000)
+    parser.add_argument("--shards", type=int, default=64)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+"""Profile: import time of the app and of each agent module (`python -X importtime`).
+
+Every module is imported in a fresh interpreter, so each row is a cold import
+(what a cold start or a `--reload` pays). `run_agents` should stay cheap now
+that agents load lazily; the agent rows are what the first request to each
+endpoint (or the background warm-up) pays instead. `--top` lists the slowest
+imports by cumulative time for each row.
+
+Run (from src/iax_agrag_agui_lab):
+    python -m benchmarks.profile_import_time --top 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import time
+
+MODULES = [
+    "run_agents",
+    "agents.hello_agent",
+    "agents.coordinator_agent",
+    "agents.pizza_agent",
+    "agents.agrag.agentic_rag",
+    "agents.agrag.agentic_rag_multi_query",
+    "agents.agrag.workana_rag_agent",
+]
+
+
+def profile(module: str) -> tuple[float, list[tuple[int, str]], str]:
+    """Wall seconds, (cumulative µs, module) per import, and the error if the import failed."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|", 2)
+        imports.append((int(cumulative), name.strip()))
+    error = "" if result.returncode == 0 else result.stderr.strip().splitlines()[-1]
+    return wall, imports, error
+
+
+def main(args: argparse.Namespace) -> None:
+    print(f"{'module':<40} {'wall s':>8} {'imports':>8}")
+    for module in args.modules or MODULES:
+        wall, imports, error = profile(module)
+        print(f"{module:<40} {wall:>8.2f} {len(imports):>8}" + (f"  FAILED: {error}" if error else ""))
+        for cumulative, name in sorted(imports, reverse=True)[: args.top]:
+            print(f"    {cumulative / 1e6:>8.2f}s  {name}")
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", help="modules to profile (default: the app and every agent)")
+    parser.add_argument("--top", type=int, default=0)
+    main(parser.parse_args())
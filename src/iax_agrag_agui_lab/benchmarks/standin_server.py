@@ -0,0 +1,184 @@
+"""Local stand-in for the OpenAI embeddings API and a Pinecone index data plane.
+
+Only implements what the RAG tools touch:
+- `POST /embeddings` (OpenAI): deterministic pseudo-random vectors per input.
+- `POST /query` and `POST /describe_index_stats` (Pinecone data plane).
+
+Latency knobs emulate the remote services so benchmarks measure something real:
+- `connect_delay`: paid once per TCP connection (TLS handshake, DNS, ...).
+- `request_delay`: paid on every request (server-side work).
+
+Usage:
+    with StandinServer(connect_delay=0.05, request_delay=0.01) as server:
+        os.environ["OPENAI_BASE_URL"] = server.url
+        ...
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+
+def fake_embedding(text: str, dimensions: int) -> list[float]:
+    """Deterministic unit-ish vector derived from the text hash."""
+    seed = hashlib.sha256(text.encode("utf-8")).digest()
+    values: list[float] = []
+    counter = 0
+    while len(values) < dimensions:
+        block = hashlib.sha256(seed + counter.to_bytes(4, "little")).digest()
+        values.extend((b - 127.5) / 127.5 for b in block)
+        counter += 1
+    values = values[:dimensions]
+    norm = sum(v * v for v in values) ** 0.5 or 1.0
+    return [v / norm for v in values]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients can reuse sockets
+    server: "_Server"
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.bump("connections")
+        if self.server.connect_delay:
+            time.sleep(self.server.connect_delay)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - stdlib signature
+        return
+
+    def _read_json(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        return json.loads(raw or b"{}")
+
+    def _send_json(self, payload: dict[str, Any], status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802 - stdlib naming
+        self._send_json({"status": "ok"})
+
+    def do_POST(self) -> None:  # noqa: N802 - stdlib naming
+        payload = self._read_json()
+        self.server.bump("requests")
+        if self.server.request_delay:
+            time.sleep(self.server.request_delay)
+
+        path = self.path.rstrip("/")
+        if path.endswith("/embeddings"):
+            self._send_json(self._embeddings(payload))
+        elif path.endswith("/query"):
+            self._send_json(self._query(payload))
+        elif path.endswith("/describe_index_stats"):
+            self._send_json(
+                {"dimension": self.server.dimensions, "namespaces": {}, "totalVectorCount": self.server.corpus_size}
+            )
+        else:
+            self._send_json({"error": f"unknown path {self.path}"}, status=404)
+
+    def _embeddings(self, payload: dict[str, Any]) -> dict[str, Any]:
+        inputs = payload.get("input") or []
+        if isinstance(inputs, (str, int)) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dimensions = int(payload.get("dimensions") or self.server.dimensions)
+        data = []
+        for i, item in enumerate(inputs):
+            vector = fake_embedding(json.dumps(item), dimensions)
+            if payload.get("encoding_format") == "base64":
+                encoded: Any = base64.b64encode(struct.pack(f"<{dimensions}f", *vector)).decode("ascii")
+            else:
+                encoded = vector
+            data.append({"object": "embedding", "index": i, "embedding": encoded})
+        self.server.bump("embedded_inputs", len(inputs))
+        return {
+            "object": "list",
+            "data": data,
+            "model": payload.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": 8 * len(inputs), "total_tokens": 8 * len(inputs)},
+        }
+
+    def _query(self, payload: dict[str, Any]) -> dict[str, Any]:
+        top_k = int(payload.get("topK") or payload.get("top_k") or 5)
+        matches = [
+            {
+                "id": f"chunk-{i}",
+                "score": round(1.0 - i * 0.05, 4),
+                "values": [],
+                "metadata": {"text": f"Contenido de prueba {i}", "source": f"doc-{i}.md"},
+            }
+            for i in range(top_k)
+        ]
+        return {"matches": matches, "namespace": payload.get("namespace", ""), "usage": {"readUnits": 1}}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    connect_delay: float
+    request_delay: float
+    dimensions: int
+    corpus_size: int
+    stats: dict[str, int]
+    stats_lock = threading.Lock()
+
+    def bump(self, key: str, amount: int = 1) -> None:
+        with self.stats_lock:
+            self.stats[key] += amount
+
+
+class StandinServer:
+    """Runs the stand-in on a background thread; usable as a context manager."""
+
+    def __init__(
+        self,
+        connect_delay: float = 0.0,
+        request_delay: float = 0.0,
+        dimensions: int = 1536,
+        corpus_size: int = 1000,
+        port: int = 0,
+    ) -> None:
+        self._httpd = _Server(("127.0.0.1", port), _Handler)
+        self._httpd.connect_delay = connect_delay
+        self._httpd.request_delay = request_delay
+        self._httpd.dimensions = dimensions
+        self._httpd.corpus_size = corpus_size
+        self._httpd.stats = {"connections": 0, "requests": 0, "embedded_inputs": 0}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return self._httpd.stats
+
+    def reset_stats(self) -> None:
+        for key in self._httpd.stats:
+            self._httpd.stats[key] = 0
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StandinServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
@@ -0,0 +1,66 @@
+"""Synthetic embedding corpora for the in-process index benchmarks.
+
+Real chunk embeddings are far from uniform: documents cluster by topic. The
+generator draws vectors around `clusters` random topic centres so ANN and
+quantization behave roughly as they would on the documentation indexes.
+Corpora are written block by block, so sizes larger than RAM are fine.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Iterator
+
+import numpy as np
+
+from retrieval.local_index import LocalIndexWriter, LocalVectorIndex, normalize_rows
+
+BLOCK_ROWS = 8192
+
+
+def clustered_blocks(
+    count: int, dimensions: int, clusters: int = 256, spread: float = 0.6, seed: int = 0
+) -> Iterator[np.ndarray]:
+    rng = np.random.default_rng(seed)
+    centres = normalize_rows(rng.standard_normal((clusters, dimensions), dtype=np.float32))
+    for start in range(0, count, BLOCK_ROWS):
+        rows = min(BLOCK_ROWS, count - start)
+        noise = rng.standard_normal((rows, dimensions), dtype=np.float32)
+        noise *= spread / np.sqrt(dimensions)
+        yield normalize_rows(centres[rng.integers(0, clusters, rows)] + noise)
+
+
+def write_synthetic_index(
+    path: str | os.PathLike, count: int, dimensions: int, seed: int = 0
+) -> LocalVectorIndex:
+    with LocalIndexWriter(path, dimensions, model="synthetic") as writer:
+        row = 0
+        for block in clustered_blocks(count, dimensions, seed=seed):
+            ids = [f"chunk-{row + i}" for i in range(block.shape[0])]
+            writer.add(ids=ids, texts=ids, vectors=block)
+            row += block.shape[0]
+    return LocalVectorIndex(path)
+
+
+def sample_queries(
+    index: LocalVectorIndex, count: int, noise: float = 0.3, seed: int = 1
+) -> np.ndarray:
+    """Perturbed copies of stored vectors: realistic 'paraphrase' queries."""
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(index.count, min(count, index.count), replace=False))
+    base = np.asarray(index.vectors[rows], dtype=np.float32)
+    jitter = rng.standard_normal(base.shape, dtype=np.float32) * noise / np.sqrt(index.dimensions)
+    return normalize_rows(base + jitter)
+
+
+def recall_at_k(exact: list[np.ndarray], approx: list[np.ndarray], k: int) -> float:
+    hits = sum(len(set(e[:k].tolist()) & set(a[:k].tolist())) for e, a in zip(exact, approx))
+    return hits / (k * len(exact)) if exact else 0.0
+
+
+def directory_bytes(path: str | os.PathLike, prefix: str = "") -> int:
+    return sum(
+        entry.stat().st_size
+        for entry in os.scandir(path)
+        if entry.is_file() and entry.name.startswith(prefix)
+    )
@@ -0,0 +1,268 @@
+"""Incremental re-indexing driven by chunk content hashes.
+
+A full run of `ingestion.pipeline` re-embeds the whole corpus even when only a
+handful of help-desk articles changed. `IndexManifest` remembers, per source
+document, the id and content hash of every chunk it produced; an incremental
+run chunks every document again (cheap) but only embeds and upserts the
+chunks whose hash is new or different, deletes the chunks that disappeared
+(a shorter document, or a document no longer in the source) and records the
+run as a new index version.
+
+Chunk ids are positional (`ingestion.pipeline.chunk_id`), so a changed chunk
+overwrites its previous vector in place. Manifest changes are committed only
+after the sink has flushed, so an interrupted run is simply redone next time.
+The manifest is tied to the embedding model: changing it forces a full run.
+
+Run (from src/iax_agrag_agui_lab):
+    python -m ingestion.incremental workana ./exports/workana-helpdesk
+    python -m ingestion.incremental iax ./docs --local data/indexes/iax-documentation
+
+With `--local` the run updates a local index directory instead of Pinecone
+(`LocalSink(incremental=True)`: unchanged chunks are copied over, not
+re-embedded). Rebuild its IVF / quantized / BM25 / metadata structures
+afterwards, as after a full run.
+
+After a run, drop the semantic answers cached for that index
+(`DELETE /semantic-cache?namespace=<index>` on the agent server).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from ingestion.pipeline import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CHUNK_TOKENS,
+    DEFAULT_OVERLAP_TOKENS,
+    Chunk,
+    IngestionStats,
+    SourceDocument,
+    batched,
+    chunk_document,
+    embed_batches,
+    load_documents,
+)
+from ingestion.sinks import ChunkSink
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_hash(chunk: Chunk) -> str:
+    """Hash of everything that ends up in the index record (text and metadata)."""
+    payload = json.dumps(
+        [chunk.text, chunk.metadata], sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    """SQLite record of the chunks currently in one index, and of every run."""
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                document_id TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                version INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chunks_document ON chunks (document_id);
+            CREATE TABLE IF NOT EXISTS runs (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                model TEXT NOT NULL,
+                stats TEXT
+            );
+            """
+        )
+        self.db.commit()
+
+    @property
+    def version(self) -> int:
+        """Latest completed index version (0 when never indexed)."""
+        row = self.db.execute(
+            "SELECT MAX(version) FROM runs WHERE finished_at IS NOT NULL"
+        ).fetchone()
+        return row[0] or 0
+
+    def last_model(self) -> Optional[str]:
+        row = self.db.execute(
+            "SELECT model FROM runs WHERE finished_at IS NOT NULL ORDER BY version DESC LIMIT 1"
+        ).fetchone()
+        return row[0] if row else None
+
+    def begin_run(self, model: str) -> int:
+        cursor = self.db.execute(
+            "INSERT INTO runs (started_at, model) VALUES (?, ?)", (time.time(), model)
+        )
+        self.db.commit()  # The run row survives even if the run itself fails
+        return cursor.lastrowid
+
+    def document_hashes(self, document_id: str) -> dict[str, str]:
+        return dict(
+            self.db.execute(
+                "SELECT chunk_id, hash FROM chunks WHERE document_id = ?", (document_id,)
+            )
+        )
+
+    def document_ids(self) -> set[str]:
+        return {row[0] for row in self.db.execute("SELECT DISTINCT document_id FROM chunks")}
+
+    def record(self, chunks: Iterable[tuple[Chunk, str]], version: int) -> None:
+        self.db.executemany(
+            "INSERT OR REPLACE INTO chunks (chunk_id, document_id, hash, version)"
+            " VALUES (?, ?, ?, ?)",
+            [(c.id, c.metadata["document_id"], digest, version) for c, digest in chunks],
+        )
+
+    def forget(self, chunk_ids: Iterable[str]) -> None:
+        self.db.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(i,) for i in chunk_ids])
+
+    def forget_all(self) -> list[str]:
+        ids = [row[0] for row in self.db.execute("SELECT chunk_id FROM chunks")]
+        self.db.execute("DELETE FROM chunks")
+        return ids
+
+    def finish_run(self, version: int, stats: IngestionStats) -> None:
+        self.db.execute(
+            "UPDATE runs SET finished_at = ?, stats = ? WHERE version = ?",
+            (time.time(), json.dumps(stats.as_dict()), version),
+        )
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def incremental_ingest(
+    documents: Iterable[SourceDocument],
+    embeddings: Embeddings,
+    sink: ChunkSink,
+    manifest: IndexManifest,
+    model: str,
+    prune: bool = True,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_in_flight: int = 4,
+) -> tuple[int, IngestionStats]:
+    """Sync `sink` with `documents`; returns (index version, stats).
+
+    Params:
+        prune: Delete the chunks of manifest documents that `documents` did
+            not yield. Disable when indexing only part of the corpus.
+    """
+    stats = IngestionStats()
+    version = manifest.begin_run(model)
+    seen: set[str] = set()
+    hashes: dict[str, str] = {}
+    try:
+        previous_model = manifest.last_model()
+        if previous_model not in (None, model):
+            logger.warning(
+                "Embedding model changed (%s -> %s): full re-index", previous_model, model
+            )
+            sink.delete(manifest.forget_all())
+
+        def changed_chunks() -> Iterator[Chunk]:
+            for document in documents:
+                stats.documents += 1
+                seen.add(document.id)
+                previous = manifest.document_hashes(document.id)
+                chunks = chunk_document(document, chunk_tokens, overlap_tokens)
+                for chunk in chunks:
+                    digest = chunk_hash(chunk)
+                    if previous.get(chunk.id) == digest:
+                        stats.unchanged_chunks += 1
+                    else:
+                        hashes[chunk.id] = digest
+                        yield chunk
+                removed = previous.keys() - {chunk.id for chunk in chunks}
+                if removed:
+                    _delete(sink, manifest, removed, stats)
+
+        embedded = embed_batches(
+            batched(changed_chunks(), batch_size), embeddings, max_in_flight, stats
+        )
+        for batch, vectors in embedded:
+            sink.write(
+                ids=[c.id for c in batch],
+                texts=[c.text for c in batch],
+                vectors=vectors,
+                metadatas=[c.metadata for c in batch],
+            )
+            manifest.record(((c, hashes.pop(c.id)) for c in batch), version)
+
+        if prune:
+            for document_id in manifest.document_ids() - seen:
+                _delete(sink, manifest, manifest.document_hashes(document_id).keys(), stats)
+        sink.close()
+    except BaseException:
+        manifest.db.rollback()
+        sink.abort()
+        raise
+    manifest.finish_run(version, stats)
+    return version, stats
+
+
+def _delete(
+    sink: ChunkSink, manifest: IndexManifest, chunk_ids: Iterable[str], stats: IngestionStats
+) -> None:
+    chunk_ids = list(chunk_ids)
+    sink.delete(chunk_ids)
+    manifest.forget(chunk_ids)
+    stats.deleted_chunks += len(chunk_ids)
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    import argparse
+
+    from dotenv import load_dotenv
+
+    from ingestion.sinks import LocalSink, PineconeSink
+    from retrieval.registry import retriever_registry
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Incrementally re-index a document folder")
+    parser.add_argument("index", help="Registry key, e.g. 'iax' or 'workana'")
+    parser.add_argument("source", help="File or directory with .md/.txt/.html/.jsonl documents")
+    parser.add_argument("--local", metavar="DIR", help="Update a local index instead of Pinecone")
+    parser.add_argument(
+        "--manifest",
+        help="Defaults to data/indexes/<index_name>.manifest.sqlite (<DIR>.manifest.sqlite with --local)",
+    )
+    parser.add_argument("--no-prune", action="store_true", help="Source is a partial corpus")
+    args = parser.parse_args()
+
+    spec = retriever_registry.spec(args.index)
+    if args.local:
+        # Next to the directory, not inside it: each run swaps the directory.
+        default_manifest = Path(args.local).with_name(f"{Path(args.local).name}.manifest.sqlite")
+        sink = LocalSink(args.local, spec.dimensions, spec.embedding_model, incremental=True)
+    else:
+        default_manifest = Path("data/indexes") / f"{spec.index_name}.manifest.sqlite"
+        sink = PineconeSink(retriever_registry.index(args.index), spec.namespace)
+    manifest = IndexManifest(args.manifest or default_manifest)
+    version, stats = incremental_ingest(
+        load_documents(args.source),
+        retriever_registry.embeddings(spec.embedding_model, spec.dimensions).inner,
+        sink,
+        manifest,
+        model=f"{spec.embedding_model}:{spec.dimensions}",
+        prune=not args.no_prune,
+    )
+    print(json.dumps({"version": version, **stats.as_dict()}, indent=2))
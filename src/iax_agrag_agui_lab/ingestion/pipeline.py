@@ -0,0 +1,326 @@
+"""Streaming ingestion pipeline for the documentation indexes.
+
+Populates `iax-documentation`, the Workana index, or a local index directory
+from a folder of documents. Every stage is a generator, so only a few batches
+are in memory at a time and corpora larger than RAM stream through:
+
+    load_documents -> chunk_documents -> batched -> embed_batches -> sink
+
+- loader: walks a directory of .md/.txt/.html files and .jsonl exports
+  (one `{"id", "text" | "content" | "page_content", "metadata"}` per line);
+- chunker: packs paragraphs into chunks of ~`chunk_tokens`, splitting long
+  paragraphs into overlapping word windows;
+- embedder: at most `max_in_flight` embedding requests run on a thread pool;
+  the upstream generator is only advanced when a slot frees up, which is the
+  backpressure that keeps memory bounded when the API is slower than disk;
+- sink: `ingestion.sinks.PineconeSink` or `ingestion.sinks.LocalSink`.
+
+`IngestionStats` reports documents/sec and embedding tokens/sec.
+
+Run (from src/iax_agrag_agui_lab):
+    python -m ingestion.pipeline workana ./exports/workana-helpdesk
+    python -m ingestion.pipeline iax ./docs --local data/indexes/iax-documentation
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+from ingestion.sinks import ChunkSink
+from retrieval.context_packer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+TEXT_SUFFIXES = {".md", ".markdown", ".txt", ".html", ".htm"}
+JSONL_SUFFIXES = {".jsonl", ".ndjson"}
+DEFAULT_CHUNK_TOKENS = 400
+DEFAULT_OVERLAP_TOKENS = 50
+DEFAULT_BATCH_SIZE = 64  # Chunks per embeddings request
+
+_PARAGRAPH = re.compile(r"\n\s*\n")
+_HTML_TAG = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.S | re.I)
+_HEADING = re.compile(
+    r"^[ \t]*#+[ \t]*([^\n]+)|<title>(.*?)</title>|<h1[^>]*>(.*?)</h1>", re.M | re.I | re.S
+)
+
+
+@dataclass
+class SourceDocument:
+    id: str
+    text: str
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Chunk:
+    id: str
+    text: str
+    metadata: dict[str, Any]
+    tokens: int
+
+
+@dataclass
+class IngestionStats:
+    documents: int = 0
+    chunks: int = 0  # Chunks embedded and written
+    embedding_tokens: int = 0
+    unchanged_chunks: int = 0  # Skipped by incremental runs
+    deleted_chunks: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict[str, float]:
+        elapsed = self.elapsed or 1e-9
+        return {
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "embedding_tokens": self.embedding_tokens,
+            "unchanged_chunks": self.unchanged_chunks,
+            "deleted_chunks": self.deleted_chunks,
+            "elapsed_seconds": round(elapsed, 2),
+            "documents_per_second": round(self.documents / elapsed, 2),
+            "tokens_per_second": round(self.embedding_tokens / elapsed, 1),
+        }
+
+
+def _title(text: str, fallback: Optional[str]) -> Optional[str]:
+    match = _HEADING.search(text)
+    if not match:
+        return fallback
+    title = next(group for group in match.groups() if group)
+    return _HTML_TAG.sub("", title).strip() or fallback
+
+
+def load_documents(root: str | os.PathLike) -> Iterator[SourceDocument]:
+    """Yield documents from `root` (a file or a directory), one at a time."""
+    root = Path(root)
+    paths = [root] if root.is_file() else sorted(p for p in root.rglob("*") if p.is_file())
+    for path in paths:
+        suffix = path.suffix.lower()
+        relative = str(path.relative_to(root)) if path != root else path.name
+        if suffix in JSONL_SUFFIXES:
+            with path.open(encoding="utf-8") as lines:
+                for number, line in enumerate(lines):
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    metadata = dict(record.get("metadata") or {})
+                    text = (
+                        record.get("text") or record.get("content") or record.get("page_content") or ""
+                    )
+                    metadata.setdefault("source", record.get("url") or f"{relative}:{number + 1}")
+                    metadata.setdefault("title", record.get("title") or _title(text, None))
+                    yield SourceDocument(str(record.get("id") or metadata["source"]), text, metadata)
+        elif suffix in TEXT_SUFFIXES:
+            text = path.read_text(encoding="utf-8", errors="replace")
+            title = _title(text, path.stem)
+            if suffix in {".html", ".htm"}:
+                text = _HTML_TAG.sub(" ", text)
+            yield SourceDocument(relative, text, {"source": relative, "title": title})
+
+
+def _windows(words: list[str], size: int, overlap: int) -> Iterator[str]:
+    step = max(size - overlap, 1)
+    for start in range(0, max(len(words) - overlap, 1), step):
+        yield " ".join(words[start : start + size])
+
+
+def split_text(
+    text: str,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+) -> list[str]:
+    """Greedy paragraph packing; paragraphs over the limit become word windows."""
+    pieces: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for paragraph in (p.strip() for p in _PARAGRAPH.split(text)):
+        if not paragraph:
+            continue
+        tokens = count_tokens(paragraph)
+        if current and current_tokens + tokens > chunk_tokens:
+            pieces.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        if tokens > chunk_tokens:
+            # ~0.75 words per token is close enough for sizing the windows.
+            words = paragraph.split()
+            size = max(int(chunk_tokens * 0.75), 1)
+            pieces.extend(_windows(words, size, int(overlap_tokens * 0.75)))
+            continue
+        current.append(paragraph)
+        current_tokens += tokens
+    if current:
+        pieces.append("\n\n".join(current))
+    return pieces
+
+
+def chunk_id(document_id: str, position: int) -> str:
+    """Stable chunk id: the same document and position always map to the same vector."""
+    digest = hashlib.sha1(document_id.encode("utf-8")).hexdigest()[:16]
+    return f"{digest}-{position}"
+
+
+def chunk_document(
+    document: SourceDocument,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+) -> list[Chunk]:
+    return [
+        Chunk(
+            chunk_id(document.id, position),
+            text,
+            {**document.metadata, "document_id": document.id, "chunk": position},
+            count_tokens(text),
+        )
+        for position, text in enumerate(split_text(document.text, chunk_tokens, overlap_tokens))
+    ]
+
+
+def chunk_documents(
+    documents: Iterable[SourceDocument],
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+    stats: Optional[IngestionStats] = None,
+) -> Iterator[Chunk]:
+    for document in documents:
+        if stats is not None:
+            stats.documents += 1
+        yield from chunk_document(document, chunk_tokens, overlap_tokens)
+
+
+def batched(items: Iterable[Chunk], size: int) -> Iterator[list[Chunk]]:
+    batch: list[Chunk] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def embed_batches(
+    batches: Iterable[list[Chunk]],
+    embeddings: Embeddings,
+    max_in_flight: int = 4,
+    stats: Optional[IngestionStats] = None,
+) -> Iterator[tuple[list[Chunk], list[list[float]]]]:
+    """Embed batches on a thread pool, yielding them in input order.
+
+    At most `max_in_flight` requests are pending; `batches` is only pulled
+    again once the oldest one has been handed downstream.
+    """
+    pending: deque[tuple[list[Chunk], Future]] = deque()
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="ingestion") as pool:
+        for batch in batches:
+            if len(pending) >= max_in_flight:
+                yield _finish(pending.popleft(), stats)
+            pending.append((batch, pool.submit(embeddings.embed_documents, [c.text for c in batch])))
+        while pending:
+            yield _finish(pending.popleft(), stats)
+
+
+def _finish(
+    item: tuple[list[Chunk], Future], stats: Optional[IngestionStats]
+) -> tuple[list[Chunk], list[list[float]]]:
+    batch, future = item
+    vectors = future.result()
+    if stats is not None:
+        stats.chunks += len(batch)
+        stats.embedding_tokens += sum(chunk.tokens for chunk in batch)
+    return batch, vectors
+
+
+def write_batches(
+    embedded: Iterable[tuple[Sequence[Chunk], Sequence[Sequence[float]]]],
+    sink: ChunkSink,
+    stats: Optional[IngestionStats] = None,
+    log_every: int = 1000,
+) -> None:
+    next_log = log_every
+    for batch, vectors in embedded:
+        sink.write(
+            ids=[c.id for c in batch],
+            texts=[c.text for c in batch],
+            vectors=vectors,
+            metadatas=[c.metadata for c in batch],
+        )
+        if stats is not None and stats.chunks >= next_log:
+            logger.info("Ingestion progress: %s", stats.as_dict())
+            next_log += log_every
+
+
+def ingest(
+    documents: Iterable[SourceDocument],
+    embeddings: Embeddings,
+    sink: ChunkSink,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_in_flight: int = 4,
+) -> IngestionStats:
+    """Run the full pipeline into `sink` (closed at the end, aborted on failure); returns the stats."""
+    stats = IngestionStats()
+    try:
+        chunks = chunk_documents(documents, chunk_tokens, overlap_tokens, stats)
+        embedded = embed_batches(batched(chunks, batch_size), embeddings, max_in_flight, stats)
+        write_batches(embedded, sink, stats)
+    except BaseException:
+        sink.abort()
+        raise
+    sink.close()
+    return stats
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    import argparse
+
+    from dotenv import load_dotenv
+
+    from ingestion.sinks import LocalSink, PineconeSink
+    from retrieval.registry import retriever_registry
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Index a document folder")
+    parser.add_argument("index", help="Registry key, e.g. 'iax' or 'workana'")
+    parser.add_argument("source", help="File or directory with .md/.txt/.html/.jsonl documents")
+    parser.add_argument("--local", metavar="DIR", help="Write a local index instead of Pinecone")
+    parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=DEFAULT_OVERLAP_TOKENS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    args = parser.parse_args()
+
+    spec = retriever_registry.spec(args.index)
+    # Corpus vectors bypass the query embedding cache: they would only evict useful entries.
+    embedder = retriever_registry.embeddings(spec.embedding_model, spec.dimensions).inner
+    if args.local:
+        sink = LocalSink(args.local, spec.dimensions, spec.embedding_model)
+    else:
+        sink = PineconeSink(retriever_registry.index(args.index), spec.namespace)
+    stats = ingest(
+        load_documents(args.source),
+        embedder,
+        sink,
+        chunk_tokens=args.chunk_tokens,
+        overlap_tokens=args.overlap_tokens,
+        batch_size=args.batch_size,
+        max_in_flight=args.max_in_flight,
+    )
+    print(json.dumps(stats.as_dict(), indent=2))
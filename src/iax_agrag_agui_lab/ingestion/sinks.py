@@ -0,0 +1,190 @@
+"""Destinations for embedded chunks produced by `ingestion.pipeline`.
+
+- `PineconeSink`: bulk upserts into the Pinecone index the RAG tools read,
+  keeping a bounded number of upsert requests in flight.
+- `LocalSink`: writes a local index directory (`retrieval.local_index`),
+  so the whole pipeline, incremental runs included, can run offline.
+
+Both store the chunk text in the "text" metadata field, which is where
+`PineconeVectorStore` and `export_pinecone_index` read it from.
+"""
+
+from __future__ import annotations
+
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any, Optional, Protocol, Sequence
+
+import numpy as np
+
+from retrieval.local_index import MANIFEST_FILE, LocalIndexWriter, LocalVectorIndex
+
+TEXT_KEY = "text"
+
+
+class ChunkSink(Protocol):
+    def write(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        metadatas: Sequence[dict[str, Any]],
+    ) -> None: ...
+
+    def delete(self, ids: Sequence[str]) -> None: ...
+
+    def close(self) -> None: ...
+
+    def abort(self) -> None:
+        """Stop after a failed run, publishing as little of it as the sink allows."""
+        ...
+
+
+def _pinecone_metadata(text: str, metadata: dict[str, Any]) -> dict[str, Any]:
+    # Pinecone only accepts str/number/bool/list[str] values and no nulls.
+    clean = {
+        key: value
+        for key, value in metadata.items()
+        if isinstance(value, (str, int, float, bool))
+        or (isinstance(value, list) and all(isinstance(v, str) for v in value))
+    }
+    clean[TEXT_KEY] = text
+    return clean
+
+
+class PineconeSink:
+    """Upserts into a Pinecone index with at most `max_in_flight` pending requests."""
+
+    def __init__(
+        self,
+        index: Any,
+        namespace: Optional[str] = None,
+        batch_size: int = 100,
+        max_in_flight: int = 4,
+    ) -> None:
+        self.index = index
+        self.namespace = namespace or ""
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self._pending: deque = deque()
+
+    def write(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        metadatas: Sequence[dict[str, Any]],
+    ) -> None:
+        records = [
+            {"id": chunk_id, "values": list(vector), "metadata": _pinecone_metadata(text, meta)}
+            for chunk_id, text, vector, meta in zip(ids, texts, vectors, metadatas)
+        ]
+        for start in range(0, len(records), self.batch_size):
+            # Backpressure: wait for the oldest request before queueing another.
+            while len(self._pending) >= self.max_in_flight:
+                self._pending.popleft().get()
+            self._pending.append(
+                self.index.upsert(
+                    vectors=records[start : start + self.batch_size],
+                    namespace=self.namespace,
+                    async_req=True,
+                )
+            )
+
+    def delete(self, ids: Sequence[str]) -> None:
+        ids = list(ids)
+        for start in range(0, len(ids), 1000):  # Pinecone's per-request limit
+            self.index.delete(ids=ids[start : start + 1000], namespace=self.namespace)
+
+    def close(self) -> None:
+        while self._pending:
+            self._pending.popleft().get()
+
+    def abort(self) -> None:
+        # Upserts already sent cannot be taken back; just settle them.
+        self.close()
+
+
+class LocalSink:
+    """Writes a new local index directory (see `retrieval.local_index`).
+
+    By default the directory is rebuilt from what is written. With
+    `incremental=True` the existing index is the starting point: writes
+    replace chunks with the same id, `delete` drops chunks, and `close`
+    copies every other chunk over (vectors included, nothing is re-embedded)
+    before swapping the new directory in.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        dimensions: int,
+        model: str = "",
+        incremental: bool = False,
+        copy_batch_size: int = 1024,
+    ) -> None:
+        self.base: Optional[LocalVectorIndex] = None
+        if incremental and (Path(path) / MANIFEST_FILE).exists():
+            self.base = LocalVectorIndex(path)
+            if self.base.dimensions != dimensions:
+                raise ValueError(
+                    f"{path} holds {self.base.dimensions}-dimension vectors, not {dimensions}"
+                )
+        self.copy_batch_size = copy_batch_size
+        self.writer = LocalIndexWriter(path, dimensions, model)
+        self._written: set[str] = set()
+        self._deleted: set[str] = set()
+
+    def write(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        metadatas: Sequence[dict[str, Any]],
+    ) -> None:
+        self.writer.add(ids=ids, texts=texts, vectors=vectors, metadatas=metadatas)
+        self._written.update(ids)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        rewritten = self._written.intersection(ids)
+        if rewritten:
+            raise ValueError(f"Cannot delete chunks written in this run: {sorted(rewritten)[:5]}")
+        self._deleted.update(ids)
+
+    def _copy_base(self) -> None:
+        """Carry over the chunks of the previous index that were neither rewritten nor deleted."""
+        rows: list[int] = []
+        ids: list[str] = []
+        texts: list[str] = []
+        metadatas: list[dict[str, Any]] = []
+
+        def flush() -> None:
+            vectors = np.asarray(self.base.vectors[rows])
+            self.writer.add(ids=ids, texts=texts, vectors=vectors, metadatas=metadatas)
+            for batch in (rows, ids, texts, metadatas):
+                batch.clear()
+
+        for row, chunk_id, text, metadata in self.base.chunks.iter_all():
+            if chunk_id in self._written or chunk_id in self._deleted:
+                continue
+            rows.append(row)
+            ids.append(chunk_id)
+            texts.append(text)
+            metadatas.append(metadata)
+            if len(rows) >= self.copy_batch_size:
+                flush()
+        if rows:
+            flush()
+
+    def close(self) -> None:
+        if self.base is not None:
+            try:
+                self._copy_base()
+            except BaseException:
+                self.writer.abort()
+                raise
+        self.writer.close()
+
+    def abort(self) -> None:
+        self.writer.abort()  # The live index is left as it was
@@ -0,0 +1,172 @@
+"""Non-blocking retrieval over the indexes in `retrieval.registry`.
+
+The RAG tools are `async def`, so anything they do synchronously runs on the
+uvicorn event loop and stalls every other SSE stream on the worker. Here the
+query embedding goes through the native async OpenAI client and the vector
+lookup, which only has a blocking client, is offloaded to the registry's
+bounded thread pool.
+
+Each index gets its own semaphore (`max_concurrency`) so a burst on one index
+cannot starve the others; every remote call takes one slot and is bounded by
+`timeout`. `search_many` embeds a whole query list in one batched request and
+then runs the lookups concurrently.
+
+In hybrid mode (`IndexSpec.retrieval_mode`) every lookup also runs a BM25
+search concurrently with the vector one and the two lists are fused by score
+(`retrieval.fusion.hybrid_fuse`).
+
+`filter` is a Pinecone-style metadata filter (see
+`retrieval.metadata_index.build_metadata_filter`); every backend applies it
+before scoring, so top_k is never spent on chunks that would be discarded.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+from langchain_core.documents import Document
+
+from retrieval.fusion import hybrid_fuse
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle only matters for typing
+    from retrieval.registry import RetrieverRegistry
+
+
+VECTOR_MODE = "vector"
+HYBRID_MODE = "hybrid"  # Vector + BM25 (see `retrieval.bm25_index`), scores fused
+
+
+class RetrievalTimeoutError(TimeoutError):
+    """Raised when embedding or vector search exceeds the retriever timeout."""
+
+
+class AsyncRetriever:
+    """Async similarity search against one registered index."""
+
+    def __init__(
+        self,
+        registry: "RetrieverRegistry",
+        name: str,
+        max_concurrency: int = 8,
+        timeout: float = 20.0,
+    ) -> None:
+        self.registry = registry
+        self.spec = registry.spec(name)
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _bounded(self, start: Callable[[], Awaitable[Any]], stage: str) -> Any:
+        # `start` is only invoked once a slot is free, so queued calls do not
+        # occupy executor threads or open connections while they wait.
+        try:
+            async with self._semaphore:
+                return await asyncio.wait_for(start(), self.timeout)
+        except asyncio.TimeoutError:
+            raise RetrievalTimeoutError(
+                f"{stage} on '{self.spec.index_name}' took longer than {self.timeout}s"
+            ) from None
+
+    async def embed(self, question: str) -> list[float]:
+        embeddings = self.registry.embeddings(self.spec.embedding_model, self.spec.dimensions)
+        return await self._bounded(lambda: embeddings.aembed_query(question), "Embedding")
+
+    async def embed_many(self, questions: list[str]) -> list[list[float]]:
+        """One embeddings request for the whole batch."""
+        embeddings = self.registry.embeddings(self.spec.embedding_model, self.spec.dimensions)
+        return await self._bounded(lambda: embeddings.aembed_documents(questions), "Embedding")
+
+    async def search_by_vector(
+        self, vector: list[float], top_k: int = 5, filter: Optional[dict[str, Any]] = None
+    ) -> list[tuple[Document, float]]:
+        store = self.registry.vector_store(self.spec.name)
+        loop = asyncio.get_running_loop()
+        call = functools.partial(
+            store.similarity_search_by_vector_with_score,
+            vector,
+            k=top_k,
+            filter=filter,
+            namespace=self.spec.namespace,
+        )
+        return await self._bounded(
+            lambda: loop.run_in_executor(self.registry.executor, call), "Vector search"
+        )
+
+    async def search_lexical(
+        self, question: str, top_k: int = 5, filter: Optional[dict[str, Any]] = None
+    ) -> list[tuple[Document, float]]:
+        index = self.registry.lexical_index(self.spec.name)
+        loop = asyncio.get_running_loop()
+        call = functools.partial(
+            index.similarity_search_with_score, question, k=top_k, filter=filter
+        )
+        return await self._bounded(
+            lambda: loop.run_in_executor(self.registry.executor, call), "Lexical search"
+        )
+
+    async def _lookup(
+        self,
+        question: str,
+        vector: list[float],
+        top_k: int,
+        mode: Optional[str],
+        filter: Optional[dict[str, Any]],
+    ) -> list[tuple[Document, float]]:
+        if (mode or self.spec.retrieval_mode) != HYBRID_MODE:
+            return await self.search_by_vector(vector, top_k, filter)
+        # A wider candidate pool per side, so chunks ranked just below top_k
+        # by one method can still be lifted by the other.
+        candidates = top_k * 3
+        vector_hits, lexical_hits = await asyncio.gather(
+            self.search_by_vector(vector, candidates, filter),
+            self.search_lexical(question, candidates, filter),
+        )
+        return hybrid_fuse(vector_hits, lexical_hits, top_k, self.spec.hybrid_alpha)
+
+    async def search_with_scores(
+        self,
+        question: str,
+        top_k: int = 5,
+        mode: Optional[str] = None,
+        filter: Optional[dict[str, Any]] = None,
+        vector: Optional[list[float]] = None,
+    ) -> list[tuple[Document, float]]:
+        """`mode` overrides the index's retrieval mode ("vector" or "hybrid").
+
+        Pass `vector` when the question is already embedded with this index's model.
+        """
+        if vector is None:
+            vector = await self.embed(question)
+        return await self._lookup(question, vector, top_k, mode, filter)
+
+    async def search(
+        self, question: str, top_k: int = 5, filter: Optional[dict[str, Any]] = None
+    ) -> list[Document]:
+        return [doc for doc, _ in await self.search_with_scores(question, top_k, filter=filter)]
+
+    async def search_many_with_scores(
+        self,
+        questions: list[str],
+        top_k: int = 5,
+        mode: Optional[str] = None,
+        filter: Optional[dict[str, Any]] = None,
+    ) -> list[list[tuple[Document, float]]]:
+        """Results for each question, in the same order as `questions`."""
+        if not questions:
+            return []
+        vectors = await self.embed_many(questions)
+        return list(
+            await asyncio.gather(
+                *(
+                    self._lookup(question, vector, top_k, mode, filter)
+                    for question, vector in zip(questions, vectors)
+                )
+            )
+        )
+
+    async def search_many(
+        self, questions: list[str], top_k: int = 5, filter: Optional[dict[str, Any]] = None
+    ) -> list[list[Document]]:
+        hits = await self.search_many_with_scores(questions, top_k, filter=filter)
+        return [[doc for doc, _ in per_query] for per_query in hits]
@@ -0,0 +1,222 @@
+"""In-process BM25 inverted index over the chunks of a local index.
+
+Help-desk questions often hinge on exact terms (plan names, fee percentages,
+project states such as "TRABAJANDO") that embedding search ranks no better
+than their neighbours. The lexical index is built from the same
+`chunks.sqlite` as `retrieval.local_index`, so its rows are the vector rows
+and both result lists share chunk ids.
+
+Postings are stored CSR-style in flat numpy arrays next to the local index:
+- `bm25.json`: parameters (k1, b), chunk count, average length and the build
+  id of the local index
+- `bm25_vocab.json`: term -> term id
+- `bm25_offsets.npy`: start of each term's postings (terms + 1 entries)
+- `bm25_rows.npy`: chunk row of every posting (int32), grouped by term
+- `bm25_tfs.npy`: term frequency of every posting (uint16)
+- `bm25_lengths.npy`: token count of every chunk
+
+A query gathers the postings slices of its terms and accumulates the BM25
+contributions with `np.bincount`; nothing is scored per document in Python.
+
+Build (from src/iax_agrag_agui_lab), after exporting the local index:
+    python -m retrieval.bm25_index build data/indexes/workana
+
+and enable hybrid search with `RAG_WORKANA_RETRIEVAL_MODE=hybrid` (the index
+directory is `RAG_WORKANA_INDEX_DIR`, whatever the vector backend is).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from retrieval.local_index import CHUNKS_FILE, ChunkStore, read_build_id, replacing, top_k_indices
+from retrieval.metadata_index import MetadataIndex
+
+BM25_PARAMS_FILE = "bm25.json"
+BM25_VOCAB_FILE = "bm25_vocab.json"
+BM25_OFFSETS_FILE = "bm25_offsets.npy"
+BM25_ROWS_FILE = "bm25_rows.npy"
+BM25_TFS_FILE = "bm25_tfs.npy"
+BM25_LENGTHS_FILE = "bm25_lengths.npy"
+
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+_TOKEN = re.compile(r"\w+")
+# Function words common enough to carry no signal in either language.
+_STOPWORDS = frozenset(
+    "a al con de del el en es la las lo los o para por que se su un una y "
+    "the of to and in is for on".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Casefolded, accent-free word tokens ("Cómo" and "como" are one term)."""
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return [t for t in _TOKEN.findall(folded) if t not in _STOPWORDS]
+
+
+def build_bm25(path: str | os.PathLike, k1: float = DEFAULT_K1, b: float = DEFAULT_B) -> dict[str, Any]:
+    """Build the postings for the local index at `path`; returns the parameters."""
+    path = Path(path)
+    build_id = read_build_id(path)
+    vocab: dict[str, int] = {}
+    term_rows: list[list[int]] = []
+    term_tfs: list[list[int]] = []
+    lengths: list[int] = []
+    for row, _, text, metadata in ChunkStore(path / CHUNKS_FILE).iter_all():
+        if row != len(lengths):
+            raise ValueError(f"{path}: chunk rows are not contiguous (row {row})")
+        # Titles are short and precise: index them with the body.
+        tokens = tokenize(f"{metadata.get('title') or ''} {text}")
+        lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            term_id = vocab.setdefault(term, len(vocab))
+            if term_id == len(term_rows):
+                term_rows.append([])
+                term_tfs.append([])
+            term_rows[term_id].append(row)
+            term_tfs[term_id].append(min(tf, np.iinfo(np.uint16).max))
+
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(r) for r in term_rows])
+    rows = np.fromiter((r for rs in term_rows for r in rs), dtype=np.int32, count=int(offsets[-1]))
+    tfs = np.fromiter((t for ts in term_tfs for t in ts), dtype=np.uint16, count=int(offsets[-1]))
+
+    arrays = (
+        (BM25_OFFSETS_FILE, offsets),
+        (BM25_ROWS_FILE, rows),
+        (BM25_TFS_FILE, tfs),
+        (BM25_LENGTHS_FILE, np.asarray(lengths, dtype=np.float32)),
+    )
+    for name, array in arrays:
+        with replacing(path / name) as tmp:
+            np.save(tmp, array)
+    with replacing(path / BM25_VOCAB_FILE) as tmp:
+        tmp.write_text(json.dumps(vocab, ensure_ascii=False))
+    params = {
+        "k1": k1,
+        "b": b,
+        "count": len(lengths),
+        "terms": len(vocab),
+        "postings": int(offsets[-1]),
+        "avg_length": float(np.mean(lengths)) if lengths else 0.0,
+        "build_id": build_id,
+    }
+    with replacing(path / BM25_PARAMS_FILE) as tmp:
+        tmp.write_text(json.dumps(params, indent=2))
+    return params
+
+
+class BM25Index:
+    """Lexical search over a local index directory built with `build_bm25`."""
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = Path(path)
+        params_path = self.path / BM25_PARAMS_FILE
+        self.params = json.loads(params_path.read_text()) if params_path.exists() else {}
+        if self.params.get("build_id") != read_build_id(self.path):
+            raise ValueError(f"BM25 postings at {self.path} are missing or stale; rebuild them")
+        self.count = int(self.params["count"])
+        self.build_id = self.params["build_id"]
+        self.vocab: dict[str, int] = json.loads((self.path / BM25_VOCAB_FILE).read_text())
+        self.offsets = np.load(self.path / BM25_OFFSETS_FILE)
+        self.rows = np.load(self.path / BM25_ROWS_FILE, mmap_mode="r")
+        self.tfs = np.load(self.path / BM25_TFS_FILE, mmap_mode="r")
+        self.chunks = ChunkStore(self.path / CHUNKS_FILE)
+        k1, b = self.params["k1"], self.params["b"]
+        lengths = np.load(self.path / BM25_LENGTHS_FILE)
+        avg_length = self.params["avg_length"] or 1.0
+        # Per-chunk part of the BM25 denominator, precomputed once.
+        self._norms = (k1 * (1 - b + b * lengths / avg_length)).astype(np.float32)
+        self._k1 = k1
+        document_frequency = np.diff(self.offsets).astype(np.float64)
+        self._idf = np.log1p(
+            (self.count - document_frequency + 0.5) / (document_frequency + 0.5)
+        ).astype(np.float32)
+        self._metadata: Optional[MetadataIndex] = None
+
+    def filter_rows(self, filter: Optional[dict[str, Any]]) -> Optional[np.ndarray]:
+        """Sorted rows matching `filter`, or None when there is nothing to filter."""
+        if not filter:
+            return None
+        if self._metadata is None:
+            self._metadata = MetadataIndex.require(self.path, self.count, self.build_id)
+        return self._metadata.matching_rows(filter)
+
+    def scores(self, query: str, allowed: Optional[np.ndarray] = None) -> np.ndarray:
+        """BM25 score of every chunk for `query` (zeros when nothing matches).
+
+        `allowed` is a boolean mask over the rows: postings of other rows are
+        dropped before any contribution is computed.
+        """
+        term_ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if not term_ids or not self.count:
+            return np.zeros(self.count, dtype=np.float32)
+        slices = [slice(self.offsets[t], self.offsets[t + 1]) for t in term_ids]
+        rows = np.concatenate([self.rows[s] for s in slices])
+        tfs = np.concatenate([self.tfs[s] for s in slices]).astype(np.float32)
+        idf = np.repeat(self._idf[term_ids], [s.stop - s.start for s in slices])
+        if allowed is not None:
+            keep = allowed[rows]
+            rows, tfs, idf = rows[keep], tfs[keep], idf[keep]
+        contributions = idf * tfs * (self._k1 + 1) / (tfs + self._norms[rows])
+        return np.bincount(rows, weights=contributions, minlength=self.count).astype(np.float32)
+
+    def search_rows(
+        self, query: str, k: int, rows: Optional[np.ndarray] = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k matching rows (among `rows` if given) and their scores, best first.
+
+        May return fewer than k.
+        """
+        allowed = None
+        if rows is not None:
+            allowed = np.zeros(self.count, dtype=bool)
+            allowed[rows] = True
+        scores = self.scores(query, allowed)
+        rows = top_k_indices(scores, k)
+        rows = rows[scores[rows] > 0]
+        return rows, scores[rows]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict[str, Any]] = None
+    ) -> list[tuple[Document, float]]:
+        rows, scores = self.search_rows(query, k, rows=self.filter_rows(filter))
+        return [
+            (Document(id=chunk_id, page_content=text, metadata=metadata), float(score))
+            for (chunk_id, text, metadata), score in zip(self.chunks.get(rows.tolist()), scores)
+        ]
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    import argparse
+
+    parser = argparse.ArgumentParser(description="BM25 lexical index utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build BM25 postings for a local index")
+    build.add_argument("path")
+    build.add_argument("--k1", type=float, default=DEFAULT_K1)
+    build.add_argument("--b", type=float, default=DEFAULT_B)
+    search = sub.add_parser("search", help="Query a BM25 index")
+    search.add_argument("path")
+    search.add_argument("queries", nargs="+")
+    search.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+    if args.command == "build":
+        print(json.dumps(build_bm25(args.path, args.k1, args.b), indent=2))
+    else:
+        index = BM25Index(args.path)
+        for query in args.queries:
+            print(f"\n{query}")
+            for doc, score in index.similarity_search_with_score(query, args.k):
+                print(f"  {score:7.3f}  {doc.id}  {doc.page_content[:80]!r}")
@@ -0,0 +1,172 @@
+"""Token-budgeted packing of retrieved chunks for the synthesizer prompts.
+
+The RAG tools used to return `doc.model_dump()` verbatim: the whole
+`page_content`, every metadata field and the pydantic envelope, all of which
+ended up in session state and in the synthesizer prompt. Long help-desk
+articles made both slow and expensive.
+
+The packer projects each chunk to the fields the prompts use (content, source,
+title, score) and fits the list into a token budget: chunks that fit are kept
+whole, long ones share the rest and are truncated at a sentence or word
+boundary, and the lowest ranked are dropped if the share would fall below
+`min_chunk_tokens`. Every call returns a `PackingReport` with the token
+counts before and after.
+
+Tokens are counted with tiktoken (already installed through langchain-openai)
+and estimated at ~4 characters per token if its encoding cannot be loaded.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import os
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Iterable, Optional, Sequence
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+MIN_CHUNK_TOKENS = 64
+_ELLIPSIS = " […]"
+_BOUNDARY = re.compile(r"(?s).*[.!?\n](?=\s)|.*\s")
+_CHUNK_OVERHEAD_TOKENS = 12  # Keys, quotes and separators of one packed chunk
+
+
+@dataclass
+class PackingReport:
+    chunks_before: int
+    chunks_after: int
+    tokens_before: int
+    tokens_after: int
+    truncated: int
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding() -> Optional[Any]:
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:  # Not installed, or the BPE file cannot be fetched
+        logger.warning("tiktoken unavailable (%s); estimating tokens from characters", e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of `text` within `max_tokens`, cut at a sentence or word end."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    max_tokens = max(max_tokens - count_tokens(_ELLIPSIS), 0)
+    encoding = _encoding()
+    if encoding is None:
+        prefix = text[: max_tokens * 4]
+    else:
+        prefix = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    boundary = _BOUNDARY.match(prefix)
+    if boundary and len(boundary.group(0)) > len(prefix) // 2:
+        prefix = boundary.group(0)
+    return prefix.rstrip() + _ELLIPSIS
+
+
+def project_document(doc: Document, score: Optional[float] = None) -> dict[str, Any]:
+    """The fields of a retrieved chunk the synthesizer prompts actually use."""
+    metadata = doc.metadata or {}
+    chunk: dict[str, Any] = {
+        "content": doc.page_content,
+        "source": metadata.get("source") or metadata.get("url"),
+        "title": metadata.get("title"),
+    }
+    if score is not None:
+        chunk["score"] = round(float(score), 4)
+    return chunk
+
+
+def _json_tokens(value: Any) -> int:
+    return count_tokens(json.dumps(value, ensure_ascii=False, default=str))
+
+
+def _fair_share(sizes: Sequence[int], available: int) -> int:
+    """Largest per-chunk cap such that sum(min(size, cap)) fits in `available`."""
+    remaining, pending = available, len(sizes)
+    for size in sorted(sizes):
+        if size * pending > remaining:
+            return remaining // pending
+        remaining -= size
+        pending -= 1
+    return max(sizes, default=0)
+
+
+def pack_chunks(
+    chunks: Sequence[dict[str, Any]],
+    budget_tokens: int = CONTEXT_TOKEN_BUDGET,
+    min_chunk_tokens: int = MIN_CHUNK_TOKENS,
+    tokens_before: Optional[int] = None,
+) -> tuple[list[dict[str, Any]], PackingReport]:
+    """Fit `chunks` (best first, each with a "content" key) into `budget_tokens`.
+
+    Short chunks are kept whole and the long ones share what is left equally,
+    so one large article cannot crowd out the rest. Chunks are dropped from
+    the tail while the share would fall below `min_chunk_tokens`.
+
+    Params:
+        tokens_before: Size of what the caller would have sent unpacked; the
+            JSON size of `chunks` when omitted.
+    """
+    fields = [{k: v for k, v in c.items() if k != "content" and v is not None} for c in chunks]
+    overheads = [_json_tokens(f) + _CHUNK_OVERHEAD_TOKENS for f in fields]
+    contents = [c.get("content") or "" for c in chunks]
+    sizes = [count_tokens(text) for text in contents]
+
+    kept = len(chunks)
+    while kept:
+        available = budget_tokens - sum(overheads[:kept])
+        cap = _fair_share(sizes[:kept], available)
+        if cap >= min(min_chunk_tokens, max(sizes[:kept])):
+            break
+        kept -= 1
+
+    packed: list[dict[str, Any]] = []
+    truncated = 0
+    for i in range(kept):
+        content = contents[i]
+        if sizes[i] > cap:
+            content = truncate_to_tokens(content, cap)
+            truncated += 1
+        packed.append({**fields[i], "content": content})
+
+    report = PackingReport(
+        chunks_before=len(chunks),
+        chunks_after=len(packed),
+        tokens_before=_json_tokens(list(chunks)) if tokens_before is None else tokens_before,
+        tokens_after=_json_tokens(packed),
+        truncated=truncated,
+    )
+    return packed, report
+
+
+def pack_documents(
+    scored_documents: Iterable[tuple[Document, float]],
+    budget_tokens: int = CONTEXT_TOKEN_BUDGET,
+) -> tuple[list[dict[str, Any]], PackingReport]:
+    """`pack_chunks` over raw search results; "before" is their `model_dump()` size."""
+    scored_documents = list(scored_documents)
+    return pack_chunks(
+        [project_document(doc, score) for doc, score in scored_documents],
+        budget_tokens,
+        tokens_before=_json_tokens([doc.model_dump() for doc, _ in scored_documents]),
+    )
@@ -0,0 +1,281 @@
+"""Two-tier embedding cache in front of the embeddings API.
+
+Users ask the same help-desk questions over and over, and the query generators
+keep producing the same queries, yet every one was re-embedded with
+`text-embedding-3-small`. `CachedEmbeddings` wraps any LangChain `Embeddings`
+and only forwards the texts it has never seen:
+
+- memory tier: per-process LRU (`memory_entries` vectors)
+- disk tier: SQLite file shared by every worker on the host, evicted by least
+  recent use once it grows past `max_disk_bytes`
+
+Entries are keyed on (model, dimensions, normalised text), so two models or two
+dimension settings never share vectors. Hit/miss counters are exposed through
+`EmbeddingCache.stats()`.
+
+The async path (`aembed_documents`, used by `AsyncRetriever`) answers memory
+hits inline and only sends the SQLite work (lookups, inserts, eviction, and
+any wait on another worker's write lock) to a thread, so the event loop never
+blocks on the disk tier.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFKC, casefolded, single spaces."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+def cache_key(model: str, dimensions: int, text: str) -> str:
+    payload = f"{model}\x00{dimensions}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Vector storage shared by every `CachedEmbeddings` of the process."""
+
+    def __init__(
+        self,
+        path: Optional[str | os.PathLike] = None,
+        memory_entries: int = 4096,
+        max_disk_bytes: int = 256 * 2**20,
+    ) -> None:
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        # Memory tier and counters; never held across SQLite calls, so memory
+        # hits do not wait behind a disk write.
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        # Estimate of the file size: other workers write to it too, so it is
+        # re-read from SQLite before deciding to evict.
+        self._disk_bytes = 0
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"
+            )
+            self._disk_bytes = self._stored_bytes()
+
+    def _get_memory(self, keys: Sequence[str]) -> tuple[list[Optional[np.ndarray]], list[int]]:
+        """Memory hits, and the positions still to look up on disk."""
+        found: list[Optional[np.ndarray]] = [None] * len(keys)
+        disk_lookups: list[int] = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    found[i] = vector
+                else:
+                    disk_lookups.append(i)
+            if self._db is None:
+                self._counters["misses"] += len(disk_lookups)
+        return found, disk_lookups
+
+    def _get_disk(
+        self, keys: Sequence[str], found: list[Optional[np.ndarray]], disk_lookups: list[int]
+    ) -> list[Optional[np.ndarray]]:
+        """Fill `found` at `disk_lookups` from SQLite (blocking)."""
+        wanted = {keys[i] for i in disk_lookups}
+        placeholders = ",".join("?" * len(wanted))
+        with self._db_lock:
+            rows = dict(
+                self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    list(wanted),
+                ).fetchall()
+            )
+            if rows:
+                self._db.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(time.time(), key) for key in rows],
+                )
+        with self._lock:
+            for i in disk_lookups:
+                blob = rows.get(keys[i])
+                if blob is not None:
+                    found[i] = np.frombuffer(blob, dtype=np.float32)
+                    self._remember(keys[i], found[i])
+                    self._counters["disk_hits"] += 1
+                else:
+                    self._counters["misses"] += 1
+        return found
+
+    def get_many(self, keys: Sequence[str]) -> list[Optional[np.ndarray]]:
+        found, disk_lookups = self._get_memory(keys)
+        if disk_lookups and self._db is not None:
+            self._get_disk(keys, found, disk_lookups)
+        return found
+
+    async def aget_many(self, keys: Sequence[str]) -> list[Optional[np.ndarray]]:
+        """`get_many` with the disk tier off the event loop."""
+        found, disk_lookups = self._get_memory(keys)
+        if disk_lookups and self._db is not None:
+            await asyncio.to_thread(self._get_disk, keys, found, disk_lookups)
+        return found
+
+    def _put_memory(self, keys: Sequence[str], vectors: Sequence[Sequence[float]]) -> list[np.ndarray]:
+        arrays = [np.asarray(v, dtype=np.float32) for v in vectors]
+        with self._lock:
+            for key, vector in zip(keys, arrays):
+                self._remember(key, vector)
+        return arrays
+
+    def _put_disk(self, keys: Sequence[str], arrays: Sequence[np.ndarray]) -> None:
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                [(key, vector.tobytes(), time.time()) for key, vector in zip(keys, arrays)],
+            )
+            self._disk_bytes += sum(vector.nbytes for vector in arrays)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def put_many(self, keys: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        arrays = self._put_memory(keys, vectors)
+        if self._db is not None:
+            self._put_disk(keys, arrays)
+
+    async def aput_many(self, keys: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """`put_many` with the disk tier off the event loop."""
+        arrays = self._put_memory(keys, vectors)
+        if self._db is not None:
+            await asyncio.to_thread(self._put_disk, keys, arrays)
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _stored_bytes(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def _evict_disk(self) -> None:
+        # The estimate overcounts replaced keys and misses other workers'
+        # writes: decide on what the file actually holds.
+        self._disk_bytes = self._stored_bytes()
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        # Drop the least recently used entries until we are 10% under the cap.
+        target = int(self.max_disk_bytes * 0.9)
+        cursor = self._db.execute(
+            "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_access ASC"
+        )
+        doomed: list[str] = []
+        excess = self._disk_bytes - target
+        for key, size in cursor:
+            if excess <= 0:
+                break
+            doomed.append(key)
+            excess -= size
+        self._db.executemany("DELETE FROM embeddings WHERE key = ?", [(k,) for k in doomed])
+        self._disk_bytes = self._stored_bytes()
+        with self._lock:
+            self._counters["evictions"] += len(doomed)
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            counters = dict(self._counters)
+            lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+            counters["hit_rate"] = (
+                (counters["memory_hits"] + counters["disk_hits"]) / lookups if lookups else 0.0
+            )
+            counters["memory_entries"] = len(self._memory)
+            counters["disk_bytes"] = self._disk_bytes
+        return counters
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class CachedEmbeddings(Embeddings):
+    """`Embeddings` that consults an `EmbeddingCache` before calling `inner`."""
+
+    def __init__(
+        self, inner: Embeddings, cache: EmbeddingCache, model: str, dimensions: int
+    ) -> None:
+        self.inner = inner
+        self.cache = cache
+        self.model = model
+        self.dimensions = dimensions
+
+    def _keys(self, texts: Sequence[str]) -> list[str]:
+        return [cache_key(self.model, self.dimensions, t) for t in texts]
+
+    @staticmethod
+    def _missing(keys: list[str], found: list[Optional[np.ndarray]]) -> list[int]:
+        # Embed each distinct missing key once, even if repeated in the batch.
+        missing: dict[str, int] = {}
+        for i, vector in enumerate(found):
+            if vector is None:
+                missing.setdefault(keys[i], i)
+        return list(missing.values())
+
+    @staticmethod
+    def _merge(
+        keys: list[str],
+        found: list[Optional[np.ndarray]],
+        missing: list[int],
+        fresh: list[list[float]],
+    ) -> list[list[float]]:
+        if missing:
+            by_key = {keys[i]: vector for i, vector in zip(missing, fresh)}
+            found = [v if v is not None else by_key[k] for k, v in zip(keys, found)]
+        return [np.asarray(v, dtype=np.float32).tolist() for v in found]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = self._keys(texts)
+        found = self.cache.get_many(keys)
+        missing = self._missing(keys, found)
+        fresh = self.inner.embed_documents([texts[i] for i in missing]) if missing else []
+        if missing:
+            self.cache.put_many([keys[i] for i in missing], fresh)
+        return self._merge(keys, found, missing, fresh)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = self._keys(texts)
+        found = await self.cache.aget_many(keys)
+        missing = self._missing(keys, found)
+        fresh = await self.inner.aembed_documents([texts[i] for i in missing]) if missing else []
+        if missing:
+            await self.cache.aput_many([keys[i] for i in missing], fresh)
+        return self._merge(keys, found, missing, fresh)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
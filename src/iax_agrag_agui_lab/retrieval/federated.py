@@ -0,0 +1,125 @@
+"""Federated search: one question against every registered index at once.
+
+A question that straddles IAX and the Workana help desk used to cost two full
+RAG pipelines, run one after the other through agent transfers. The federated
+search embeds the question once per embedding model, queries every index
+concurrently (each through its own `AsyncRetriever`, so the per-index
+semaphores and timeouts still apply) and merges the hits into one list tagged
+with the index they came from.
+
+Scores are comparable once normalised: both retrieval modes return bounded
+scores (cosine, or the hybrid blend in [0, 1]), so each score is clamped to
+[0, 1] and divided by the best score over all indexes; the top hit is 1.0 and
+the others read as a fraction of it. Hits under `min_relative_score` are
+dropped, which keeps the weak matches of an off-topic index out of a
+single-domain answer. An index that fails or times out is reported in
+`FederatedResult.errors` instead of failing the whole search.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+from langchain_core.documents import Document
+
+from retrieval.fusion import chunk_key
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle only matters for typing
+    from retrieval.registry import IndexSpec, RetrieverRegistry
+
+logger = logging.getLogger(__name__)
+
+FEDERATED_MIN_RELATIVE_SCORE = float(os.getenv("RAG_FEDERATED_MIN_RELATIVE_SCORE", "0.5"))
+
+
+@dataclass
+class FederatedHit:
+    index: str  # Registry key of the index the chunk came from
+    document: Document
+    score: float  # Normalised: 1.0 is the best hit across all indexes
+    raw_score: float
+
+
+@dataclass
+class FederatedResult:
+    hits: list[FederatedHit] = field(default_factory=list)
+    errors: dict[str, str] = field(default_factory=dict)  # Index -> error message
+
+
+def merge_federated(
+    per_index: dict[str, list[tuple[Document, float]]],
+    top_k: int,
+    min_relative_score: float = FEDERATED_MIN_RELATIVE_SCORE,
+) -> list[FederatedHit]:
+    """Normalise and merge per-index hit lists; duplicates keep their best copy."""
+    clamped = {
+        name: [(doc, score, min(max(float(score), 0.0), 1.0)) for doc, score in hits]
+        for name, hits in per_index.items()
+    }
+    best = max((c for hits in clamped.values() for _, _, c in hits), default=0.0) or 1.0
+    merged: dict[str, FederatedHit] = {}
+    for name, hits in clamped.items():  # Registry order breaks score ties
+        for doc, raw, score in hits:
+            hit = FederatedHit(name, doc, round(score / best, 6), float(raw))
+            if hit.score < min_relative_score:
+                continue
+            key = chunk_key(doc)
+            if key not in merged or hit.score > merged[key].score:
+                merged[key] = hit
+    ranked = sorted(merged.values(), key=lambda hit: hit.score, reverse=True)
+    return ranked[:top_k]
+
+
+async def federated_search(
+    registry: "RetrieverRegistry",
+    question: str,
+    top_k: int = 5,
+    names: Optional[Iterable[str]] = None,
+    filter: Optional[dict[str, Any]] = None,
+    min_relative_score: float = FEDERATED_MIN_RELATIVE_SCORE,
+) -> FederatedResult:
+    """Search `names` (default: every registered index) concurrently.
+
+    Each index contributes up to `top_k` hits, and the merged list is cut to
+    `top_k` as well.
+    """
+    specs = [registry.spec(name) for name in names] if names else registry.specs()
+    by_model: dict[tuple[str, int], list["IndexSpec"]] = {}
+    for spec in specs:
+        by_model.setdefault((spec.embedding_model, spec.dimensions), []).append(spec)
+
+    result = FederatedResult()
+    per_index: dict[str, list[tuple[Document, float]]] = {}
+
+    async def search_group(group: list["IndexSpec"]) -> None:
+        # Indexes sharing an embedding model share the query vector.
+        try:
+            vector = await registry.retriever(group[0].name).embed(question)
+        except Exception as exc:
+            for spec in group:
+                result.errors[spec.name] = str(exc)
+            return
+        outcomes = await asyncio.gather(
+            *(
+                registry.retriever(spec.name).search_with_scores(
+                    question, top_k=top_k, filter=filter, vector=vector
+                )
+                for spec in group
+            ),
+            return_exceptions=True,
+        )
+        for spec, outcome in zip(group, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.warning("Federated search on '%s' failed: %s", spec.name, outcome)
+                result.errors[spec.name] = str(outcome)
+            else:
+                per_index[spec.name] = outcome
+
+    await asyncio.gather(*(search_group(group) for group in by_model.values()))
+    ordered = {spec.name: per_index[spec.name] for spec in specs if spec.name in per_index}
+    result.hits = merge_federated(ordered, top_k, min_relative_score)
+    return result
@@ -0,0 +1,202 @@
+"""Fusion of multi-query retrieval results: RRF, dedup and MMR.
+
+The multi-query synthesizers used to receive every per-query hit list and were
+asked to "eliminate redundancies" themselves, so the same chunk reached the
+prompt once per query that found it. `fuse_hits` does that work in code:
+
+1. reciprocal rank fusion (RRF) merges the per-query rankings into one list,
+   rewarding chunks several queries agree on; exact duplicates (same id, or
+   same normalised text) collapse into one entry;
+2. near duplicates are dropped, keeping the best ranked copy: by embedding
+   cosine when chunk vectors are given, by word-shingle Jaccard otherwise;
+3. optionally, maximal marginal relevance (MMR) re-orders the survivors to
+   trade relevance for novelty, vectorised over the candidate matrix.
+
+RRF ties are broken by first appearance (query order, then rank), so the same
+hits always produce the same output.
+
+`hybrid_fuse` combines the vector and BM25 result lists of one query (see
+`retrieval.bm25_index`) by score rather than by rank.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from retrieval.local_index import normalize_rows
+
+RRF_K = 60  # Damping constant from the original RRF paper
+NEAR_DUPLICATE_COSINE = 0.97
+NEAR_DUPLICATE_JACCARD = 0.8
+_SHINGLE_WORDS = 3
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class FusedHit:
+    document: Document
+    rrf_score: float = 0.0
+    best_score: float = float("-inf")  # Best similarity across the queries
+    queries: list[str] = field(default_factory=list)
+
+
+def chunk_key(doc: Document) -> str:
+    """Identity of a chunk: its id, or a hash of its normalised text."""
+    if doc.id:
+        return doc.id
+    text = " ".join(_WORD.findall((doc.page_content or "").casefold()))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def reciprocal_rank_fusion(
+    queries: Sequence[str],
+    hits: Sequence[Sequence[tuple[Document, float]]],
+    k: int = RRF_K,
+) -> list[FusedHit]:
+    """One entry per distinct chunk, sorted by fused score."""
+    fused: dict[str, FusedHit] = {}
+    for query, ranking in zip(queries, hits):
+        for rank, (doc, score) in enumerate(ranking):
+            entry = fused.setdefault(chunk_key(doc), FusedHit(document=doc))
+            entry.rrf_score += 1.0 / (k + rank + 1)
+            entry.best_score = max(entry.best_score, float(score))
+            if query not in entry.queries:
+                entry.queries.append(query)
+    # Dicts keep insertion order and sorted() is stable: ties stay first-seen.
+    return sorted(fused.values(), key=lambda hit: hit.rrf_score, reverse=True)
+
+
+def _shingles(text: str) -> set[int]:
+    # Accents are dropped so "cómo"/"como" variants of a chunk still match.
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    words = _WORD.findall("".join(c for c in folded if not unicodedata.combining(c)))
+    if len(words) <= _SHINGLE_WORDS:
+        return {hash(tuple(words))}
+    return {
+        hash(tuple(words[i : i + _SHINGLE_WORDS]))
+        for i in range(len(words) - _SHINGLE_WORDS + 1)
+    }
+
+
+def near_duplicate_mask(
+    hits: Sequence[FusedHit],
+    vectors: Optional[np.ndarray] = None,
+    cosine_threshold: float = NEAR_DUPLICATE_COSINE,
+    jaccard_threshold: float = NEAR_DUPLICATE_JACCARD,
+) -> np.ndarray:
+    """Boolean mask of the hits to keep; `hits` must be sorted best first.
+
+    Params:
+        vectors: Unit-norm chunk embeddings, one row per hit. Without them
+            the comparison falls back to word-shingle Jaccard similarity.
+    """
+    keep = np.ones(len(hits), dtype=bool)
+    if vectors is not None:
+        similarity = vectors @ vectors.T
+        for i in range(1, len(hits)):
+            keep[i] = not (similarity[i, :i][keep[:i]] >= cosine_threshold).any()
+        return keep
+
+    shingles = [_shingles(hit.document.page_content or "") for hit in hits]
+    for i in range(1, len(hits)):
+        for j in np.flatnonzero(keep[:i]):
+            union = len(shingles[i] | shingles[j])
+            if union and len(shingles[i] & shingles[j]) / union >= jaccard_threshold:
+                keep[i] = False
+                break
+    return keep
+
+
+def mmr_order(
+    relevance: np.ndarray, vectors: np.ndarray, limit: int, lambda_mult: float = 0.7
+) -> list[int]:
+    """Greedy MMR selection; returns positions into `relevance`/`vectors`.
+
+    `relevance` should be in [0, 1] so it is comparable with cosine similarity.
+    """
+    count = min(limit, relevance.shape[0])
+    if count == 0:
+        return []
+    similarity = vectors @ vectors.T
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()  # Max similarity to the selection
+    available = np.ones(relevance.shape[0], dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < count:
+        marginal = np.where(
+            available, lambda_mult * relevance - (1 - lambda_mult) * redundancy, -np.inf
+        )
+        best = int(np.argmax(marginal))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return selected
+
+
+def fuse_hits(
+    queries: Sequence[str],
+    hits: Sequence[Sequence[tuple[Document, float]]],
+    limit: Optional[int] = None,
+    vectors: Optional[dict[str, Sequence[float]]] = None,
+    mmr_lambda: Optional[float] = None,
+) -> list[FusedHit]:
+    """RRF, exact and near-duplicate removal, then optional MMR.
+
+    Params:
+        queries: The queries, in the order their hit lists appear in `hits`.
+        hits: `(Document, score)` lists as returned by the vector backends.
+        limit: Maximum number of chunks to return (all by default).
+        vectors: Chunk embeddings keyed by `chunk_key`. Used for cosine
+            near-duplicate detection and required for MMR.
+        mmr_lambda: Enables MMR; 1.0 is pure relevance, 0.0 pure novelty.
+    """
+    fused = reciprocal_rank_fusion(queries, hits)
+    matrix = None
+    if fused and vectors and all(chunk_key(hit.document) in vectors for hit in fused):
+        rows = [vectors[chunk_key(hit.document)] for hit in fused]
+        matrix = normalize_rows(np.asarray(rows, dtype=np.float32))
+
+    keep = near_duplicate_mask(fused, matrix)
+    fused = [hit for hit, kept in zip(fused, keep) if kept]
+    limit = len(fused) if limit is None else limit
+
+    if mmr_lambda is None or matrix is None or not fused:
+        return fused[:limit]
+    matrix = matrix[keep]
+    relevance = np.asarray([hit.rrf_score for hit in fused], dtype=np.float32)
+    relevance /= relevance.max()
+    return [fused[i] for i in mmr_order(relevance, matrix, limit, mmr_lambda)]
+
+
+def hybrid_fuse(
+    vector_hits: Sequence[tuple[Document, float]],
+    lexical_hits: Sequence[tuple[Document, float]],
+    k: int,
+    alpha: float = 0.5,
+) -> list[tuple[Document, float]]:
+    """Weighted sum of the cosine and the BM25 score of each chunk.
+
+    Cosine is already bounded, so it is used as is; BM25 is unbounded and is
+    divided by the best BM25 score of the query. (Min-max scaling the cosine
+    side would blow tiny differences between same-topic chunks up to the full
+    [0, 1] range and drown the lexical signal.) A chunk missing from one list
+    gets 0 on that side. `alpha` is the vector weight (1.0 = vector only).
+    """
+    top_lexical = max((score for _, score in lexical_hits), default=0.0) or 1.0
+    fused: dict[str, list] = {}
+    for hits, weight, scale in (
+        (vector_hits, alpha, 1.0),
+        (lexical_hits, 1.0 - alpha, top_lexical),
+    ):
+        for doc, score in hits:
+            entry = fused.setdefault(chunk_key(doc), [doc, 0.0])
+            entry[1] += weight * min(max(float(score) / scale, 0.0), 1.0)
+    ranked = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)
+    return [(doc, round(score, 6)) for doc, score in ranked[:k]]
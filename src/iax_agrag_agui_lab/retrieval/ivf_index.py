@@ -0,0 +1,205 @@
+"""Approximate nearest-neighbour search (IVF-flat) over a local vector index.
+
+Brute-force scoring touches every row of the matrix, which stops scaling once
+the help desk and the IAX docs reach hundreds of thousands of chunks. IVF-flat
+clusters the (normalised) vectors with spherical k-means into `nlist` inverted
+lists; a query scores the centroids, probes the `nprobe` closest lists and only
+scores the vectors in them. `nprobe` trades recall for speed at query time.
+
+The IVF structures live next to the local index they were built from:
+- `ivf.json`: build parameters and the build id of the index they index
+- `ivf_centroids.npy`: nlist x dimensions, normalised
+- `ivf_offsets.npy`: start of each list (nlist + 1 entries)
+- `ivf_rows.npy`: original row of each vector, in list order
+- `ivf_vectors.f32`: the vectors reordered by list, so a probe is a contiguous
+  memory-mapped slice rather than a random gather
+
+Build (from src/iax_agrag_agui_lab):
+    python -m retrieval.ivf_index build data/indexes/iax-documentation --nlist 1024
+
+Serve with `RAG_IAX_BACKEND=ivf` (and `RAG_IAX_NPROBE` to tune the search).
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from retrieval.local_index import LocalVectorIndex, normalize_rows, replacing, top_k_indices
+
+IVF_PARAMS_FILE = "ivf.json"
+IVF_CENTROIDS_FILE = "ivf_centroids.npy"
+IVF_OFFSETS_FILE = "ivf_offsets.npy"
+IVF_ROWS_FILE = "ivf_rows.npy"
+IVF_VECTORS_FILE = "ivf_vectors.f32"
+
+DEFAULT_NPROBE = 8
+_BLOCK_ROWS = 16384  # rows scored per block while assigning, bounds temporary memory
+
+
+def default_nlist(count: int) -> int:
+    """~4 * sqrt(n) lists, the usual starting point for IVF."""
+    return max(1, min(count, int(4 * math.sqrt(count))))
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Closest centroid (by inner product) of every row, computed in blocks."""
+    assignments = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], _BLOCK_ROWS):
+        block = np.asarray(vectors[start : start + _BLOCK_ROWS], dtype=np.float32)
+        assignments[start : start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(
+    sample: np.ndarray, nlist: int, iterations: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Spherical k-means on normalised rows."""
+    nlist = min(nlist, sample.shape[0])
+    centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = assign_lists(sample, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=nlist)
+        sums = np.zeros_like(centroids)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        sums[filled] = np.add.reduceat(sample[order], starts, axis=0)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed dead lists from random points so every list stays useful.
+            sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def build_ivf(
+    path: str | os.PathLike,
+    nlist: Optional[int] = None,
+    iterations: int = 20,
+    train_size: int = 65536,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """Train and write the IVF structures for the local index at `path`."""
+    base = LocalVectorIndex(path)
+    vectors = base.vectors
+    nlist = nlist or default_nlist(base.count)
+    rng = np.random.default_rng(seed)
+
+    sample_rows = np.sort(rng.choice(base.count, min(train_size, base.count), replace=False))
+    centroids = train_centroids(np.asarray(vectors[sample_rows]), nlist, iterations, rng)
+    assignments = assign_lists(vectors, centroids)
+
+    rows = np.argsort(assignments, kind="stable").astype(np.int64)
+    counts = np.bincount(assignments, minlength=centroids.shape[0])
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+    out = Path(path)
+    with replacing(out / IVF_VECTORS_FILE) as tmp:
+        reordered = np.memmap(tmp, dtype=np.float32, mode="w+", shape=(base.count, base.dimensions))
+        for start in range(0, base.count, _BLOCK_ROWS):
+            reordered[start : start + _BLOCK_ROWS] = vectors[rows[start : start + _BLOCK_ROWS]]
+        reordered.flush()
+        del reordered
+
+    for name, array in ((IVF_CENTROIDS_FILE, centroids), (IVF_OFFSETS_FILE, offsets), (IVF_ROWS_FILE, rows)):
+        with replacing(out / name) as tmp:
+            np.save(tmp, array)
+    params = {
+        "nlist": int(centroids.shape[0]),
+        "iterations": iterations,
+        "train_size": int(sample_rows.shape[0]),
+        "seed": seed,
+        "count": base.count,
+        "build_id": base.build_id,
+    }
+    with replacing(out / IVF_PARAMS_FILE) as tmp:
+        tmp.write_text(json.dumps(params, indent=2))
+    return params
+
+
+class IVFFlatIndex(LocalVectorIndex):
+    """`LocalVectorIndex` whose searches only score the probed inverted lists."""
+
+    def __init__(self, path: str | os.PathLike, nprobe: int = DEFAULT_NPROBE) -> None:
+        super().__init__(path)
+        self.nprobe = nprobe
+        params_path = self.path / IVF_PARAMS_FILE
+        self.params = json.loads(params_path.read_text()) if params_path.exists() else {}
+        if self.params.get("build_id") != self.build_id or self.params.get("count") != self.count:
+            raise ValueError(f"IVF structures at {self.path} are missing or stale; rebuild them")
+        self.centroids = np.load(self.path / IVF_CENTROIDS_FILE)
+        self.offsets = np.load(self.path / IVF_OFFSETS_FILE)
+        self.rows = np.load(self.path / IVF_ROWS_FILE, mmap_mode="r")
+        self.list_vectors = np.memmap(
+            self.path / IVF_VECTORS_FILE,
+            dtype=np.float32,
+            mode="r",
+            shape=(self.count, self.dimensions),
+        )
+
+    def search_rows(
+        self,
+        embedding: Sequence[float],
+        k: int,
+        nprobe: Optional[int] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k over the `nprobe` closest lists: (rows, scores).
+
+        With `rows` (a metadata filter), only allowed vectors are scored and
+        `nprobe` grows with the filter's selectivity, so the probe still finds
+        as many candidates as an unfiltered one. When that probe would touch
+        more vectors than the filter allows, the allowed rows are scored exactly.
+        """
+        nprobe = nprobe or self.nprobe
+        if rows is not None:
+            nlist = self.params["nlist"]
+            nprobe = min(nlist, math.ceil(nprobe * self.count / max(rows.shape[0], 1)))
+            if rows.shape[0] <= self.count * nprobe / nlist:
+                return super().search_rows(embedding, k, rows=rows)
+        query = normalize_rows(np.asarray(embedding, dtype=np.float32))
+        lists = top_k_indices(self.centroids @ query, nprobe)
+        allowed = None
+        if rows is not None:
+            allowed = np.zeros(self.count, dtype=bool)
+            allowed[rows] = True
+        positions, scores = [], []
+        for i in lists:
+            start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+            if end <= start:
+                continue
+            if allowed is None:
+                positions.append(np.arange(start, end))
+                scores.append(self.list_vectors[start:end] @ query)
+                continue
+            kept = start + np.flatnonzero(allowed[self.rows[start:end]])
+            if kept.size:
+                positions.append(kept)
+                scores.append(np.asarray(self.list_vectors[kept]) @ query)
+        if not positions:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        positions_arr = np.concatenate(positions)
+        scores_arr = np.concatenate(scores)
+        best = top_k_indices(scores_arr, k)
+        return np.asarray(self.rows[positions_arr[best]]), scores_arr[best]
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    import argparse
+
+    parser = argparse.ArgumentParser(description="IVF-flat index utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build IVF structures for a local index")
+    build.add_argument("path")
+    build.add_argument("--nlist", type=int, default=None)
+    build.add_argument("--iterations", type=int, default=20)
+    build.add_argument("--train-size", type=int, default=65536)
+    build.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(build_ivf(args.path, args.nlist, args.iterations, args.train_size, args.seed))
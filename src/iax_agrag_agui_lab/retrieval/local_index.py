@@ -0,0 +1,334 @@
+"""In-process vector index: memory-mapped float32 embeddings + SQLite sidecar.
+
+Drop-in alternative to Pinecone for the documentation indexes. An index is a
+directory holding:
+- `vectors.f32`: row-major float32 matrix (count x dimensions), rows L2-normalised
+- `chunks.sqlite`: chunk payloads (id, text, metadata JSON) keyed by row number
+- `manifest.json`: dimensions, count, embedding model and a build id
+
+Derived structures (IVF lists, quantized codes, BM25 and metadata postings)
+are written next to these files and record the build id they were built
+from; their readers refuse to serve once it no longer matches the manifest.
+
+The matrix is opened with `numpy.memmap`, so every uvicorn worker on the host
+shares one page-cached copy instead of holding its own, and a top-k cosine
+query is a single matrix-vector product plus `argpartition`. Only the top-k
+payloads are ever read from the sidecar.
+
+Writers build the whole directory next to the live one and swap it into
+place when they finish, so workers serving the old index are never left with
+a truncated memory map; they pick the new one up when they reopen it.
+
+Build one from an existing Pinecone index (from src/iax_agrag_agui_lab):
+    python -m retrieval.local_index export iax data/indexes/iax-documentation
+
+and point a tool at it with `RAG_IAX_BACKEND=local` and
+`RAG_IAX_INDEX_DIR=data/indexes/iax-documentation` (same for `RAG_WORKANA_*`).
+Metadata filters need the postings of `retrieval.metadata_index` next to it;
+filtered searches only score the matching rows.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+VECTORS_FILE = "vectors.f32"
+CHUNKS_FILE = "chunks.sqlite"
+MANIFEST_FILE = "manifest.json"
+# Largest fraction of the rows a filtered search gathers instead of scanning all.
+GATHER_MAX_FRACTION = 0.2
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` highest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class ChunkStore:
+    """SQLite sidecar with the chunk payloads.
+
+    The connection is opened up front and shared by every thread (a search
+    reads a handful of rows, under a lock): it keeps reading the file it
+    opened even after a rebuild swaps a new index directory in, so payloads
+    always match the vectors mapped next to them.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._conn = self._connect()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+
+    def get(self, rows: Sequence[int]) -> list[tuple[str, str, dict[str, Any]]]:
+        """(id, text, metadata) for each row, in the order given."""
+        if not rows:
+            return []
+        placeholders = ",".join("?" * len(rows))
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT row, id, text, metadata FROM chunks WHERE row IN ({placeholders})",
+                [int(r) for r in rows],
+            )
+            by_row = {row: (chunk_id, text, json.loads(meta)) for row, chunk_id, text, meta in cursor}
+        return [by_row[int(r)] for r in rows]
+
+    def iter_all(self) -> Iterable[tuple[int, str, str, dict[str, Any]]]:
+        # A connection of its own: a full scan must not hold up `get`.
+        conn = self._connect()
+        try:
+            cursor = conn.execute("SELECT row, id, text, metadata FROM chunks ORDER BY row")
+            for row, chunk_id, text, meta in cursor:
+                yield row, chunk_id, text, json.loads(meta)
+        finally:
+            conn.close()
+
+
+def read_build_id(path: str | os.PathLike) -> str:
+    """Build id of the local index at `path` ("" for indexes written before build ids)."""
+    manifest = json.loads((Path(path) / MANIFEST_FILE).read_text())
+    return manifest.get("build_id", "")
+
+
+@contextmanager
+def replacing(path: Path) -> Iterator[Path]:
+    """A temporary file next to `path`, renamed over it when the block succeeds.
+
+    Derived structures are rebuilt in place; this keeps a rebuild from
+    truncating a file that serving workers have memory-mapped.
+    """
+    tmp = path.with_name(f".tmp-{uuid.uuid4().hex}-{path.name}")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def replace_directory(build: Path, path: Path) -> None:
+    """Move the finished directory `build` to `path`, retiring whatever was there.
+
+    Files of the retired index are unlinked, not truncated: processes that
+    still have them open or mapped keep reading the old data.
+    """
+    retired = None
+    if path.exists():
+        retired = path.with_name(f".{path.name}.retired-{uuid.uuid4().hex}")
+        os.replace(path, retired)
+    os.replace(build, path)
+    if retired is not None:
+        shutil.rmtree(retired, ignore_errors=True)
+
+
+class LocalIndexWriter:
+    """Appends normalised vectors and payloads in batches; `close()` seals the index.
+
+    Everything is written to a sibling temporary directory that `close()`
+    swaps in for `path`; `abort()` (or leaving the `with` block on an
+    exception) discards it and leaves the live index untouched.
+    """
+
+    def __init__(self, path: str | os.PathLike, dimensions: int, model: str = "") -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.dimensions = dimensions
+        self.model = model
+        self.count = 0
+        self.build_path = Path(
+            tempfile.mkdtemp(prefix=f".{self.path.name}.", suffix=".building", dir=self.path.parent)
+        )
+        self._vectors = open(self.build_path / VECTORS_FILE, "wb")
+        self._db = sqlite3.connect(self.build_path / CHUNKS_FILE)
+        self._db.execute(
+            "CREATE TABLE chunks (row INTEGER PRIMARY KEY, id TEXT, text TEXT, metadata TEXT)"
+        )
+
+    def add(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        vectors: np.ndarray | Sequence[Sequence[float]],
+        metadatas: Optional[Sequence[dict[str, Any]]] = None,
+    ) -> None:
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimensions))
+        if not (len(ids) == len(texts) == vectors.shape[0]):
+            raise ValueError("ids, texts and vectors must have the same length")
+        if metadatas is None:
+            metadatas = [{} for _ in ids]
+        elif len(metadatas) != len(ids):
+            raise ValueError("metadatas must have one entry per id")
+        self._vectors.write(vectors.tobytes(order="C"))
+        self._db.executemany(
+            "INSERT INTO chunks (row, id, text, metadata) VALUES (?, ?, ?, ?)",
+            [
+                (self.count + i, chunk_id, text, json.dumps(meta, ensure_ascii=False))
+                for i, (chunk_id, text, meta) in enumerate(zip(ids, texts, metadatas))
+            ],
+        )
+        self.count += len(ids)
+
+    def close(self) -> None:
+        self._vectors.close()
+        self._db.commit()
+        self._db.close()
+        manifest = {
+            "dimensions": self.dimensions,
+            "count": self.count,
+            "model": self.model,
+            "build_id": uuid.uuid4().hex,
+        }
+        (self.build_path / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+        replace_directory(self.build_path, self.path)
+
+    def abort(self) -> None:
+        self._vectors.close()
+        self._db.close()
+        shutil.rmtree(self.build_path, ignore_errors=True)
+
+    def __enter__(self) -> "LocalIndexWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class LocalVectorIndex:
+    """Read side of a local index, exposing the vector-store search we use.
+
+    `similarity_search_by_vector_with_score` mirrors `PineconeVectorStore`, so
+    `AsyncRetriever` can use either backend unchanged.
+    """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = Path(path)
+        manifest = json.loads((self.path / MANIFEST_FILE).read_text())
+        self.dimensions = int(manifest["dimensions"])
+        self.count = int(manifest["count"])
+        self.model = manifest.get("model", "")
+        self.build_id = manifest.get("build_id", "")
+        if self.count:
+            self.vectors = np.memmap(
+                self.path / VECTORS_FILE,
+                dtype=np.float32,
+                mode="r",
+                shape=(self.count, self.dimensions),
+            )
+        else:
+            self.vectors = np.empty((0, self.dimensions), dtype=np.float32)
+        self.chunks = ChunkStore(self.path / CHUNKS_FILE)
+        self._metadata = None
+
+    def filter_rows(self, filter: Optional[dict[str, Any]]) -> Optional[np.ndarray]:
+        """Sorted rows matching `filter`, or None when there is nothing to filter."""
+        if not filter:
+            return None
+        if self._metadata is None:
+            from retrieval.metadata_index import MetadataIndex
+
+            self._metadata = MetadataIndex.require(self.path, self.count, self.build_id)
+        return self._metadata.matching_rows(filter)
+
+    def scores(self, embedding: Sequence[float]) -> np.ndarray:
+        query = normalize_rows(np.asarray(embedding, dtype=np.float32))
+        return self.vectors @ query
+
+    def documents(self, rows: Sequence[int], scores: Sequence[float]) -> list[tuple[Document, float]]:
+        return [
+            (Document(id=chunk_id, page_content=text, metadata=metadata), float(score))
+            for (chunk_id, text, metadata), score in zip(self.chunks.get(rows), scores)
+        ]
+
+    def search_rows(
+        self, embedding: Sequence[float], k: int, rows: Optional[np.ndarray] = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Exact top-k, restricted to `rows` when given: (rows, scores), best first."""
+        if rows is None:
+            scores = self.scores(embedding)
+            best = top_k_indices(scores, k)
+            return best, scores[best]
+        if rows.shape[0] > self.count * GATHER_MAX_FRACTION:
+            # A gather copies the rows; past this point the sequential scan is cheaper.
+            scores = self.scores(embedding)[rows]
+        else:
+            # Only the allowed rows are read and scored: cost follows selectivity.
+            query = normalize_rows(np.asarray(embedding, dtype=np.float32))
+            scores = np.asarray(self.vectors[rows]) @ query
+        best = top_k_indices(scores, k)
+        return rows[best], scores[best]
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: Sequence[float],
+        k: int = 4,
+        filter: Optional[dict[str, Any]] = None,
+        namespace: Optional[str] = None,
+    ) -> list[tuple[Document, float]]:
+        rows, scores = self.search_rows(embedding, k, rows=self.filter_rows(filter))
+        return self.documents(rows.tolist(), scores.tolist())
+
+
+def export_pinecone_index(name: str, out_dir: str | os.PathLike, batch_size: int = 100) -> int:
+    """Copy every vector and payload of a registered Pinecone index to `out_dir`."""
+    from retrieval.registry import retriever_registry
+
+    spec = retriever_registry.spec(name)
+    index = retriever_registry.index(name)
+    namespace = spec.namespace or ""
+    with LocalIndexWriter(out_dir, spec.dimensions, spec.embedding_model) as writer:
+        for id_batch in index.list(namespace=namespace, limit=batch_size):
+            fetched = index.fetch(ids=list(id_batch), namespace=namespace).vectors
+            records = [fetched[i] for i in id_batch if i in fetched]
+            metadatas = [dict(r.metadata or {}) for r in records]
+            writer.add(
+                ids=[r.id for r in records],
+                texts=[meta.pop("text", "") for meta in metadatas],
+                vectors=[r.values for r in records],
+                metadatas=metadatas,
+            )
+        return writer.count
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    import argparse
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Local vector index utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Export a Pinecone index to a local index")
+    export.add_argument("index", help="Registry key, e.g. 'iax' or 'workana'")
+    export.add_argument("out_dir")
+    args = parser.parse_args()
+    count = export_pinecone_index(args.index, args.out_dir)
+    print(f"Exported {count} chunks to {args.out_dir}")
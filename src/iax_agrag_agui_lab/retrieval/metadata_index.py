@@ -0,0 +1,220 @@
+"""Metadata filters for the RAG tools, pushed down into every backend.
+
+Filtering after retrieval wastes top_k slots: ask for 5 chunks, drop the 4
+that come from the wrong section, answer from one. Filters are instead applied
+before scoring:
+
+- Pinecone gets them as native metadata filters (`build_metadata_filter`
+  produces Pinecone's `{"field": {"$eq" | "$in": ...}}` syntax);
+- the in-process backends resolve them against a posting index over the
+  chunk metadata, built next to the local index, and only score the rows that
+  match. The more selective the filter, the fewer rows are scored. Unions
+  of values go through a row bitmap, scans that cannot gather (IVF lists,
+  BM25 postings) test rows against one.
+
+Files:
+- `meta.json`: indexed fields, chunk count and build id of the local index,
+  and for each (field, value) the offset and length of its postings
+- `meta_rows.npy`: the postings, sorted row numbers (int32) per value
+
+Only scalar (and list-of-scalar) fields with at most `max_values` distinct
+values are indexed; free-text fields such as "text" or "title" are skipped.
+
+Build (from src/iax_agrag_agui_lab):
+    python -m retrieval.metadata_index build data/indexes/workana
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Mapping, Optional
+
+import numpy as np
+
+from retrieval.local_index import CHUNKS_FILE, ChunkStore, read_build_id, replacing
+
+METADATA_PARAMS_FILE = "meta.json"
+METADATA_ROWS_FILE = "meta_rows.npy"
+
+DEFAULT_MAX_VALUES = 10000
+
+
+def build_metadata_filter(**values: Any) -> Optional[dict[str, Any]]:
+    """Pinecone-style filter from keyword arguments; None/empty values are ignored.
+
+    `build_metadata_filter(source=["pagos.md", "retiros.md"], document_id="faq")` ->
+    `{"source": {"$in": ["pagos.md", "retiros.md"]}, "document_id": {"$eq": "faq"}}`
+    """
+    clauses: dict[str, Any] = {}
+    for field, value in values.items():
+        if value is None or value == "" or value == []:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            clauses[field] = {"$in": list(value)}
+        else:
+            clauses[field] = {"$eq": value}
+    return clauses or None
+
+
+def parse_filter(filter: Mapping[str, Any]) -> dict[str, list[Any]]:
+    """Normalise a filter to {field: accepted values} (AND across fields).
+
+    Accepts plain values, `$eq`, `$in` and a top-level `$and` of those.
+    """
+    clauses: dict[str, list[Any]] = {}
+    for field, condition in filter.items():
+        if field == "$and":
+            for part in condition:
+                for key, accepted in parse_filter(part).items():
+                    previous = clauses.get(key)
+                    clauses[key] = accepted if previous is None else [
+                        v for v in previous if v in accepted
+                    ]
+            continue
+        if isinstance(condition, Mapping):
+            unsupported = set(condition) - {"$eq", "$in"}
+            if unsupported:
+                raise ValueError(f"Unsupported filter operator(s) {sorted(unsupported)} on '{field}'")
+            accepted = list(condition.get("$in", []))
+            if "$eq" in condition:
+                accepted.append(condition["$eq"])
+        elif isinstance(condition, (list, tuple, set)):
+            accepted = list(condition)
+        else:
+            accepted = [condition]
+        previous = clauses.get(field)
+        clauses[field] = accepted if previous is None else [v for v in previous if v in accepted]
+    return clauses
+
+
+def _value_key(value: Any) -> str:
+    # JSON keys are strings: "es", 3 and True must not collide.
+    return json.dumps(value, ensure_ascii=False)
+
+
+def build_metadata_index(
+    path: str | os.PathLike, max_values: int = DEFAULT_MAX_VALUES
+) -> dict[str, Any]:
+    """Write postings for every low-cardinality metadata field of the local index."""
+    path = Path(path)
+    build_id = read_build_id(path)
+    postings: dict[str, dict[str, list[int]]] = defaultdict(lambda: defaultdict(list))
+    skipped: set[str] = set()
+    count = 0
+    for row, _, _, metadata in ChunkStore(path / CHUNKS_FILE).iter_all():
+        count = row + 1
+        for field, value in metadata.items():
+            if field in skipped:
+                continue
+            values = value if isinstance(value, list) else [value]
+            if not all(isinstance(v, (str, int, float, bool)) for v in values):
+                skipped.add(field)
+                postings.pop(field, None)
+                continue
+            for v in values:
+                postings[field][_value_key(v)].append(row)
+            if len(postings[field]) > max_values:
+                skipped.add(field)
+                postings.pop(field)
+
+    rows: list[np.ndarray] = []
+    offsets: dict[str, dict[str, list[int]]] = {}
+    position = 0
+    for field, by_value in postings.items():
+        offsets[field] = {}
+        for value, value_rows in by_value.items():
+            unique = np.unique(np.asarray(value_rows, dtype=np.int32))
+            offsets[field][value] = [position, int(unique.shape[0])]
+            rows.append(unique)
+            position += unique.shape[0]
+
+    with replacing(path / METADATA_ROWS_FILE) as tmp:
+        np.save(tmp, np.concatenate(rows) if rows else np.empty(0, np.int32))
+    params = {"count": count, "build_id": build_id, "fields": offsets, "skipped": sorted(skipped)}
+    with replacing(path / METADATA_PARAMS_FILE) as tmp:
+        tmp.write_text(json.dumps(params, ensure_ascii=False))
+    return {
+        "count": count,
+        "fields": {field: len(values) for field, values in offsets.items()},
+        "skipped": sorted(skipped),
+    }
+
+
+class MetadataIndex:
+    """Resolves filters to the sorted rows that satisfy them."""
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = Path(path)
+        params = json.loads((self.path / METADATA_PARAMS_FILE).read_text())
+        self.count = int(params["count"])
+        self.build_id = params.get("build_id", "")
+        self.fields: dict[str, dict[str, list[int]]] = params["fields"]
+        self.skipped = set(params["skipped"])
+        self.rows = np.load(self.path / METADATA_ROWS_FILE, mmap_mode="r")
+
+    @classmethod
+    def open(cls, path: str | os.PathLike, count: int, build_id: str) -> Optional["MetadataIndex"]:
+        """The index at `path` if it was built for this build of the local index, else None."""
+        if not (Path(path) / METADATA_PARAMS_FILE).exists():
+            return None
+        index = cls(path)
+        return index if index.build_id == build_id and index.count == count else None
+
+    @classmethod
+    def require(cls, path: str | os.PathLike, count: int, build_id: str) -> "MetadataIndex":
+        index = cls.open(path, count, build_id)
+        if index is None:
+            raise ValueError(
+                f"No up-to-date metadata index at {path}; build it with "
+                f"`python -m retrieval.metadata_index build {path}`"
+            )
+        return index
+
+    def postings(self, field: str, value: Any) -> np.ndarray:
+        """Rows whose `field` is (or contains) `value`.
+
+        A field no chunk has matches nothing, as in Pinecone; a field left out
+        of the index for its cardinality or type cannot be answered.
+        """
+        if field in self.skipped:
+            raise ValueError(f"Metadata field '{field}' is not indexed at {self.path}")
+        start, length = self.fields.get(field, {}).get(_value_key(value), (0, 0))
+        return np.asarray(self.rows[start : start + length])
+
+    def matching_rows(self, filter: Mapping[str, Any]) -> np.ndarray:
+        """Sorted rows matching `filter`; the smallest posting list drives the intersection."""
+        per_field = []
+        for field, accepted in parse_filter(filter).items():
+            lists = [self.postings(field, value) for value in accepted]
+            if len(lists) == 1:
+                per_field.append(lists[0])
+                continue
+            # Union of several values through a bitmap: no sort of the merged lists.
+            union = np.zeros(self.count, dtype=bool)
+            for rows in lists:
+                union[rows] = True
+            per_field.append(np.flatnonzero(union).astype(np.int32))
+        if not per_field:
+            return np.arange(self.count, dtype=np.int32)
+        per_field.sort(key=len)
+        rows = per_field[0]
+        for other in per_field[1:]:
+            if not rows.size:
+                break
+            rows = rows[np.isin(rows, other, assume_unique=True, kind="table")]
+        return rows
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Metadata filter index utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build metadata postings for a local index")
+    build.add_argument("path")
+    build.add_argument("--max-values", type=int, default=DEFAULT_MAX_VALUES)
+    args = parser.parse_args()
+    print(json.dumps(build_metadata_index(args.path, args.max_values), indent=2))
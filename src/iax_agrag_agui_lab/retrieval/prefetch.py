@@ -0,0 +1,131 @@
+"""Speculative retrieval started while the triage LLM is still classifying.
+
+Without it, a RAG turn is strictly sequential: the triage model answers, then
+transfers, and only then does the pipeline embed and search. Most questions
+that reach triage are routed to retrieval, so the raw user question can be
+embedded and searched in the background while triage runs; the retrieval
+stage then awaits a task that is usually already done.
+
+Prefetches are keyed by (invocation id, index): an ADK transfer keeps the
+invocation id, so the stage that runs after triage finds the task the triage
+callback started. Whatever is not taken by the end of the turn (a GENERAL
+question, a cached answer, an error) is cancelled; an in-flight search only
+costs the embedding request and the vector lookup already sent.
+
+Disabled unless `RAG_PREFETCH_ENABLED=true`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from langchain_core.documents import Document
+
+from retrieval.registry import RetrieverRegistry, retriever_registry
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.getenv("RAG_PREFETCH_ENABLED", "false").lower() in ("1", "true", "yes")
+_MAX_PENDING = 1024  # Turns that never reach their end callback are evicted
+
+
+@dataclass
+class Prefetch:
+    question: str
+    top_k: int
+    task: asyncio.Task
+    started: float
+
+
+class RetrievalPrefetcher:
+    """Background `search_with_scores` tasks, handed over once to the retrieval stage."""
+
+    def __init__(self, registry: RetrieverRegistry, max_pending: int = _MAX_PENDING) -> None:
+        self.registry = registry
+        self.max_pending = max_pending
+        self._pending: OrderedDict[tuple[str, str], Prefetch] = OrderedDict()
+        self.started = 0
+        self.used = 0
+        self.cancelled = 0
+
+    def start(
+        self,
+        key: str,
+        index: str,
+        question: str,
+        top_k: int = 5,
+        filter: Optional[dict[str, Any]] = None,
+    ) -> None:
+        """Start searching `index` for `question` unless a prefetch for `key` exists."""
+        if (key, index) in self._pending:
+            return
+        retriever = self.registry.retriever(index)
+        task = asyncio.create_task(retriever.search_with_scores(question, top_k, filter=filter))
+        task.add_done_callback(_consume_exception)
+        self._pending[(key, index)] = Prefetch(question, top_k, task, time.perf_counter())
+        self.started += 1
+        while len(self._pending) > self.max_pending:
+            _, evicted = self._pending.popitem(last=False)
+            evicted.task.cancel()
+            self.cancelled += 1
+
+    async def take(
+        self, key: str, index: str
+    ) -> Optional[tuple[str, list[tuple[Document, float]]]]:
+        """(question, hits) of the prefetch for `key`, waiting for it if needed.
+
+        None when nothing was prefetched or the search failed; the caller then
+        searches as usual.
+        """
+        prefetch = self._pending.pop((key, index), None)
+        if prefetch is None:
+            return None
+        waited = time.perf_counter()
+        try:
+            hits = await prefetch.task
+        except asyncio.CancelledError:
+            if not prefetch.task.cancelled():
+                raise  # The caller itself is being cancelled
+            return None
+        except Exception as exc:
+            logger.warning("Prefetch on '%s' failed: %s", index, exc)
+            return None
+        self.used += 1
+        logger.info(
+            "Prefetch on '%s' used: %.0f ms after start, waited %.0f ms",
+            index,
+            (time.perf_counter() - prefetch.started) * 1000,
+            (time.perf_counter() - waited) * 1000,
+        )
+        return prefetch.question, hits
+
+    def cancel(self, key: str) -> int:
+        """Cancel every prefetch left for `key`; returns how many there were."""
+        stale = [entry for entry in self._pending if entry[0] == key]
+        for entry in stale:
+            self._pending.pop(entry).task.cancel()
+        self.cancelled += len(stale)
+        return len(stale)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "started": self.started,
+            "used": self.used,
+            "cancelled": self.cancelled,
+        }
+
+
+def _consume_exception(task: asyncio.Task) -> None:
+    # Cancelled or unused failed prefetches must not log "exception never retrieved".
+    if not task.cancelled():
+        task.exception()
+
+
+retrieval_prefetcher = RetrievalPrefetcher(retriever_registry)
@@ -0,0 +1,213 @@
+"""Quantized (int8 / binary) scan with exact float32 rescoring over a local index.
+
+A 1536-dimension `text-embedding-3-small` vector is 6 KB as float32, and the
+brute-force scan of `LocalVectorIndex` streams every byte of it per query.
+Quantized codes are 4x (int8) or 32x (binary) smaller, so the scan touches a
+fraction of the memory; the best `rescore_factor * k` candidates are then
+rescored with the exact float32 vectors, which only reads those few rows.
+
+- int8: per-dimension symmetric scalar quantization, `code = round(x / scale)`
+  with `scale = max|x| / 127`; scores are `codes @ (scale * query)`.
+- binary: one sign bit per dimension packed into uint64 words; candidates are
+  ranked by Hamming distance (`np.bitwise_count`), a much coarser proxy that
+  needs a larger rescore pool.
+
+Codes live in memory-mapped files next to the local index, so every uvicorn
+worker shares one page-cached copy:
+- `quant.json`: parameters, and the row count and build id they were built for
+- `q8_codes.i8` + `q8_scale.npy`: int8 codes (count x dimensions) and scales
+- `bin_codes.u64`: sign bits (count x dimensions / 64)
+
+Build (from src/iax_agrag_agui_lab):
+    python -m retrieval.quantized_index build data/indexes/iax-documentation
+
+Serve with `RAG_IAX_BACKEND=int8` or `RAG_IAX_BACKEND=binary`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from retrieval.local_index import LocalVectorIndex, normalize_rows, replacing, top_k_indices
+
+QUANT_PARAMS_FILE = "quant.json"
+INT8_CODES_FILE = "q8_codes.i8"
+INT8_SCALE_FILE = "q8_scale.npy"
+BINARY_CODES_FILE = "bin_codes.u64"
+
+INT8 = "int8"
+BINARY = "binary"
+DEFAULT_RESCORE_FACTOR = {INT8: 4, BINARY: 32}
+_BLOCK_ROWS = 16384  # rows converted per block while building
+# Rows dequantized per block at query time: small enough for the float copy to
+# stay in L2 (128 x 1536 x 4 = 768 KB), which matters more than loop overhead.
+_INT8_SCAN_ROWS = 128
+_BINARY_SCAN_ROWS = 8192
+
+
+def _binary_words(dimensions: int) -> int:
+    return (dimensions + 63) // 64
+
+
+def pack_signs(vectors: np.ndarray) -> np.ndarray:
+    """Sign bits of each row packed into uint64 words (zero padded)."""
+    bits = np.packbits(vectors > 0, axis=1, bitorder="little")
+    padded = np.zeros((bits.shape[0], _binary_words(vectors.shape[1]) * 8), dtype=np.uint8)
+    padded[:, : bits.shape[1]] = bits
+    return padded.view(np.uint64)
+
+
+def build_quantized(
+    path: str | os.PathLike, modes: Sequence[str] = (INT8, BINARY)
+) -> dict[str, Any]:
+    """Write the int8 and/or binary codes for the local index at `path`."""
+    base = LocalVectorIndex(path)
+    out = Path(path)
+    built: list[str] = []
+    if (out / QUANT_PARAMS_FILE).exists():
+        previous = json.loads((out / QUANT_PARAMS_FILE).read_text())
+        if previous.get("build_id") == base.build_id and previous["count"] == base.count:
+            built = [m for m in previous["modes"] if m not in modes]  # Still valid
+    params: dict[str, Any] = {
+        "count": base.count,
+        "dimensions": base.dimensions,
+        "modes": built + list(modes),
+        "build_id": base.build_id,
+    }
+
+    if INT8 in modes:
+        peak = np.zeros(base.dimensions, dtype=np.float32)
+        for start in range(0, base.count, _BLOCK_ROWS):
+            block = np.abs(np.asarray(base.vectors[start : start + _BLOCK_ROWS]))
+            np.maximum(peak, block.max(axis=0), out=peak)
+        scale = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+        with replacing(out / INT8_CODES_FILE) as tmp:
+            codes = np.memmap(tmp, dtype=np.int8, mode="w+", shape=(base.count, base.dimensions))
+            for start in range(0, base.count, _BLOCK_ROWS):
+                block = np.asarray(base.vectors[start : start + _BLOCK_ROWS]) / scale
+                codes[start : start + block.shape[0]] = np.clip(np.rint(block), -127, 127)
+            codes.flush()
+            del codes
+        with replacing(out / INT8_SCALE_FILE) as tmp:
+            np.save(tmp, scale)
+
+    if BINARY in modes:
+        words = _binary_words(base.dimensions)
+        with replacing(out / BINARY_CODES_FILE) as tmp:
+            codes = np.memmap(tmp, dtype=np.uint64, mode="w+", shape=(base.count, words))
+            for start in range(0, base.count, _BLOCK_ROWS):
+                block = np.asarray(base.vectors[start : start + _BLOCK_ROWS])
+                codes[start : start + block.shape[0]] = pack_signs(block)
+            codes.flush()
+            del codes
+
+    with replacing(out / QUANT_PARAMS_FILE) as tmp:
+        tmp.write_text(json.dumps(params, indent=2))
+    return params
+
+
+class QuantizedIndex(LocalVectorIndex):
+    """`LocalVectorIndex` that scans quantized codes and rescores with float32.
+
+    Params:
+        mode: "int8" or "binary".
+        rescore_factor: Candidates rescored exactly, as a multiple of k
+            (0 returns the quantized ranking and scores as they are).
+    """
+
+    def __init__(
+        self, path: str | os.PathLike, mode: str = INT8, rescore_factor: Optional[int] = None
+    ) -> None:
+        super().__init__(path)
+        params_path = self.path / QUANT_PARAMS_FILE
+        self.params = json.loads(params_path.read_text()) if params_path.exists() else {}
+        if (
+            self.params.get("build_id") != self.build_id
+            or self.params.get("count") != self.count
+            or mode not in self.params.get("modes", ())
+        ):
+            raise ValueError(f"No up-to-date {mode} codes at {self.path}; rebuild them")
+        self.mode = mode
+        self.rescore_factor = (
+            DEFAULT_RESCORE_FACTOR[mode] if rescore_factor is None else rescore_factor
+        )
+        if mode == INT8:
+            self.scale = np.load(self.path / INT8_SCALE_FILE)
+            self.codes = np.memmap(
+                self.path / INT8_CODES_FILE,
+                dtype=np.int8,
+                mode="r",
+                shape=(self.count, self.dimensions),
+            )
+        elif mode == BINARY:
+            self.codes = np.memmap(
+                self.path / BINARY_CODES_FILE,
+                dtype=np.uint64,
+                mode="r",
+                shape=(self.count, _binary_words(self.dimensions)),
+            )
+        else:
+            raise ValueError(f"Unknown quantization mode '{mode}'")
+
+    @property
+    def code_bytes(self) -> int:
+        """Bytes per vector scanned at query time."""
+        return self.codes.shape[1] * self.codes.itemsize
+
+    def quantized_scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Approximate similarity of every row, or of `rows` only (higher is better)."""
+        total = self.count if rows is None else rows.shape[0]
+        scores = np.empty(total, dtype=np.float32)
+        step = _INT8_SCAN_ROWS if self.mode == INT8 else _BINARY_SCAN_ROWS
+        if self.mode == INT8:
+            query = (query * self.scale).astype(np.float32)
+        else:
+            query = pack_signs(query[None, :])[0]
+        for start in range(0, total, step):
+            if rows is None:
+                block = self.codes[start : start + step]
+            else:
+                block = self.codes[rows[start : start + step]]
+            if self.mode == INT8:
+                block_scores = block.astype(np.float32) @ query
+            else:
+                block_scores = -np.bitwise_count(block ^ query).sum(axis=1, dtype=np.int32)
+            scores[start : start + block.shape[0]] = block_scores
+        return scores
+
+    def search_rows(
+        self,
+        embedding: Sequence[float],
+        k: int,
+        rescore_factor: Optional[int] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Quantized top candidates (among `rows` if given), rescored exactly: (rows, scores)."""
+        query = normalize_rows(np.asarray(embedding, dtype=np.float32))
+        factor = self.rescore_factor if rescore_factor is None else rescore_factor
+        approximate = self.quantized_scores(query, rows)
+        if factor <= 0:
+            best = top_k_indices(approximate, k)
+            return (best if rows is None else rows[best]), approximate[best]
+        candidates = top_k_indices(approximate, max(k * factor, k))
+        candidates = np.sort(candidates if rows is None else rows[candidates])
+        exact = np.asarray(self.vectors[candidates]) @ query
+        best = top_k_indices(exact, k)
+        return candidates[best], exact[best]
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Quantized index utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build int8/binary codes for a local index")
+    build.add_argument("path")
+    build.add_argument("--modes", default=f"{INT8},{BINARY}")
+    args = parser.parse_args()
+    print(build_quantized(args.path, args.modes.split(",")))
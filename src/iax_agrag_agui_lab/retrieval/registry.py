@@ -0,0 +1,342 @@
+"""Process-wide registry of long-lived vector stores and embedding clients.
+
+The RAG tools used to call `Pinecone.from_existing_index(...)` and build a new
+`OpenAIEmbeddings` on every invocation, paying for client creation, index
+handshakes and cold HTTP connections on each search. The registry builds one
+connection-pooled embedder per (model, dimensions) and one vector store per
+(index, namespace), and every agent shares them.
+
+Usage:
+    from retrieval.registry import IAX_DOCS, retriever_registry
+
+    store = retriever_registry.vector_store(IAX_DOCS.name)
+    docs = store.similarity_search("¿Qué es IAX?", k=5, namespace=IAX_DOCS.namespace)
+
+`warm_up()` is called from the FastAPI lifespan so the first request does not
+pay for the setup either. Async callers should go through `retriever(name)`,
+which never blocks the event loop (see `retrieval.async_retriever`).
+
+Each index can be served by Pinecone (default) or by an in-process
+`LocalVectorIndex` (see `retrieval.local_index`), selected per index with
+`RAG_<NAME>_BACKEND=local` and `RAG_<NAME>_INDEX_DIR=<path>`. `ivf` serves the
+same directory through the approximate `IVFFlatIndex` (`RAG_<NAME>_NPROBE`);
+`int8` and `binary` through `QuantizedIndex` (quantized scan + float rescoring).
+
+Embedders are wrapped in `CachedEmbeddings` (see `retrieval.embedding_cache`),
+so repeated questions never reach the embeddings API. Set
+`RAG_EMBEDDING_CACHE_PATH` to add the on-disk tier.
+
+`RAG_<NAME>_RETRIEVAL_MODE=hybrid` adds BM25 lexical search over the chunks in
+`RAG_<NAME>_INDEX_DIR` (see `retrieval.bm25_index`), whatever the vector backend.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Protocol, Sequence
+
+import httpx
+from langchain_openai import OpenAIEmbeddings
+from langchain_pinecone import PineconeVectorStore
+from pinecone import Pinecone as PineconeClient
+
+from langchain_core.documents import Document
+
+from retrieval.async_retriever import HYBRID_MODE, VECTOR_MODE, AsyncRetriever
+from retrieval.bm25_index import BM25Index
+from retrieval.embedding_cache import CachedEmbeddings, EmbeddingCache
+from retrieval.ivf_index import DEFAULT_NPROBE, IVFFlatIndex
+from retrieval.local_index import LocalVectorIndex
+from retrieval.quantized_index import QuantizedIndex
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1536
+
+SEARCH_TIMEOUT_SECONDS = float(os.getenv("RAG_SEARCH_TIMEOUT_SECONDS", "20"))
+MAX_CONCURRENT_SEARCHES = int(os.getenv("RAG_MAX_CONCURRENT_SEARCHES", "8"))
+
+EMBEDDING_CACHE_PATH = os.getenv("RAG_EMBEDDING_CACHE_PATH")
+EMBEDDING_CACHE_ENTRIES = int(os.getenv("RAG_EMBEDDING_CACHE_ENTRIES", "4096"))
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("RAG_EMBEDDING_CACHE_MAX_MB", "256"))
+
+PINECONE_BACKEND = "pinecone"
+LOCAL_BACKEND = "local"
+IVF_BACKEND = "ivf"
+INT8_BACKEND = "int8"
+BINARY_BACKEND = "binary"
+_LOCAL_BACKENDS = (LOCAL_BACKEND, IVF_BACKEND, INT8_BACKEND, BINARY_BACKEND)
+
+
+class VectorSearchBackend(Protocol):
+    """The one vector-store call the retrieval layer relies on."""
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: Sequence[float],
+        k: int = 4,
+        filter: Optional[dict[str, Any]] = None,
+        namespace: Optional[str] = None,
+    ) -> list[tuple[Document, float]]: ...
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """Static description of a documentation index served by the RAG tools."""
+
+    name: str  # Registry key used by the tools ("iax", "workana", ...)
+    index_name: str  # Pinecone index name
+    namespace: Optional[str] = None
+    embedding_model: str = EMBEDDING_MODEL
+    dimensions: int = EMBEDDING_DIMENSIONS
+    host: Optional[str] = None  # Skips the control-plane lookup when set
+    backend: str = PINECONE_BACKEND  # "pinecone", "local", "ivf", "int8" or "binary"
+    local_path: Optional[str] = None  # Index directory for the in-process backends
+    nprobe: int = DEFAULT_NPROBE  # Inverted lists probed per query (ivf backend)
+    retrieval_mode: str = VECTOR_MODE  # "vector" or "hybrid" (needs BM25 postings in local_path)
+    hybrid_alpha: float = 0.5  # Weight of the vector scores in hybrid mode
+
+
+IAX_DOCS = IndexSpec(
+    name="iax",
+    index_name="iax-documentation",
+    namespace="iax-documentation-namespace",
+    host=os.getenv("PINECONE_IAX_HOST"),
+    backend=os.getenv("RAG_IAX_BACKEND", PINECONE_BACKEND),
+    local_path=os.getenv("RAG_IAX_INDEX_DIR"),
+    nprobe=int(os.getenv("RAG_IAX_NPROBE", DEFAULT_NPROBE)),
+    retrieval_mode=os.getenv("RAG_IAX_RETRIEVAL_MODE", VECTOR_MODE),
+    hybrid_alpha=float(os.getenv("RAG_IAX_HYBRID_ALPHA", "0.5")),
+)
+
+WORKANA_DOCS = IndexSpec(
+    name="workana",
+    index_name="iax-workana-discord-doc-files",
+    # namespace="iax-workana-discord-doc-files-namespace",
+    host=os.getenv("PINECONE_WORKANA_HOST"),
+    backend=os.getenv("RAG_WORKANA_BACKEND", PINECONE_BACKEND),
+    local_path=os.getenv("RAG_WORKANA_INDEX_DIR"),
+    nprobe=int(os.getenv("RAG_WORKANA_NPROBE", DEFAULT_NPROBE)),
+    retrieval_mode=os.getenv("RAG_WORKANA_RETRIEVAL_MODE", VECTOR_MODE),
+    hybrid_alpha=float(os.getenv("RAG_WORKANA_HYBRID_ALPHA", "0.5")),
+)
+
+
+class RetrieverRegistry:
+    """Lazily builds and caches the clients behind each registered index.
+
+    Everything is created on first use (or in `warm_up`) and reused for the
+    lifetime of the process. Creation is guarded by a lock so concurrent first
+    requests do not build duplicate clients.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 16,
+        embeddings_base_url: Optional[str] = None,
+    ) -> None:
+        self.pool_size = pool_size
+        self.embeddings_base_url = embeddings_base_url or os.getenv("OPENAI_BASE_URL")
+        self._lock = threading.RLock()
+        self._specs: dict[str, IndexSpec] = {}
+        self._pinecone: Optional[PineconeClient] = None
+        self._embeddings: dict[tuple[str, int], CachedEmbeddings] = {}
+        self._embedding_cache: Optional[EmbeddingCache] = None
+        self._indexes: dict[str, Any] = {}
+        self._stores: dict[tuple[str, Optional[str]], VectorSearchBackend] = {}
+        self._lexical: dict[str, BM25Index] = {}
+        self._retrievers: dict[str, AsyncRetriever] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Bounded pool for the blocking (Pinecone) half of a search."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.pool_size, thread_name_prefix="retrieval"
+                )
+            return self._executor
+
+    def register(self, spec: IndexSpec) -> IndexSpec:
+        with self._lock:
+            self._specs[spec.name] = spec
+        return spec
+
+    def spec(self, name: str) -> IndexSpec:
+        try:
+            return self._specs[name]
+        except KeyError:
+            raise KeyError(f"Unknown index '{name}'. Registered: {sorted(self._specs)}") from None
+
+    def specs(self) -> list[IndexSpec]:
+        return list(self._specs.values())
+
+    def pinecone_client(self) -> PineconeClient:
+        with self._lock:
+            if self._pinecone is None:
+                self._pinecone = PineconeClient(
+                    api_key=os.getenv("PINECONE_API_KEY"),
+                    pool_threads=self.pool_size,
+                )
+            return self._pinecone
+
+    @property
+    def embedding_cache(self) -> EmbeddingCache:
+        with self._lock:
+            if self._embedding_cache is None:
+                self._embedding_cache = EmbeddingCache(
+                    path=EMBEDDING_CACHE_PATH,
+                    memory_entries=EMBEDDING_CACHE_ENTRIES,
+                    max_disk_bytes=EMBEDDING_CACHE_MAX_MB * 2**20,
+                )
+            return self._embedding_cache
+
+    def embeddings(
+        self, model: str = EMBEDDING_MODEL, dimensions: int = EMBEDDING_DIMENSIONS
+    ) -> CachedEmbeddings:
+        key = (model, dimensions)
+        with self._lock:
+            embeddings = self._embeddings.get(key)
+            if embeddings is None:
+                limits = httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                )
+                client = OpenAIEmbeddings(
+                    model=model,
+                    dimensions=dimensions,
+                    base_url=self.embeddings_base_url,
+                    http_client=httpx.Client(limits=limits),
+                    http_async_client=httpx.AsyncClient(limits=limits),
+                )
+                embeddings = CachedEmbeddings(client, self.embedding_cache, model, dimensions)
+                self._embeddings[key] = embeddings
+            return embeddings
+
+    def index(self, name: str) -> Any:
+        """Data-plane handle for the Pinecone index behind `name`."""
+        spec = self.spec(name)
+        with self._lock:
+            index = self._indexes.get(spec.index_name)
+            if index is None:
+                index = self.pinecone_client().Index(
+                    name=spec.index_name,
+                    host=spec.host or "",
+                    pool_threads=self.pool_size,
+                )
+                self._indexes[spec.index_name] = index
+            return index
+
+    def vector_store(self, name: str) -> VectorSearchBackend:
+        spec = self.spec(name)
+        key = (spec.index_name, spec.namespace)
+        with self._lock:
+            store = self._stores.get(key)
+            if store is None:
+                if spec.backend in _LOCAL_BACKENDS and not spec.local_path:
+                    raise ValueError(f"Index '{name}' uses the {spec.backend} backend but has no local_path")
+                if spec.backend == LOCAL_BACKEND:
+                    store = LocalVectorIndex(spec.local_path)
+                elif spec.backend == IVF_BACKEND:
+                    store = IVFFlatIndex(spec.local_path, nprobe=spec.nprobe)
+                elif spec.backend in (INT8_BACKEND, BINARY_BACKEND):
+                    store = QuantizedIndex(spec.local_path, mode=spec.backend)
+                elif spec.backend == PINECONE_BACKEND:
+                    store = PineconeVectorStore(
+                        index=self.index(name),
+                        embedding=self.embeddings(spec.embedding_model, spec.dimensions),
+                        namespace=spec.namespace,
+                    )
+                else:
+                    raise ValueError(f"Unknown backend '{spec.backend}' for index '{name}'")
+                self._stores[key] = store
+            return store
+
+    def lexical_index(self, name: str) -> BM25Index:
+        """BM25 postings over the chunks of `name`'s local index directory."""
+        spec = self.spec(name)
+        if not spec.local_path:
+            raise ValueError(f"Index '{name}' has no local_path with BM25 postings")
+        with self._lock:
+            index = self._lexical.get(spec.local_path)
+            if index is None:
+                index = BM25Index(spec.local_path)
+                self._lexical[spec.local_path] = index
+            return index
+
+    def retriever(self, name: str) -> AsyncRetriever:
+        """Async, concurrency-limited retriever for `name` (one per index)."""
+        with self._lock:
+            retriever = self._retrievers.get(name)
+            if retriever is None:
+                retriever = AsyncRetriever(
+                    self,
+                    name,
+                    max_concurrency=MAX_CONCURRENT_SEARCHES,
+                    timeout=SEARCH_TIMEOUT_SECONDS,
+                )
+                self._retrievers[name] = retriever
+            return retriever
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> None:
+        """Build every client up front and open their HTTP connections.
+
+        Failures are logged and swallowed: a missing key or an unreachable index
+        should not prevent the server from starting, the tool call will surface
+        the error instead.
+        """
+        for name in names or list(self._specs):
+            spec = self.spec(name)
+            try:
+                self.vector_store(name)
+                if spec.retrieval_mode == HYBRID_MODE:
+                    self.lexical_index(name)
+                if spec.backend == PINECONE_BACKEND:
+                    self.index(name).describe_index_stats()
+                # Bypass the cache so the HTTP connection is actually opened
+                self.embeddings(spec.embedding_model, spec.dimensions).inner.embed_query("warm-up")
+                logger.info("Retriever '%s' ready (%s, %s)", name, spec.index_name, spec.backend)
+            except Exception as exc:  # pragma: no cover - depends on remote services
+                logger.warning("Retriever '%s' warm-up failed: %s", name, exc)
+
+    def close(self) -> None:
+        """Release every client; the async HTTP clients need `aclose` instead."""
+        with self._lock:
+            for embeddings in self._embeddings.values():
+                if embeddings.inner.http_client is not None:
+                    embeddings.inner.http_client.close()
+            self._embeddings.clear()
+            if self._embedding_cache is not None:
+                self._embedding_cache.close()
+                self._embedding_cache = None
+            self._indexes.clear()
+            self._stores.clear()
+            self._lexical.clear()
+            self._retrievers.clear()
+            self._pinecone = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    async def aclose(self) -> None:
+        """`close`, plus the async HTTP clients that carry the tools' embedding calls."""
+        with self._lock:
+            async_clients = [
+                embeddings.inner.http_async_client
+                for embeddings in self._embeddings.values()
+                if embeddings.inner.http_async_client is not None
+            ]
+        self.close()
+        for client in async_clients:
+            await client.aclose()
+
+
+retriever_registry = RetrieverRegistry()
+retriever_registry.register(IAX_DOCS)
+retriever_registry.register(WORKANA_DOCS)
@@ -0,0 +1,150 @@
+"""Semantic answer cache for the agentic RAG pipelines.
+
+Many questions are paraphrases of earlier ones, yet each one used to run
+triage, query generation, retrieval and synthesis from scratch. The cache keeps
+the embedding of every answered question together with its final response; a
+new question whose cosine similarity to a cached one clears `threshold` gets
+the cached answer back immediately.
+
+- Entries live in a fixed-capacity float32 matrix, so a lookup is one
+  vectorised product; the least recently used entry is replaced when full.
+- Entries expire after `ttl_seconds`.
+- `invalidate(namespace)` drops everything cached for one index (call it after
+  re-indexing), `invalidate()` drops everything.
+- `stats()` reports hits, misses, hit rate and the pipeline time saved, based
+  on how long each cached answer originally took to produce.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from retrieval.local_index import normalize_rows
+
+
+@dataclass
+class CachedAnswer:
+    namespace: str
+    question: str
+    answer: str
+    sources: list[Any] = field(default_factory=list)
+    latency_seconds: float = 0.0
+    created_at: float = field(default_factory=time.time)
+    last_hit_at: float = 0.0
+    hits: int = 0
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        dimensions: int = 1536,
+        threshold: float = 0.95,
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 1024,
+    ) -> None:
+        self.dimensions = dimensions
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self._entries: list[Optional[CachedAnswer]] = [None] * max_entries
+        # Parallel arrays so liveness is checked without a Python loop.
+        self._created = np.full(max_entries, -np.inf)
+        self._namespace_ids = np.full(max_entries, -1, dtype=np.int32)
+        self._namespaces: dict[str, int] = {}
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "invalidated": 0}
+        self._latency_saved = 0.0
+
+    def _namespace_id(self, namespace: str) -> int:
+        return self._namespaces.setdefault(namespace, len(self._namespaces))
+
+    def _live_mask(self, namespace: str, now: float) -> np.ndarray:
+        return (self._namespace_ids == self._namespace_id(namespace)) & (
+            now - self._created < self.ttl_seconds
+        )
+
+    def lookup(self, namespace: str, vector: Sequence[float]) -> Optional[CachedAnswer]:
+        query = normalize_rows(np.asarray(vector, dtype=np.float32))
+        now = time.time()
+        with self._lock:
+            live = self._live_mask(namespace, now)
+            if live.any():
+                scores = np.where(live, self._vectors @ query, -np.inf)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry = self._entries[best]
+                    entry.hits += 1
+                    entry.last_hit_at = now
+                    self._counters["hits"] += 1
+                    self._latency_saved += entry.latency_seconds
+                    return entry
+            self._counters["misses"] += 1
+            return None
+
+    def store(
+        self,
+        namespace: str,
+        question: str,
+        vector: Sequence[float],
+        answer: str,
+        sources: Optional[list[Any]] = None,
+        latency_seconds: float = 0.0,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            slot = self._free_slot(now)
+            self._vectors[slot] = normalize_rows(np.asarray(vector, dtype=np.float32))
+            self._entries[slot] = CachedAnswer(
+                namespace=namespace,
+                question=question,
+                answer=answer,
+                sources=list(sources or []),
+                latency_seconds=latency_seconds,
+                created_at=now,
+                last_hit_at=now,
+            )
+            self._created[slot] = now
+            self._namespace_ids[slot] = self._namespace_id(namespace)
+            self._counters["stores"] += 1
+
+    def _free_slot(self, now: float) -> int:
+        free = np.flatnonzero(now - self._created >= self.ttl_seconds)
+        if free.size:
+            return int(free[0])
+        return min(range(self.max_entries), key=lambda slot: self._entries[slot].last_hit_at)
+
+    def invalidate(self, namespace: Optional[str] = None) -> int:
+        """Drop the entries of `namespace` (all entries when None); returns how many."""
+        with self._lock:
+            dropped = 0
+            for slot, entry in enumerate(self._entries):
+                if entry is not None and (namespace is None or entry.namespace == namespace):
+                    self._entries[slot] = None
+                    self._created[slot] = -np.inf
+                    self._namespace_ids[slot] = -1
+                    dropped += 1
+            self._counters["invalidated"] += dropped
+            return dropped
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            counters: dict[str, float] = dict(self._counters)
+            lookups = counters["hits"] + counters["misses"]
+            counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+            counters["latency_saved_seconds"] = round(self._latency_saved, 3)
+            counters["entries"] = sum(1 for e in self._entries if e is not None)
+        return counters
+
+
+semantic_answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("RAG_SEMANTIC_CACHE_THRESHOLD", "0.95")),
+    ttl_seconds=float(os.getenv("RAG_SEMANTIC_CACHE_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("RAG_SEMANTIC_CACHE_MAX_ENTRIES", "1024")),
+)
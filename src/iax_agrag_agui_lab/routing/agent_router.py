@@ -0,0 +1,103 @@
+"""Embedding router that picks a Coordinator sub-agent without an LLM call.
+
+The Coordinator routes by letting its model read every sub-agent description,
+so a specialised question costs Coordinator LLM -> RAG triage LLM -> pipeline,
+each hop waiting for the previous one. The router embeds each sub-agent's
+catalog entry once (the `AgentData.to_dict` dict: name, description,
+instructions) and scores the incoming message against them by cosine
+similarity; a confident match can be transferred directly.
+
+A match is confident when the best score clears `min_score` *and* beats the
+runner-up by `min_margin`. The margin is what keeps mixed questions (IAX and
+Workana at once) and anything the catalog does not describe well with the LLM,
+which still has the full routing rules and tools.
+
+The message embedding goes through the registry's cached embeddings, so the
+RAG pipeline the message is routed to (semantic cache, prefetch) reuses it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from retrieval.local_index import normalize_rows
+from retrieval.registry import RetrieverRegistry, retriever_registry
+
+logger = logging.getLogger(__name__)
+
+AGENT_ROUTER_MIN_SCORE = float(os.getenv("RAG_AGENT_ROUTER_MIN_SCORE", "0.35"))
+AGENT_ROUTER_MIN_MARGIN = float(os.getenv("RAG_AGENT_ROUTER_MIN_MARGIN", "0.08"))
+_MAX_INSTRUCTIONS_CHARS = 2000  # Long prompts dilute the entry's embedding
+
+
+def catalog_text(entry: dict[str, Any]) -> str:
+    """Text embedded for one `AgentData.to_dict` entry."""
+    parts = [f"{entry.get('name', '')}: {entry.get('description', '')}"]
+    if entry.get("instructions"):
+        parts.append(entry["instructions"].strip()[:_MAX_INSTRUCTIONS_CHARS])
+    return "\n".join(parts)
+
+
+@dataclass
+class RouteDecision:
+    agent: str  # Best-scoring agent, confident or not
+    score: float
+    margin: float  # Over the runner-up
+    confident: bool
+
+
+class EmbeddingAgentRouter:
+    """Nearest catalog entry by cosine similarity, with a confidence rule."""
+
+    def __init__(
+        self,
+        catalog: Sequence[dict[str, Any]],
+        registry: RetrieverRegistry = retriever_registry,
+        min_score: float = AGENT_ROUTER_MIN_SCORE,
+        min_margin: float = AGENT_ROUTER_MIN_MARGIN,
+    ) -> None:
+        if not catalog:
+            raise ValueError("Empty agent catalog")
+        self.names = [entry["name"] for entry in catalog]
+        self.texts = [catalog_text(entry) for entry in catalog]
+        self.registry = registry
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self._vectors: Optional[np.ndarray] = None
+        self._lock = asyncio.Lock()
+
+    async def warm_up(self) -> None:
+        """Embed the catalog (once); `route` does it on first use otherwise."""
+        if self._vectors is not None:
+            return
+        async with self._lock:
+            if self._vectors is None:
+                vectors = await self.registry.embeddings().aembed_documents(self.texts)
+                self._vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+                logger.info("Agent router: embedded %d catalog entries", len(self.names))
+
+    def decide(self, vector: Sequence[float]) -> RouteDecision:
+        """Route an already embedded message."""
+        if self._vectors is None:
+            raise RuntimeError("Catalog not embedded yet: await warm_up() first")
+        scores = self._vectors @ normalize_rows(np.asarray(vector, dtype=np.float32))
+        order = np.argsort(scores)[::-1]
+        best = float(scores[order[0]])
+        margin = best - float(scores[order[1]]) if len(order) > 1 else best
+        return RouteDecision(
+            agent=self.names[int(order[0])],
+            score=round(best, 4),
+            margin=round(margin, 4),
+            confident=best >= self.min_score and margin >= self.min_margin,
+        )
+
+    async def route(self, message: str) -> RouteDecision:
+        await self.warm_up()
+        vector = await self.registry.embeddings().aembed_query(message)
+        return self.decide(vector)
@@ -0,0 +1,247 @@
+"""Local GENERAL / ESPECÍFICA classifier that runs ahead of the triage LLM.
+
+Every turn on the RAG endpoints starts with a triage LLM call whose only job,
+for most messages, is to decide between answering a greeting and transferring
+to the research pipeline. This module is a lexical model that makes the same
+decision in-process, in tens of microseconds:
+
+- Features are word unigrams and bigrams plus character 4-grams of the
+  casefolded, accent-free message (robust to typos and missing accents),
+  hashed into a fixed number of buckets and L2-normalised.
+- The model is a logistic regression, so `probability` is a calibrated-ish
+  P(ESPECÍFICA) that a confidence threshold can be applied to.
+- It is trained from labelled JSONL rows `{"text", "label", "domain"}`: the
+  seed set shipped next to this module plus, when configured, the traffic log
+  the triage callbacks write with the LLM's own decisions
+  (`RAG_TRIAGE_TRAFFIC_LOG`). Rows without a domain apply to every domain;
+  ESPECÍFICA rows of another domain count as GENERAL (the triage of one
+  pipeline answers off-domain questions itself).
+
+The triage callbacks (`agents.agrag.triage_fast_path_callbacks`) only act on
+confident ESPECÍFICA predictions; everything else still goes to the LLM.
+
+Train / try a model (from src/iax_agrag_agui_lab):
+    python -m routing.triage_classifier train --domain iax
+    python -m routing.triage_classifier classify --domain iax "¿Qué es IAX?"
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GENERAL = "GENERAL"
+SPECIFIC = "ESPECIFICA"
+
+SEED_PATH = Path(__file__).with_name("triage_seed.jsonl")
+TRIAGE_MODEL_DIR = os.getenv("RAG_TRIAGE_MODEL_DIR", "data/models")
+TRIAGE_TRAFFIC_LOG = os.getenv("RAG_TRIAGE_TRAFFIC_LOG")
+
+DEFAULT_BUCKETS = 1 << 18
+DEFAULT_L2 = 1e-5
+DEFAULT_ITERATIONS = 2000
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize_label(label: str) -> str:
+    """'ESPECÍFICA', 'especifica', ... -> SPECIFIC; anything else must be GENERAL."""
+    folded = _fold(label).upper()
+    if folded not in (GENERAL, SPECIFIC):
+        raise ValueError(f"Unknown triage label {label!r}")
+    return folded
+
+
+def _fold(text: str) -> str:
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in folded if not unicodedata.combining(c))
+
+
+def features(text: str, buckets: int = DEFAULT_BUCKETS) -> tuple[np.ndarray, np.ndarray]:
+    """(bucket ids, weights) of the hashed n-gram features of `text`."""
+    words = _TOKEN.findall(_fold(text))
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        grams += [f"c:{padded[i:i + 4]}" for i in range(max(len(padded) - 3, 1))]
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    # crc32 rather than hash(): bucket ids must not change between processes.
+    ids = np.unique([zlib.crc32(g.encode()) % buckets for g in grams])
+    return ids.astype(np.int64), np.full(len(ids), 1 / np.sqrt(len(ids)), dtype=np.float32)
+
+
+def load_examples(paths: Iterable[str | os.PathLike], domain: str) -> list[tuple[str, str]]:
+    """(text, label) pairs for `domain` from labelled JSONL files (missing files are skipped)."""
+    examples: list[tuple[str, str]] = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                label = normalize_label(row["label"])
+                row_domain = row.get("domain")
+                if row_domain not in (None, domain):
+                    label = GENERAL  # Off-domain question: that triage answers it itself
+                examples.append((row["text"], label))
+    return examples
+
+
+@dataclass
+class TriagePrediction:
+    label: str
+    confidence: float  # Probability of `label`
+
+
+class TriageClassifier:
+    """Logistic regression over hashed n-gram features."""
+
+    def __init__(self, weights: np.ndarray, bias: float) -> None:
+        self.weights = weights.astype(np.float32, copy=False)
+        self.bias = float(bias)
+
+    @property
+    def buckets(self) -> int:
+        return len(self.weights)
+
+    @classmethod
+    def train(
+        cls,
+        examples: Sequence[tuple[str, str]],
+        buckets: int = DEFAULT_BUCKETS,
+        l2: float = DEFAULT_L2,
+        iterations: int = DEFAULT_ITERATIONS,
+    ) -> "TriageClassifier":
+        """Full-batch gradient descent on the (class-balanced) log loss."""
+        if not examples:
+            raise ValueError("No training examples")
+        rows = [features(text, buckets) for text, _ in examples]
+        lengths = np.array([len(ids) for ids, _ in rows])
+        # Only the buckets that occur are trained: a few thousand, not `buckets`.
+        used, cols = np.unique(np.concatenate([ids for ids, _ in rows]), return_inverse=True)
+        vals = np.concatenate([v for _, v in rows]).astype(np.float64)
+        row_of = np.repeat(np.arange(len(rows)), lengths)
+        y = np.array([normalize_label(label) == SPECIFIC for _, label in examples], dtype=np.float64)
+        # Balanced classes: the seed set and the traffic log are not 50/50.
+        positives = max(y.sum(), 1.0)
+        negatives = max(len(y) - y.sum(), 1.0)
+        sample_weight = np.where(y == 1, len(y) / (2 * positives), len(y) / (2 * negatives))
+
+        local = np.zeros(len(used))
+        bias = 0.0
+        step = 4.0  # Rows are unit-norm, so the loss is smooth enough for a fixed step
+        for _ in range(iterations):
+            logits = np.bincount(row_of, weights=local[cols] * vals, minlength=len(y)) + bias
+            error = (1 / (1 + np.exp(-logits)) - y) * sample_weight / len(y)
+            grad = np.bincount(cols, weights=error[row_of] * vals, minlength=len(used))
+            local -= step * (grad + l2 * local)
+            bias -= step * error.sum()
+        weights = np.zeros(buckets, dtype=np.float32)
+        weights[used] = local
+        return cls(weights, bias)
+
+    def probability(self, text: str) -> float:
+        """P(ESPECÍFICA) for one message."""
+        ids, vals = features(text, self.buckets)
+        logit = float(self.weights[ids] @ vals) + self.bias
+        return float(1 / (1 + np.exp(-logit)))
+
+    def predict(self, text: str) -> TriagePrediction:
+        p = self.probability(text)
+        return TriagePrediction(SPECIFIC, p) if p >= 0.5 else TriagePrediction(GENERAL, 1 - p)
+
+    def save(self, path: str | os.PathLike) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, weights=self.weights, bias=np.float64(self.bias))
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> "TriageClassifier":
+        with np.load(path) as data:
+            return cls(data["weights"], float(data["bias"]))
+
+
+def model_path(domain: str, model_dir: str = TRIAGE_MODEL_DIR) -> str:
+    return os.path.join(model_dir, f"triage-{domain}.npz")
+
+
+def training_paths(traffic_log: Optional[str] = TRIAGE_TRAFFIC_LOG) -> list[str]:
+    return [str(SEED_PATH)] + ([traffic_log] if traffic_log else [])
+
+
+def load_triage_classifier(
+    domain: str,
+    model_dir: str = TRIAGE_MODEL_DIR,
+    traffic_log: Optional[str] = TRIAGE_TRAFFIC_LOG,
+) -> TriageClassifier:
+    """The trained model for `domain`, or one trained on the spot from seed + traffic."""
+    path = model_path(domain, model_dir)
+    if os.path.exists(path):
+        return TriageClassifier.load(path)
+    started = time.perf_counter()
+    examples = load_examples(training_paths(traffic_log), domain)
+    classifier = TriageClassifier.train(examples)
+    logger.info(
+        "No triage model at %s: trained on %d examples in %.0f ms",
+        path,
+        len(examples),
+        (time.perf_counter() - started) * 1000,
+    )
+    return classifier
+
+
+class TriageTrafficLog:
+    """Append-only JSONL of the triage LLM's decisions, to retrain the classifier from."""
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, domain: str, text: str, label: str) -> None:
+        row = {"text": text, "label": normalize_label(label), "domain": domain, "ts": time.time()}
+        line = json.dumps(row, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    train_cmd = sub.add_parser("train", help="Train and save the model for one domain")
+    train_cmd.add_argument("--domain", required=True)
+    train_cmd.add_argument("--data", nargs="*", default=None, help="Labelled JSONL files (default: seed + traffic log)")
+    train_cmd.add_argument("--out", default=None)
+    classify_cmd = sub.add_parser("classify", help="Classify messages with the domain's model")
+    classify_cmd.add_argument("--domain", required=True)
+    classify_cmd.add_argument("texts", nargs="+")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "train":
+        examples = load_examples(args.data or training_paths(), args.domain)
+        out = args.out or model_path(args.domain)
+        TriageClassifier.train(examples).save(out)
+        print(f"Trained on {len(examples)} examples -> {out}")
+    else:
+        classifier = load_triage_classifier(args.domain)
+        for text in args.texts:
+            prediction = classifier.predict(text)
+            print(f"{prediction.label:<10} {prediction.confidence:.3f}  {text}")
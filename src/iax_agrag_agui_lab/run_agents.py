@@ -15,14 +15,17 @@ Replace `hello_agent` with your real ADK agent implementation.
 from __future__ import annotations
 
 
+import asyncio
+import logging
 import os
+import sys
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
 from agui.adk_agui_agent_server import AdkAguiAgentServer
-from agents.hello_agent import hello_agent
+from agui.agent_registry import AGENT_WARM_UP_ENABLED, agent_registry
 from dotenv import load_dotenv
 
 from debug import configure_console_logging
@@ -30,17 +33,70 @@ from debug import configure_console_logging
 load_dotenv()
 configure_console_logging()
 
-from agents.coordinator_agent import coordinator
-from agents.pizza_agent import pizzeria_bot
-from agents.agrag.agentic_rag import agentic_rag_bot
+from retrieval.semantic_cache import semantic_answer_cache
+from sessions.backends import close_session_services
+
+logger = logging.getLogger(__name__)
+
+# Agents are imported on their endpoint's first request (or by the background
+# warm-up with AGUI_AGENT_WARM_UP=true), not when this module is imported:
+# see agui.agent_registry.
+hello_agent = agent_registry.register("hello_agent_v1", "agents.hello_agent:hello_agent")
+coordinator = agent_registry.register("Coordinator", "agents.coordinator_agent:coordinator")
+pizzeria_bot = agent_registry.register("Cajero", "agents.pizza_agent:pizzeria_bot")
+agentic_rag_bot = agent_registry.register("TriageAgent", "agents.agrag.agentic_rag:agentic_rag_bot")
+agentic_rag_multi_query_bot = agent_registry.register(
+    "TriageAgent", "agents.agrag.agentic_rag_multi_query:agentic_rag_multi_query_bot"
+)
+workana_rag_bot = agent_registry.register("WorkanaTriageAgent", "agents.agrag.workana_rag_agent:workana_rag_bot")
+
+RAG_INITIAL_STATE = {
+    "triage_result": "",
+    "retrieved_chunks": "",
+    "final_response": "",
+}
+
+
+def configure_tracing() -> None:
+    """Configure LangSmith tracing (at startup rather than on import)."""
+    from langsmith.integrations.otel import configure
+
+    configure(
+        api_key=os.getenv("LANGSMITH_API_KEY"),
+        project_name=os.getenv("LANGSMITH_PROJECT")
+    )
+
+
+async def warm_up() -> None:
+    """Build agents and the shared vector stores / embedding clients in the background."""
+    from retrieval.registry import retriever_registry
+
+    await asyncio.to_thread(retriever_registry.warm_up)
+    await agent_registry.warm_up()
+    await warm_up_agent_router()
+
+
+async def warm_up_agent_router() -> None:
+    """Embed the Coordinator's routing catalog so the first routed message doesn't pay for it."""
+    coordinator_module = sys.modules.get("agents.coordinator_agent")  # Only if its warm-up succeeded
+    if coordinator_module is None:
+        return
+    from agents.agent_router_callbacks import AGENT_ROUTER_ENABLED
+
+    if not AGENT_ROUTER_ENABLED:
+        return
+    try:
+        await coordinator_module.coordinator_router.warm_up()
+    except Exception:
+        logger.exception("Agent router warm-up failed; the catalog will be embedded on first use")
 
-from agents.agrag.agentic_rag_multi_query import agentic_rag_multi_query_bot
-from agents.agrag.workana_rag_agent import workana_rag_bot
-from agents.coordinator_agent import coordinator
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
+    # Startup: mount every endpoint right away; nothing here waits on agents,
+    # model clients or external services.
+    configure_tracing()
+
     await AdkAguiAgentServer(
         hello_agent, agui_main_path="/hello-adk-agui"
     ).register_app(app, initialState={})
@@ -52,51 +108,24 @@ async def lifespan(app: FastAPI):
     )
     await AdkAguiAgentServer(
         agentic_rag_bot, agui_main_path="/agentic-rag"
-    ).register_app(
-        app,
-        initialState={
-            "triage_result": "",
-            "retrieved_chunks": "",
-            "final_response": "",
-        },
-    )
-
+    ).register_app(app, initialState=RAG_INITIAL_STATE)
     await AdkAguiAgentServer(
         agentic_rag_multi_query_bot, agui_main_path="/mq-agentic-rag"
-    ).register_app(
-        app,
-        initialState={
-            "triage_result": "",
-            "retrieved_chunks": "",
-            "final_response": "",
-        },
-    )
-
-    await AdkAguiAgentServer(
-            workana_rag_bot, agui_main_path="/workana_rag"
-    ).register_app(
-        app,
-        initialState={
-            "triage_result": "",
-            "retrieved_chunks": "",
-            "final_response": "",
-        },
-    )
-
+    ).register_app(app, initialState=RAG_INITIAL_STATE)
     await AdkAguiAgentServer(
-            coordinator, agui_main_path="/coordinator"
-    ).register_app(
-        app,
-        initialState={
-            "triage_result": "",
-            "retrieved_chunks": "",
-            "final_response": "",
-        },
-    )
+        workana_rag_bot, agui_main_path="/workana_rag"
+    ).register_app(app, initialState=RAG_INITIAL_STATE)
 
+    warm_up_task = asyncio.create_task(warm_up()) if AGENT_WARM_UP_ENABLED else None
 
     yield
     # Shutdown (si necesitas limpiar algo)
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    await close_session_services()  # Flush queued session events to SQLite
+    registry_module = sys.modules.get("retrieval.registry")  # Only if some agent loaded it
+    if registry_module is not None:
+        await registry_module.retriever_registry.aclose()
 
 
 app = FastAPI(title="AGUI Context + History + State", lifespan=lifespan)
@@ -113,13 +142,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure LangSmith tracing
-from langsmith.integrations.otel import configure
-import os
-configure(
-    api_key=os.getenv("LANGSMITH_API_KEY"),
-    project_name=os.getenv("LANGSMITH_PROJECT")
-)  
+@app.get("/semantic-cache/stats")
+async def semantic_cache_stats() -> dict:
+    return semantic_answer_cache.stats()
+
+
+@app.delete("/semantic-cache")
+async def invalidate_semantic_cache(namespace: str | None = None) -> dict:
+    """Drop cached answers, e.g. `?namespace=workana` after re-indexing that index."""
+    return {"invalidated": semantic_answer_cache.invalidate(namespace)}
+
+
+@app.get("/agents")
+async def agents_status() -> dict:
+    """Which agents are loaded yet, and how long each took to import."""
+    return agent_registry.stats()
+
 
 if __name__ == "__main__":  # pragma: no cover - manual run helper
     import uvicorn
@@ -24,6 +24,9 @@ logging.getLogger('event_translator').setLevel(logging.ERROR)
 logging.getLogger('session_manager').setLevel(logging.ERROR)
 logging.getLogger('endpoint').setLevel(logging.ERROR)
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from starlette.middleware.cors import CORSMiddleware
 
@@ -33,6 +36,9 @@ from ag_ui_adk import ADKAgent
 
 from agents.agrag.agentic_rag_multi_query import agentic_rag_multi_query_bot
 from agents.agrag.workana_rag_agent import workana_rag_bot
+from retrieval.registry import retriever_registry
+from retrieval.semantic_cache import semantic_answer_cache
+from sessions.backends import close_session_services, create_session_service
 
 # Dynamic Identification
 # Recommended for multi-tenant applications:
@@ -49,8 +55,17 @@ def extract_user(input: RunAgentInput) -> str:
         if ctx.description == "user":
             return ctx.value
     return f"anonymous_{input.thread_id}"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the shared vector stores / embedding clients before the first request
+    await asyncio.to_thread(retriever_registry.warm_up)
+    yield
+    await close_session_services()
+    await retriever_registry.aclose()
+
 # Create FastAPI application
-app = FastAPI(title="AGUI Official - AGRAG Multi-Query")
+app = FastAPI(title="AGUI Official - AGRAG Multi-Query", lifespan=lifespan)
 
 # Exception handler to log errors
 @app.exception_handler(Exception)
@@ -77,10 +92,15 @@ app.add_middleware(
 )
 from agents.coordinator_agent import coordinator
 
+# ag_ui_adk's SessionManager is a process-wide singleton: only the session
+# service of the first ADKAgent is used, so both agents get the same one.
+session_service = create_session_service()  # AGUI_SESSION_BACKEND: memory | sqlite
+
 agent = ADKAgent(
     adk_agent=coordinator,              # Required: The ADK agent to embed
     app_name_extractor=extract_app,
     user_id_extractor=extract_user,
+    session_service=session_service,
 
     session_timeout_seconds=1200,    # Optional: Session timeout (default: 20 minutes)
     cleanup_interval_seconds=300,    # Optional: Cleanup interval (default: 5 minutes)
@@ -106,6 +126,7 @@ workana_agent = ADKAgent(
     adk_agent=workana_rag_bot,
     app_name_extractor=extract_app,
     user_id_extractor=extract_user,
+    session_service=session_service,
 
     session_timeout_seconds=1200,
     cleanup_interval_seconds=300,
@@ -121,6 +142,16 @@ add_adk_fastapi_endpoint(
     path="/workana_rag"
 )
 
+@app.get("/semantic-cache/stats")
+async def semantic_cache_stats() -> dict:
+    return semantic_answer_cache.stats()
+
+
+@app.delete("/semantic-cache")
+async def invalidate_semantic_cache(namespace: str | None = None) -> dict:
+    """Drop cached answers, e.g. `?namespace=workana` after re-indexing that index."""
+    return {"invalidated": semantic_answer_cache.invalidate(namespace)}
+
 # Configure LangSmith tracing
 from langsmith.integrations.otel import configure
 import os
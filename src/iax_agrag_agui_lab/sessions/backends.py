@@ -0,0 +1,58 @@
+"""Session service backends, selectable per endpoint.
+
+- `memory` (default): `ShardedInMemorySessionService`, one per endpoint;
+  sessions are lost on restart and private to the worker process.
+- `sqlite`: `SqliteSessionService` on `AGUI_SESSION_DB`; survives restarts
+  and is shared by every worker on the host. Endpoints on the same file share
+  one service (and one write-behind queue); their sessions are told apart by
+  app name.
+
+The default comes from `AGUI_SESSION_BACKEND`; `AdkAguiAgentServer(...,
+session_backend="sqlite")` overrides it for one endpoint. Call
+`close_session_services()` on shutdown so queued events are flushed.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from google.adk.sessions import BaseSessionService
+
+from sessions.sharded_session_service import ShardedInMemorySessionService
+from sessions.sqlite_session_service import SqliteSessionService
+
+MEMORY_BACKEND = "memory"
+SQLITE_BACKEND = "sqlite"
+
+SESSION_BACKEND = os.getenv("AGUI_SESSION_BACKEND", MEMORY_BACKEND).lower()
+SESSION_DB = os.getenv("AGUI_SESSION_DB", "data/sessions.sqlite")
+
+_sqlite_services: dict[str, SqliteSessionService] = {}
+_sqlite_lock = threading.Lock()
+
+
+def create_session_service(
+    backend: Optional[str] = None, path: Optional[str] = None
+) -> BaseSessionService:
+    backend = (backend or SESSION_BACKEND).lower()
+    if backend == MEMORY_BACKEND:
+        return ShardedInMemorySessionService()
+    if backend == SQLITE_BACKEND:
+        resolved = str(Path(path or SESSION_DB).resolve())
+        with _sqlite_lock:
+            if resolved not in _sqlite_services:
+                _sqlite_services[resolved] = SqliteSessionService(resolved)
+            return _sqlite_services[resolved]
+    raise ValueError(f"Unknown session backend {backend!r} (expected {MEMORY_BACKEND!r} or {SQLITE_BACKEND!r})")
+
+
+async def close_session_services() -> None:
+    """Flush and close every SQLite service created by `create_session_service`."""
+    with _sqlite_lock:
+        services = list(_sqlite_services.values())
+        _sqlite_services.clear()
+    for service in services:
+        await service.close()
@@ -0,0 +1,219 @@
+"""Content-addressed store for large session-state values.
+
+Retrieval stages write whole JSON payloads of documents into state
+(`retrieved_chunks`, `MultiRetrievalAgent.retrieved_chunks`,
+`prefetched_chunks`). Every copy of the session deep-copies them, every state
+snapshot / STATE_DELTA sends them to the client, and the SQLite service writes
+them again in each state snapshot.
+
+With `AGUI_BLOB_STATE=true` the session services swap every state value whose
+JSON is at least `AGUI_BLOB_MIN_CHARS` long into this store as it is written
+(agent state deltas, PATCH /state and the initial state alike) and keep a
+reference in state instead:
+
+    "blob:sha256:<hex digest of the value's JSON>"
+
+References are resolved only where the value is actually read:
+
+- prompts: `resolve_blob_refs` (before_model_callback) expands references in
+  the instruction after ADK interpolated `{state_key}` into it;
+- code: `resolve_state_value(state.get(key))`;
+- clients: `GET <endpoint>/blobs/<digest>` returns the value.
+
+Blobs are files `<root>/<2 hex>/<digest>.json`, written once (identical
+payloads are stored once) and never rewritten; decoded values are kept in a
+small LRU. The session services write them from a worker thread
+(`aexternalize`), so disk latency does not stall the event loop.
+
+The store only grows while the app runs. Storing a payload again refreshes its
+file's mtime, and `sweep` deletes blobs not stored for longer than a given age.
+Keep that age above the lifetime of the sessions you keep, or old threads will
+hold references that no longer resolve:
+
+    python -m sessions.blob_store sweep --max-age-days 30
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+BLOB_STATE_ENABLED = os.getenv("AGUI_BLOB_STATE", "false").lower() in ("1", "true", "yes")
+BLOB_DIR = os.getenv("AGUI_BLOB_DIR", "data/blobs")
+BLOB_MIN_CHARS = int(os.getenv("AGUI_BLOB_MIN_CHARS", "4096"))
+
+BLOB_REF_PREFIX = "blob:sha256:"
+BLOB_REF = re.compile(r"blob:sha256:([0-9a-f]{64})")
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, str) and len(value) == len(BLOB_REF_PREFIX) + 64 and value.startswith(BLOB_REF_PREFIX)
+
+
+class BlobStore:
+    def __init__(
+        self,
+        root: str | os.PathLike = BLOB_DIR,
+        min_chars: int = BLOB_MIN_CHARS,
+        memory_entries: int = 256,
+    ) -> None:
+        self.root = Path(root)
+        self.min_chars = min_chars
+        self.memory_entries = memory_entries
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, Any] = OrderedDict()
+        self._counters = {"stored": 0, "deduplicated": 0, "memory_hits": 0, "disk_reads": 0}
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.json"
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _remember(self, digest: str, value: Any) -> None:
+        with self._lock:
+            self._memory[digest] = value
+            self._memory.move_to_end(digest)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def put(self, value: Any) -> str:
+        """Store `value` (anything JSON-serialisable) and return its reference."""
+        return self._put(json.dumps(value, ensure_ascii=False, default=str), value)
+
+    def _put(self, encoded: str, value: Any) -> str:
+        data = encoded.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        try:
+            os.utime(path)  # Stored again: keeps it out of `sweep`
+            self._count("deduplicated")
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write-then-rename: readers (other workers too) never see a partial blob.
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self._count("stored")
+        self._remember(digest, value)
+        return BLOB_REF_PREFIX + digest
+
+    def get(self, ref: str) -> Any:
+        """Value behind a reference; raises KeyError if the blob is missing."""
+        digest = ref.removeprefix(BLOB_REF_PREFIX)
+        with self._lock:
+            if digest in self._memory:
+                self._memory.move_to_end(digest)
+                self._counters["memory_hits"] += 1
+                return self._memory[digest]
+        try:
+            value = json.loads(self._path(digest).read_bytes())
+        except FileNotFoundError:
+            raise KeyError(ref) from None
+        self._count("disk_reads")
+        self._remember(digest, value)
+        return value
+
+    def externalize(self, state: dict[str, Any]) -> dict[str, Any]:
+        """Copy of `state` (or a state delta) with its large values swapped for references.
+
+        `temp:` keys are left alone: they never reach the stored session.
+        """
+        swapped = dict(state)
+        for key, value in state.items():
+            if not self._candidate(key, value):
+                continue
+            encoded = json.dumps(value, ensure_ascii=False, default=str)
+            if len(encoded) >= self.min_chars:
+                swapped[key] = self._put(encoded, value)
+        return swapped
+
+    async def aexternalize(self, state: dict[str, Any]) -> dict[str, Any]:
+        """`externalize` with the encoding and blob writes in a worker thread.
+
+        Deltas with nothing that could be large enough (the common case) skip the
+        thread hop.
+        """
+        if not any(self._candidate(key, value) for key, value in state.items()):
+            return dict(state)
+        return await asyncio.to_thread(self.externalize, state)
+
+    def _candidate(self, key: str, value: Any) -> bool:
+        """Whether `value` may be large enough to swap out, without encoding it."""
+        if key.startswith("temp:") or value is None or isinstance(value, (bool, int, float)) or is_blob_ref(value):
+            return False
+        return not (isinstance(value, str) and len(value) < self.min_chars)  # Its JSON cannot be long enough
+
+    def sweep(self, max_age_seconds: float) -> int:
+        """Delete blobs not stored for `max_age_seconds` (and stale temp files); returns how many."""
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for path in self.root.glob("??/*"):
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            if path.suffix == ".json":
+                removed += 1
+                with self._lock:
+                    self._memory.pop(path.stem, None)
+        return removed
+
+    def resolve(self, value: Any) -> Any:
+        return self.get(value) if is_blob_ref(value) else value
+
+    def resolve_text(self, text: str) -> str:
+        """`text` with every reference replaced by its value (strings as-is, the rest as JSON)."""
+
+        def expand(match: re.Match) -> str:
+            try:
+                value = self.get(match.group(0))
+            except KeyError:
+                return match.group(0)
+            return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+        return BLOB_REF.sub(expand, text) if BLOB_REF_PREFIX in text else text
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._counters, "memory_entries": len(self._memory)}
+
+
+blob_store = BlobStore()
+
+
+def state_blob_store() -> Optional[BlobStore]:
+    """The store session services swap large state into, or None when `AGUI_BLOB_STATE` is off."""
+    return blob_store if BLOB_STATE_ENABLED else None
+
+
+def resolve_state_value(value: Any, store: BlobStore = blob_store) -> Any:
+    """The value of a state entry, following a blob reference if it holds one."""
+    return store.resolve(value)
+
+
+if __name__ == "__main__":  # pragma: no cover - manual run helper
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    sweep_cmd = sub.add_parser("sweep", help="Delete blobs not stored for the given age")
+    sweep_cmd.add_argument("--max-age-days", type=float, required=True)
+    sweep_cmd.add_argument("--root", default=BLOB_DIR)
+    args = parser.parse_args()
+
+    removed = BlobStore(args.root).sweep(args.max_age_days * 86400)
+    print(f"Removed {removed} blobs from {args.root}")
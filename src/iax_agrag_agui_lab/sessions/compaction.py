@@ -0,0 +1,342 @@
+"""Event-log compaction and memory budgets for the session services.
+
+Every turn of a long conversation stays in the session's event list, tool
+payloads included (a retrieval tool answers with whole documents), and that
+list is re-read to build each LLM request and returned by the history
+endpoint. `SessionMemory` bounds it:
+
+- Compaction: when a new turn (invocation) starts, every event older than the
+  last `keep_turns` turns is folded once: user and model messages, function
+  calls and control actions (transfers, escalations) are kept; function
+  responses larger than `max_payload_chars` become a stub with a preview;
+  thought parts, inline data, usage/grounding metadata and state deltas
+  (already folded into `session.state`) are dropped, as are events left
+  empty. Recent turns are never touched, so the running turn always sees its
+  full tool output.
+- Per-session cap: if a compacted session still exceeds `max_session_bytes`,
+  its oldest compacted turns are dropped whole (a function call never loses
+  its response).
+- Global cap: sessions are kept in LRU order; when the service holds more than
+  `max_total_bytes`, sessions idle for `idle_seconds` are handed back to the
+  service for eviction, least recently used first.
+- Accounting: sessions / events / estimated bytes per app name (one app per
+  endpoint), plus compaction and eviction counters.
+
+Sizes are estimates, taken once: per event, the length of its text and JSON
+payloads plus a fixed overhead; per state key, the JSON length of its value.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import Session, State
+
+logger = logging.getLogger(__name__)
+
+COMPACT_KEEP_TURNS = int(os.getenv("AGUI_COMPACT_KEEP_TURNS", "3"))
+COMPACT_MAX_PAYLOAD_CHARS = int(os.getenv("AGUI_COMPACT_MAX_PAYLOAD_CHARS", "2000"))
+COMPACT_PREVIEW_CHARS = int(os.getenv("AGUI_COMPACT_PREVIEW_CHARS", "300"))
+SESSION_MAX_BYTES = int(os.getenv("AGUI_SESSION_MAX_BYTES", str(4 * 1024 * 1024)))
+SESSIONS_MAX_TOTAL_BYTES = int(os.getenv("AGUI_SESSIONS_MAX_TOTAL_BYTES", str(512 * 1024 * 1024)))
+SESSION_IDLE_SECONDS = float(os.getenv("AGUI_SESSION_IDLE_SECONDS", "600"))
+
+SessionKey = tuple[str, str, str]  # (app_name, user_id, session_id)
+
+
+_EVENT_OVERHEAD = 300  # ids, author, timestamps and JSON keys of an event
+
+
+def event_bytes(event: Event) -> int:
+    """Rough serialized size: payload text and JSON plus a fixed overhead."""
+    size = _EVENT_OVERHEAD
+    for part in event.content.parts if event.content and event.content.parts else []:
+        if part.text:
+            size += len(part.text)
+        if part.function_call is not None and part.function_call.args:
+            size += state_bytes(part.function_call.args)
+        if part.function_response is not None and part.function_response.response:
+            size += state_bytes(part.function_response.response)
+        if part.inline_data is not None and part.inline_data.data:
+            size += len(part.inline_data.data)
+    if event.actions and event.actions.state_delta:
+        size += state_bytes(event.actions.state_delta)
+    return size
+
+
+def state_bytes(state: dict[str, Any]) -> int:
+    return len(json.dumps(state, ensure_ascii=False, default=str))
+
+
+def state_sizes(state: dict[str, Any]) -> dict[str, int]:
+    """Estimated bytes per state key (temp: keys are never stored)."""
+    return {
+        key: len(key) + state_bytes(value)
+        for key, value in state.items()
+        if not key.startswith(State.TEMP_PREFIX)
+    }
+
+
+class EventCompactor:
+    def __init__(
+        self,
+        keep_turns: int = COMPACT_KEEP_TURNS,
+        max_payload_chars: int = COMPACT_MAX_PAYLOAD_CHARS,
+        preview_chars: int = COMPACT_PREVIEW_CHARS,
+    ) -> None:
+        if keep_turns < 1:
+            raise ValueError("keep_turns must be >= 1")
+        self.keep_turns = keep_turns
+        self.max_payload_chars = max_payload_chars
+        self.preview_chars = preview_chars
+
+    def recent_start(self, events: list[Event]) -> int:
+        """Index of the first event of the last `keep_turns` invocations."""
+        turns = 0
+        current = None
+        for i in range(len(events) - 1, -1, -1):
+            if events[i].invocation_id != current:
+                current = events[i].invocation_id
+                turns += 1
+                if turns > self.keep_turns:
+                    return i + 1
+        return 0
+
+    def compact_payload(self, response: dict[str, Any]) -> Optional[dict[str, Any]]:
+        """Stub for a tool response, or None if it is small enough to keep."""
+        text = json.dumps(response, ensure_ascii=False, default=str)
+        if len(text) <= self.max_payload_chars:
+            return None
+        return {"compacted": True, "chars": len(text), "preview": text[: self.preview_chars]}
+
+    def compact_event(self, event: Event) -> Optional[Event]:
+        """Compacted copy of an old event, or None if nothing worth keeping is left."""
+        parts = []
+        for part in event.content.parts if event.content and event.content.parts else []:
+            if part.thought or part.inline_data is not None:
+                continue
+            response = part.function_response
+            if response is not None and response.response:
+                stub = self.compact_payload(response.response)
+                if stub is not None:
+                    part = part.model_copy(
+                        update={"function_response": response.model_copy(update={"response": stub})}
+                    )
+            parts.append(part)
+        actions = event.actions.model_copy(update={"state_delta": {}})
+        content = event.content.model_copy(update={"parts": parts}) if parts else None
+        if content is None and not actions.model_dump(exclude_defaults=True):
+            return None
+        return event.model_copy(
+            update={
+                "content": content,
+                "actions": actions,
+                "usage_metadata": None,
+                "grounding_metadata": None,
+            }
+        )
+
+
+@dataclass
+class SessionLog:
+    """Compaction bookkeeping for one stored session."""
+
+    app_name: str
+    compacted: int = 0  # events[:compacted] are already compacted
+    event_sizes: dict[str, int] = field(default_factory=dict)
+    key_sizes: dict[str, int] = field(default_factory=dict)  # Per state key
+    events_bytes: int = 0
+    state_bytes: int = 0
+    last_access: float = field(default_factory=time.monotonic)
+
+    @property
+    def bytes(self) -> int:
+        return self.events_bytes + self.state_bytes
+
+
+@dataclass
+class _AppUsage:
+    sessions: int = 0
+    events: int = 0
+    bytes: int = 0
+    compactions: int = 0
+    compacted_events: int = 0
+    dropped_events: int = 0
+    evictions: int = 0
+
+
+class SessionMemory:
+    """Compaction, caps and accounting shared by the stored sessions of a service.
+
+    The service calls `appended` / `loaded` while it holds the session's own
+    lock (they rewrite `session.events`), and evicts the keys `appended`
+    returns once it has released it.
+    """
+
+    def __init__(
+        self,
+        compactor: Optional[EventCompactor] = None,
+        max_session_bytes: int = SESSION_MAX_BYTES,
+        max_total_bytes: int = SESSIONS_MAX_TOTAL_BYTES,
+        idle_seconds: float = SESSION_IDLE_SECONDS,
+    ) -> None:
+        self.compactor = compactor or EventCompactor()
+        self.max_session_bytes = max_session_bytes
+        self.max_total_bytes = max_total_bytes
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._logs: OrderedDict[SessionKey, SessionLog] = OrderedDict()  # LRU order
+        self._apps: dict[str, _AppUsage] = {}
+        self._total = 0
+
+    def _log(self, key: SessionKey) -> SessionLog:
+        log = self._logs.get(key)
+        if log is None:
+            log = self._logs[key] = SessionLog(key[0])
+            self._apps.setdefault(key[0], _AppUsage()).sessions += 1
+        log.last_access = time.monotonic()
+        self._logs.move_to_end(key)
+        return log
+
+    def _resize(self, log: SessionLog, events: int, events_bytes: int, state_size: int) -> None:
+        usage = self._apps[log.app_name]
+        delta = events_bytes + state_size - log.bytes
+        usage.events += events
+        usage.bytes += delta
+        self._total += delta
+        log.events_bytes = events_bytes
+        log.state_bytes = state_size
+
+    def touch(self, key: SessionKey) -> None:
+        with self._lock:
+            if key in self._logs:
+                self._log(key)
+
+    def _forget(self, key: SessionKey) -> None:
+        log = self._logs.pop(key, None)
+        if log is not None:
+            usage = self._apps[log.app_name]
+            usage.sessions -= 1
+            usage.events -= len(log.event_sizes)
+            usage.bytes -= log.bytes
+            self._total -= log.bytes
+
+    def forget(self, key: SessionKey) -> None:
+        with self._lock:
+            self._forget(key)
+
+    def loaded(self, key: SessionKey, session: Session) -> list[SessionKey]:
+        """Account (and compact) a session created or loaded into memory."""
+        with self._lock:
+            self._forget(key)
+            log = self._log(key)
+            log.event_sizes = {event.id: event_bytes(event) for event in session.events}
+            log.key_sizes = state_sizes(session.state)
+            self._resize(log, len(session.events), sum(log.event_sizes.values()), sum(log.key_sizes.values()))
+            self._compact(key, log, session)
+            return self._evictable(key)
+
+    def appended(self, key: SessionKey, session: Session, event: Event) -> list[SessionKey]:
+        """Account an event just appended to `session.events`; compacts when a turn starts.
+
+        Returns the idle sessions to evict to get back under `max_total_bytes`.
+        """
+        size = event_bytes(event)
+        delta_sizes = state_sizes(event.actions.state_delta) if event.actions else {}
+        with self._lock:
+            log = self._log(key)
+            log.event_sizes[event.id] = size
+            state_size = log.state_bytes
+            for state_key, key_size in delta_sizes.items():
+                state_size += key_size - log.key_sizes.get(state_key, 0)
+                log.key_sizes[state_key] = key_size
+            self._resize(log, 1, log.events_bytes + size, state_size)
+            events = session.events
+            if len(events) > 1 and events[-2].invocation_id != event.invocation_id:
+                self._compact(key, log, session)
+            return self._evictable(key)
+
+    def _compact(self, key: SessionKey, log: SessionLog, session: Session) -> None:
+        events = session.events
+        start = self.compactor.recent_start(events)
+        if start <= log.compacted and log.bytes <= self.max_session_bytes:
+            return
+        usage = self._apps[log.app_name]
+        sizes = log.event_sizes
+        folded = []
+        for event in events[log.compacted : start]:
+            compacted = self.compactor.compact_event(event)
+            sizes.pop(event.id, None)
+            if compacted is not None:
+                sizes[compacted.id] = event_bytes(compacted)
+                folded.append(compacted)
+        head = events[: log.compacted] + folded
+        usage.compacted_events += start - log.compacted
+        usage.compactions += 1
+
+        # Still over the per-session cap: drop the oldest compacted turns whole.
+        head_bytes = sum(sizes.get(event.id, 0) for event in head)
+        total = head_bytes + sum(sizes.get(event.id, 0) for event in events[start:]) + log.state_bytes
+        dropped = 0
+        while dropped < len(head) and total > self.max_session_bytes:
+            invocation = head[dropped].invocation_id
+            while dropped < len(head) and head[dropped].invocation_id == invocation:
+                total -= sizes.pop(head[dropped].id, 0)
+                dropped += 1
+        if dropped:
+            usage.dropped_events += dropped
+            logger.info(
+                "Session %s over %d bytes: dropped its %d oldest events", key[2], self.max_session_bytes, dropped
+            )
+        head = head[dropped:]
+
+        removed = len(events) - (len(head) + len(events) - start)
+        session.events = head + events[start:]
+        log.compacted = len(head)
+        self._resize(log, -removed, sum(sizes.values()), log.state_bytes)
+
+    def _evictable(self, current: SessionKey) -> list[SessionKey]:
+        if self._total <= self.max_total_bytes:
+            return []
+        now = time.monotonic()
+        victims = []
+        excess = self._total - self.max_total_bytes
+        for key, log in self._logs.items():  # Least recently used first
+            if excess <= 0 or now - log.last_access < self.idle_seconds:
+                break
+            if key != current:
+                victims.append(key)
+                excess -= log.bytes
+        if excess > 0:
+            logger.warning(
+                "Sessions hold %d bytes (cap %d) and no more are idle", self._total, self.max_total_bytes
+            )
+        return victims
+
+    def evicted(self, key: SessionKey) -> None:
+        with self._lock:
+            log = self._logs.get(key)
+            if log is not None:
+                self._apps[log.app_name].evictions += 1
+                self._forget(key)
+
+    def usage(self, app_name: Optional[str] = None) -> dict[str, dict[str, int]]:
+        """Per app name: sessions, events, estimated bytes and compaction/eviction counters."""
+        with self._lock:
+            return {
+                name: dict(vars(usage))
+                for name, usage in self._apps.items()
+                if app_name is None or name == app_name
+            }
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
@@ -0,0 +1,230 @@
+"""In-memory ADK session service sharded by (app, user, thread) with striped locks.
+
+`AdkAguiAgentServer` used to run every user of an endpoint in one fixed
+session: one event list and one state dict that grew with all conversations,
+and a single session the middleware's per-session lock serialised every run
+on. Sessions are now keyed by the AG-UI `thread_id` and the user, and live in
+this store:
+
+- Sessions are spread over `shards` dicts by a hash of (app, user, session);
+  each shard has its own lock, so concurrent conversations (and worker
+  threads, if the runner uses them) only contend when they hash together.
+- Reads hand out a copy, as `InMemorySessionService` does, but only the state
+  is deep-copied: the event list is copied shallowly and the (append-only)
+  events are shared, instead of deep-copying the whole history on every
+  `get_session`.
+- `app:` / `user:` state keys are kept aside and merged into every copy, with
+  the same semantics as ADK's in-memory service.
+- Old turns are compacted and memory is capped (see `sessions.compaction`):
+  sessions evicted by the global cap are gone, as on a restart.
+- With `AGUI_BLOB_STATE`, large state values are swapped into
+  `sessions.blob_store` as they are written and state keeps a reference.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import os
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session, State
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+from sessions.blob_store import BlobStore, state_blob_store
+from sessions.compaction import SessionMemory
+
+logger = logging.getLogger(__name__)
+
+SESSION_SHARDS = int(os.getenv("AGUI_SESSION_SHARDS", "64"))
+
+SessionKey = tuple[str, str, str]  # (app_name, user_id, session_id)
+
+
+@dataclass
+class _Shard:
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    sessions: dict[SessionKey, Session] = field(default_factory=dict)
+
+
+class ShardedInMemorySessionService(BaseSessionService):
+    def __init__(
+        self,
+        shards: int = SESSION_SHARDS,
+        memory: Optional[SessionMemory] = None,
+        blob_store: Optional[BlobStore] = state_blob_store(),
+    ) -> None:
+        if shards < 1:
+            raise ValueError("shards must be >= 1")
+        self._shards = [_Shard() for _ in range(shards)]
+        self.memory = memory or SessionMemory()
+        self.blob_store = blob_store
+        # Shared state and the per-user session index change far less often
+        # than events are appended, so one lock is enough for them.
+        self._shared_lock = threading.Lock()
+        self._app_state: dict[str, dict[str, Any]] = {}
+        self._user_state: dict[tuple[str, str], dict[str, Any]] = {}
+        self._user_sessions: dict[tuple[str, str], set[str]] = {}
+
+    def _shard(self, key: SessionKey) -> _Shard:
+        return self._shards[zlib.crc32("\0".join(key).encode()) % len(self._shards)]
+
+    def _copy(self, session: Session, events: Optional[list[Event]] = None) -> Session:
+        copied = session.model_copy(
+            update={
+                "state": copy.deepcopy(session.state),
+                "events": list(session.events if events is None else events),
+            }
+        )
+        with self._shared_lock:
+            for key, value in self._app_state.get(session.app_name, {}).items():
+                copied.state[State.APP_PREFIX + key] = copy.deepcopy(value)
+            for key, value in self._user_state.get((session.app_name, session.user_id), {}).items():
+                copied.state[State.USER_PREFIX + key] = copy.deepcopy(value)
+        return copied
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        if state and self.blob_store is not None:
+            state = await self.blob_store.aexternalize(state)
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=copy.deepcopy(state) if state else {},
+            last_update_time=time.time(),
+        )
+        key = (app_name, user_id, session_id)
+        shard = self._shard(key)
+        with shard.lock:
+            shard.sessions[key] = session
+            victims = self.memory.loaded(key, session)
+        with self._shared_lock:
+            self._user_sessions.setdefault((app_name, user_id), set()).add(session_id)
+        self._evict(victims)
+        return self._copy(session)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        shard = self._shard(key)
+        with shard.lock:
+            session = shard.sessions.get(key)
+            if session is None:
+                return None
+            events = session.events
+            if config and config.num_recent_events:
+                events = events[-config.num_recent_events :]
+            if config and config.after_timestamp:
+                events = [e for e in events if e.timestamp >= config.after_timestamp]
+            self.memory.touch(key)
+            return self._copy(session, events)
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        with self._shared_lock:
+            session_ids = sorted(self._user_sessions.get((app_name, user_id), ()))
+        sessions = []
+        for session_id in session_ids:
+            key = (app_name, user_id, session_id)
+            shard = self._shard(key)
+            with shard.lock:
+                session = shard.sessions.get(key)
+                if session is not None:
+                    sessions.append(self._copy(session, []))
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        shard = self._shard(key)
+        with shard.lock:
+            shard.sessions.pop(key, None)
+            self.memory.forget(key)
+        with self._shared_lock:
+            self._user_sessions.get((app_name, user_id), set()).discard(session_id)
+
+    def _evict(self, keys: list[SessionKey]) -> None:
+        for key in keys:
+            shard = self._shard(key)
+            with shard.lock:
+                shard.sessions.pop(key, None)
+                self.memory.evicted(key)
+            with self._shared_lock:
+                self._user_sessions.get(key[:2], set()).discard(key[2])
+        if keys:
+            logger.info("Evicted %d idle sessions over the memory cap", len(keys))
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if self.blob_store is not None and not event.partial and event.actions.state_delta:
+            # Before anything sees the delta: the caller's copy, storage and the client.
+            event.actions.state_delta = await self.blob_store.aexternalize(event.actions.state_delta)
+        # Update the caller's copy first (the base class skips partial events).
+        await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+        session.last_update_time = event.timestamp
+
+        key = (session.app_name, session.user_id, session.id)
+        shard = self._shard(key)
+        with shard.lock:
+            stored = shard.sessions.get(key)
+            if stored is None:
+                logger.warning("Failed to append event to session %s: not found", session.id)
+                return event
+            delta = event.actions.state_delta if event.actions else None
+            for state_key, value in (delta or {}).items():
+                if not state_key.startswith(State.TEMP_PREFIX):
+                    stored.state[state_key] = value
+            stored.events.append(event)
+            stored.last_update_time = event.timestamp
+            victims = self.memory.appended(key, stored, event)
+        if delta:
+            self._update_shared_state(session.app_name, session.user_id, delta)
+        self._evict(victims)
+        return event
+
+    def _update_shared_state(self, app_name: str, user_id: str, delta: dict[str, Any]) -> None:
+        with self._shared_lock:
+            for key, value in delta.items():
+                if key.startswith(State.APP_PREFIX):
+                    self._app_state.setdefault(app_name, {})[key.removeprefix(State.APP_PREFIX)] = value
+                elif key.startswith(State.USER_PREFIX):
+                    self._user_state.setdefault((app_name, user_id), {})[
+                        key.removeprefix(State.USER_PREFIX)
+                    ] = value
+
+    def stats(self) -> dict[str, int]:
+        sizes = []
+        events = 0
+        for shard in self._shards:
+            with shard.lock:
+                sizes.append(len(shard.sessions))
+                events += sum(len(s.events) for s in shard.sessions.values())
+        return {
+            "shards": len(self._shards),
+            "sessions": sum(sizes),
+            "max_shard_sessions": max(sizes),
+            "events": events,
+            "bytes": self.memory.total_bytes,
+        }
+
+    def memory_usage(self, app_name: Optional[str] = None) -> dict[str, dict[str, int]]:
+        return self.memory.usage(app_name)
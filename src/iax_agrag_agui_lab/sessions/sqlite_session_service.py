@@ -0,0 +1,521 @@
+"""Durable ADK session service on SQLite (WAL) with write-behind batching.
+
+In-memory sessions are lost on every restart and are private to one uvicorn
+worker. This service keeps them in a SQLite file in WAL mode, which every
+worker on the host can open, without putting a disk write on every event:
+
+- Write-behind: `append_event` updates the in-memory session and queues the
+  event; a background task flushes the queue every `flush_interval` seconds
+  (or as soon as `batch_size` events are waiting) in one transaction, off the
+  event loop. A crash loses at most the last `flush_interval` of events;
+  `flush()` / `close()` drain the queue (the app's shutdown calls `close`).
+- Compact state: an event row stores its state delta once, in its own column
+  (not also inside the event JSON), and the session row holds the current
+  state snapshot, rewritten once per flushed batch rather than once per event.
+  `app:` / `user:` keys live in their own tables, as in ADK's services.
+- Hot tier: recently used sessions stay in an LRU (`hot_sessions`) and are
+  served from memory, copied like `ShardedInMemorySessionService` does (deep
+  state, shared events). A hot session is reloaded when another worker has
+  flushed newer events for it. Hot sessions are compacted and count against
+  the memory caps of `sessions.compaction` (the database keeps the full log;
+  evicting a hot session loses nothing).
+- With `AGUI_BLOB_STATE`, large state values are swapped into
+  `sessions.blob_store` before anything is stored: the database and the hot
+  tier hold references.
+
+A thread is expected to be served by one worker at a time (the middleware's
+session lock is per process); concurrent writers to the same session from two
+workers both persist their events, but the state snapshot is last-flush-wins.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session, State
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+from sessions.blob_store import BlobStore, state_blob_store
+from sessions.compaction import SessionMemory
+
+logger = logging.getLogger(__name__)
+
+SESSION_HOT_ENTRIES = int(os.getenv("AGUI_SESSION_HOT_ENTRIES", "1024"))
+SESSION_FLUSH_INTERVAL = float(os.getenv("AGUI_SESSION_FLUSH_INTERVAL", "0.05"))
+SESSION_BATCH_SIZE = int(os.getenv("AGUI_SESSION_BATCH_SIZE", "256"))
+
+SessionKey = tuple[str, str, str]  # (app_name, user_id, session_id)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, id TEXT NOT NULL,
+    state TEXT NOT NULL, last_update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL,
+    event TEXT NOT NULL, state_delta TEXT
+);
+CREATE INDEX IF NOT EXISTS events_session ON events (app_name, user_id, session_id, seq);
+CREATE TABLE IF NOT EXISTS app_states (app_name TEXT PRIMARY KEY, state TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+"""
+
+
+@dataclass
+class _HotSession:
+    session: Session
+    flushed_update_time: float  # last_update_time of what is on disk, as far as we know
+    pending: int = 0  # Queued events not flushed yet
+
+
+@dataclass
+class _Batch:
+    events: list[tuple[SessionKey, str, Optional[str]]] = field(default_factory=list)
+    states: dict[SessionKey, tuple[str, float]] = field(default_factory=dict)
+    app_states: dict[str, str] = field(default_factory=dict)
+    user_states: dict[tuple[str, str], str] = field(default_factory=dict)
+
+
+def _event_row(event: Event) -> tuple[str, Optional[str]]:
+    """(event JSON without the state delta, state delta JSON or None)."""
+    delta = event.actions.state_delta if event.actions else None
+    stored = {k: v for k, v in (delta or {}).items() if not k.startswith(State.TEMP_PREFIX)}
+    body = event.model_dump(mode="json", exclude_none=True)
+    body.get("actions", {}).pop("state_delta", None)
+    return (
+        json.dumps(body, ensure_ascii=False, separators=(",", ":")),
+        json.dumps(stored, ensure_ascii=False, separators=(",", ":")) if stored else None,
+    )
+
+
+def _load_event(body: str, delta: Optional[str]) -> Event:
+    data = json.loads(body)
+    if delta:
+        data.setdefault("actions", {})["state_delta"] = json.loads(delta)
+    return Event.model_validate(data)
+
+
+class SqliteSessionService(BaseSessionService):
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        hot_sessions: int = SESSION_HOT_ENTRIES,
+        flush_interval: float = SESSION_FLUSH_INTERVAL,
+        batch_size: int = SESSION_BATCH_SIZE,
+        memory: Optional[SessionMemory] = None,
+        blob_store: Optional[BlobStore] = state_blob_store(),
+    ) -> None:
+        self.path = str(path)
+        self.hot_sessions = hot_sessions
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.memory = memory or SessionMemory()
+        self.blob_store = blob_store
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+        self._lock = threading.Lock()  # Hot tier, shared state and the queue
+        self._hot: OrderedDict[SessionKey, _HotSession] = OrderedDict()
+        self._app_state: dict[str, dict[str, Any]] = {}
+        self._user_state: dict[tuple[str, str], dict[str, Any]] = {}
+        self._batch = _Batch()
+        self._queued = 0
+        self._flusher: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._flush_lock = asyncio.Lock()
+        self._closed = False
+        self._counters = {"appends": 0, "flushes": 0, "flushed_events": 0, "hot_hits": 0, "loads": 0}
+
+    # ---- SQLite access (runs in worker threads) ----
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._db_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _write(self, batch: _Batch) -> None:
+        with self._db_lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT INTO events (app_name, user_id, session_id, event, state_delta)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [(*key, body, delta) for key, body, delta in batch.events],
+                )
+                self._db.executemany(
+                    "UPDATE sessions SET state = ?, last_update_time = ?"
+                    " WHERE app_name = ? AND user_id = ? AND id = ?",
+                    [(state, updated, *key) for key, (state, updated) in batch.states.items()],
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO app_states (app_name, state) VALUES (?, ?)",
+                    list(batch.app_states.items()),
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO user_states (app_name, user_id, state) VALUES (?, ?, ?)",
+                    [(*key, state) for key, state in batch.user_states.items()],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _load(self, key: SessionKey) -> Optional[tuple[Session, dict[str, Any], dict[str, Any]]]:
+        """(session, app state, user state) as stored, or None."""
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT state, last_update_time FROM sessions"
+                " WHERE app_name = ? AND user_id = ? AND id = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            events = self._db.execute(
+                "SELECT event, state_delta FROM events"
+                " WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq",
+                key,
+            ).fetchall()
+            app_row = self._db.execute(
+                "SELECT state FROM app_states WHERE app_name = ?", (key[0],)
+            ).fetchone()
+            user_row = self._db.execute(
+                "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", key[:2]
+            ).fetchone()
+        session = Session(
+            app_name=key[0],
+            user_id=key[1],
+            id=key[2],
+            state=json.loads(row[0]),
+            events=[_load_event(body, delta) for body, delta in events],
+            last_update_time=row[1],
+        )
+        return (
+            session,
+            json.loads(app_row[0]) if app_row else {},
+            json.loads(user_row[0]) if user_row else {},
+        )
+
+    # ---- Hot tier ----
+
+    def _copy(self, session: Session, events: Optional[list[Event]] = None) -> Session:
+        copied = session.model_copy(
+            update={
+                "state": copy.deepcopy(session.state),
+                "events": list(session.events if events is None else events),
+            }
+        )
+        for key, value in self._app_state.get(session.app_name, {}).items():
+            copied.state[State.APP_PREFIX + key] = copy.deepcopy(value)
+        for key, value in self._user_state.get((session.app_name, session.user_id), {}).items():
+            copied.state[State.USER_PREFIX + key] = copy.deepcopy(value)
+        return copied
+
+    def _remember(self, key: SessionKey, hot: _HotSession) -> None:
+        self._hot[key] = hot
+        self._hot.move_to_end(key)
+        self._trim(self.memory.loaded(key, hot.session))
+
+    def _trim(self, victims: Iterable[SessionKey] = ()) -> None:
+        """Drop sessions over the count or memory caps from the hot tier (caller holds `_lock`)."""
+        for key in victims:
+            hot = self._hot.get(key)
+            if hot is not None and not hot.pending:
+                del self._hot[key]
+                self.memory.evicted(key)
+        while len(self._hot) > self.hot_sessions:
+            oldest = next(iter(self._hot))
+            if self._hot[oldest].pending:
+                break  # Not evictable until flushed; the next flush trims the tier
+            self._hot.popitem(last=False)
+            self.memory.forget(oldest)
+
+    async def _hot_session(self, key: SessionKey) -> Optional[_HotSession]:
+        with self._lock:
+            hot = self._hot.get(key)
+            if hot is not None and hot.pending:
+                self._hot.move_to_end(key)
+                self._counters["hot_hits"] += 1
+                return hot
+        if hot is not None:
+            # Another worker may have flushed newer events for this session.
+            rows = await asyncio.to_thread(
+                self._query,
+                "SELECT last_update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                key,
+            )
+            if rows and rows[0][0] <= hot.flushed_update_time:
+                with self._lock:
+                    if self._hot.get(key) is hot:
+                        self._hot.move_to_end(key)
+                    self._counters["hot_hits"] += 1
+                return hot
+        loaded = await asyncio.to_thread(self._load, key)
+        with self._lock:
+            if loaded is None:
+                self._hot.pop(key, None)
+                self.memory.forget(key)
+                return None
+            session, app_state, user_state = loaded
+            current = self._hot.get(key)
+            if current is not None and current.pending:
+                return current  # Appended to while we were loading: ours is newer
+            self._app_state[key[0]] = app_state
+            self._user_state[key[:2]] = user_state
+            hot = _HotSession(session, session.last_update_time)
+            self._remember(key, hot)
+            self._counters["loads"] += 1
+            return hot
+
+    # ---- BaseSessionService ----
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        if state and self.blob_store is not None:
+            state = await self.blob_store.aexternalize(state)
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=copy.deepcopy(state) if state else {},
+            last_update_time=time.time(),
+        )
+        key = (app_name, user_id, session_id)
+
+        def insert() -> None:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT INTO sessions (app_name, user_id, id, state, last_update_time)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (*key, json.dumps(session.state, ensure_ascii=False), session.last_update_time),
+                )
+
+        try:
+            await asyncio.to_thread(insert)
+        except sqlite3.IntegrityError as exc:
+            raise ValueError(f"Session {session_id} already exists for {app_name}/{user_id}") from exc
+        with self._lock:
+            self._remember(key, _HotSession(session, session.last_update_time))
+            return self._copy(session)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        hot = await self._hot_session((app_name, user_id, session_id))
+        if hot is None:
+            return None
+        with self._lock:
+            events = hot.session.events
+            if config and config.num_recent_events:
+                events = events[-config.num_recent_events :]
+            if config and config.after_timestamp:
+                events = [e for e in events if e.timestamp >= config.after_timestamp]
+            self.memory.touch((app_name, user_id, session_id))
+            return self._copy(hot.session, events)
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        await self.flush()  # So the stored snapshots are current
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT id, state, last_update_time FROM sessions WHERE app_name = ? AND user_id = ?"
+            " ORDER BY id",
+            (app_name, user_id),
+        )
+        with self._lock:
+            sessions = [
+                self._copy(
+                    Session(
+                        app_name=app_name,
+                        user_id=user_id,
+                        id=session_id,
+                        state=json.loads(state),
+                        last_update_time=updated,
+                    ),
+                    [],
+                )
+                for session_id, state, updated in rows
+            ]
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        await self.flush()
+
+        def delete() -> None:
+            with self._db_lock:
+                self._db.execute("BEGIN IMMEDIATE")
+                self._db.execute(
+                    "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+                )
+                self._db.execute(
+                    "DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key
+                )
+                self._db.execute("COMMIT")
+
+        await asyncio.to_thread(delete)
+        with self._lock:
+            self._hot.pop(key, None)
+            self.memory.forget(key)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if self.blob_store is not None and not event.partial and event.actions.state_delta:
+            # Before anything sees the delta: the caller's copy, storage and the client.
+            event.actions.state_delta = await self.blob_store.aexternalize(event.actions.state_delta)
+        # Update the caller's copy first (the base class skips partial events).
+        await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+        session.last_update_time = event.timestamp
+
+        key = (session.app_name, session.user_id, session.id)
+        hot = await self._hot_session(key)
+        if hot is None:
+            logger.warning("Failed to append event to session %s: not found", session.id)
+            return event
+        body, delta_json = _event_row(event)
+        delta = event.actions.state_delta if event.actions else None
+        with self._lock:
+            stored = hot.session
+            for state_key, value in (delta or {}).items():
+                if state_key.startswith(State.APP_PREFIX):
+                    self._app_state.setdefault(key[0], {})[state_key.removeprefix(State.APP_PREFIX)] = value
+                    self._batch.app_states[key[0]] = json.dumps(self._app_state[key[0]], ensure_ascii=False)
+                elif state_key.startswith(State.USER_PREFIX):
+                    user_state = self._user_state.setdefault(key[:2], {})
+                    user_state[state_key.removeprefix(State.USER_PREFIX)] = value
+                    self._batch.user_states[key[:2]] = json.dumps(user_state, ensure_ascii=False)
+                if not state_key.startswith(State.TEMP_PREFIX):
+                    stored.state[state_key] = value
+            stored.events.append(event)
+            stored.last_update_time = event.timestamp
+            victims = self.memory.appended(key, stored, event)
+            self._trim(victims)
+            hot.pending += 1
+            self._batch.events.append((key, body, delta_json))
+            self._queued += 1
+            self._counters["appends"] += 1
+            queued = self._queued
+        self._ensure_flusher()
+        if queued >= self.batch_size and self._wake is not None:
+            self._wake.set()
+        return event
+
+    # ---- Write-behind ----
+
+    def _ensure_flusher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._flusher is not None and self._flusher.get_loop() is loop and not self._flusher.done():
+            return
+        if self._flusher is None or self._flusher.get_loop() is not loop:
+            # First append, or a new event loop (e.g. a second asyncio.run in scripts).
+            self._wake = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+        self._flusher = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Session flush to %s failed; will retry", self.path)
+
+    def _take_batch(self) -> tuple[_Batch, list[tuple[SessionKey, _HotSession, int]]]:
+        with self._lock:
+            batch, self._batch = self._batch, _Batch()
+            self._queued = 0
+            touched = {key for key, _, _ in batch.events}
+            flushed = []
+            for key in touched:
+                hot = self._hot.get(key)
+                if hot is not None:
+                    state = json.dumps(hot.session.state, ensure_ascii=False)
+                    batch.states[key] = (state, hot.session.last_update_time)
+                    flushed.append((key, hot, hot.pending))
+        return batch, flushed
+
+    async def flush(self) -> int:
+        """Write every queued event now; returns how many were written."""
+        async with self._flush_lock:
+            batch, flushed = self._take_batch()
+            if not batch.events:
+                return 0
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except Exception:
+                with self._lock:  # Put the batch back in front of newer appends
+                    newer = self._batch
+                    batch.events.extend(newer.events)
+                    batch.app_states.update(newer.app_states)
+                    batch.user_states.update(newer.user_states)
+                    batch.states.clear()
+                    self._batch = batch
+                    self._queued = len(batch.events)
+                raise
+            with self._lock:
+                for key, hot, count in flushed:
+                    hot.pending -= count
+                    hot.flushed_update_time = batch.states[key][1]
+                self._counters["flushes"] += 1
+                self._counters["flushed_events"] += len(batch.events)
+                self._trim()
+            return len(batch.events)
+
+    async def close(self) -> None:
+        """Flush what is queued and close the database."""
+        self._closed = True
+        flusher = self._flusher
+        if flusher is not None and not flusher.done() and flusher.get_loop() is asyncio.get_running_loop():
+            self._wake.set()
+            await flusher
+        await self.flush()
+        with self._db_lock:
+            self._db.close()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                **self._counters,
+                "queued": self._queued,
+                "hot_sessions": len(self._hot),
+                "hot_bytes": self.memory.total_bytes,
+            }
+
+    def memory_usage(self, app_name: Optional[str] = None) -> dict[str, dict[str, int]]:
+        return self.memory.usage(app_name)
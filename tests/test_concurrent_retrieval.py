@@ -0,0 +1,68 @@
+"""N simultaneous RAG tool calls must overlap, not queue on the event loop.
+
+The tools run on the uvicorn worker's event loop (one per `/agentic-rag`
+request). Against a stand-in whose every request takes `LATENCY`, N
+concurrent searches should finish in about one search latency (embedding +
+vector query), not N of them, and the loop must keep ticking meanwhile.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from agents.agrag import query_iax_docs_tool
+from benchmarks.standin_server import StandinServer
+from retrieval.registry import IAX_DOCS, IndexSpec, RetrieverRegistry
+
+LATENCY = 0.2
+REQUESTS = 8
+SEARCH_LATENCY = 2 * LATENCY  # One embeddings request + one vector query
+
+
+@pytest.fixture
+def standin_registry(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "standin")
+    monkeypatch.setenv("PINECONE_API_KEY", "standin")
+    with StandinServer(request_delay=LATENCY) as server:
+        registry = RetrieverRegistry(pool_size=REQUESTS * 2, embeddings_base_url=server.url)
+        registry.register(IndexSpec(name=IAX_DOCS.name, index_name=IAX_DOCS.index_name, host=server.url))
+        # Send raw strings: token-length checks would download the tiktoken encoding
+        registry.embeddings().inner.check_embedding_ctx_length = False
+        monkeypatch.setattr(query_iax_docs_tool, "retriever_registry", registry)
+        yield registry
+        registry.close()  # The test awaits aclose() on its own loop; this is for failures
+
+
+async def _heartbeat(stop: asyncio.Event, interval: float = 0.01) -> float:
+    worst_lag = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst_lag = max(worst_lag, time.perf_counter() - started - interval)
+    return worst_lag
+
+
+def test_concurrent_tool_calls_do_not_queue(standin_registry):
+    async def run() -> tuple[float, float, list]:
+        # One warm-up search so connection setup is not part of the measurement
+        await query_iax_docs_tool.query_iax_documentation_rag("calentamiento")
+        stop = asyncio.Event()
+        heartbeat = asyncio.create_task(_heartbeat(stop))
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(query_iax_docs_tool.query_iax_documentation_rag(f"pregunta {i}") for i in range(REQUESTS))
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        worst_lag = await heartbeat
+        await standin_registry.aclose()
+        return elapsed, worst_lag, results
+
+    elapsed, worst_lag, results = asyncio.run(run())
+
+    assert all(docs and "error_message" not in docs[0] for docs in results)
+    assert elapsed < 2 * SEARCH_LATENCY, f"{REQUESTS} searches took {elapsed:.2f}s; serial would be {REQUESTS * SEARCH_LATENCY:.2f}s"
+    assert worst_lag < LATENCY / 2, f"event loop stalled for {worst_lag:.2f}s"
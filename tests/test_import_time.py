@@ -0,0 +1,30 @@
+"""`import run_agents` must stay cheap: agents and their clients load lazily.
+
+Agents are imported on their endpoint's first request or by the background
+warm-up (see agui.agent_registry), so importing the app must not pull in any
+agent module, the retriever registry or the OpenAI / Pinecone clients.
+"""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "iax_agrag_agui_lab"
+HEAVY_MODULES = ("agents", "retrieval.registry", "langchain_openai", "pinecone")
+
+
+def test_import_run_agents_loads_no_agents_or_clients():
+    # A fresh interpreter: other tests import agents into this one
+    result = subprocess.run(
+        [sys.executable, "-c", "import json, sys, run_agents; print(json.dumps(sorted(sys.modules)))"],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = json.loads(result.stdout.strip().splitlines()[-1])
+    loaded = [m for m in modules if any(m == heavy or m.startswith(heavy + ".") for heavy in HEAVY_MODULES)]
+    assert loaded == []
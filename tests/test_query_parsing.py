@@ -0,0 +1,43 @@
+"""Query generator output -> search queries (`parse_generated_queries`).
+
+Each object in the generator's output must yield one query, its best
+`_QUERY_KEYS` value, whether or not the model wrote strict JSON.
+"""
+
+from __future__ import annotations
+
+from agents.agrag.retrieval_stage_agent import IncrementalQueryParser, parse_generated_queries
+
+# Exact shape of the Workana generator prompt (workana_rag_agent.py): unquoted keys
+WORKANA_OUTPUT = """{ queries: [{question: "¿Cómo cobro mis proyectos?", optmized_question: "cobrar pagos proyectos freelancer Workana" },
+{question: "¿Cuánto es la comisión?", optmized_question: "comisión Workana por proyecto" }]}"""
+
+
+def test_workana_unquoted_keys_yield_optimized_questions_only():
+    assert parse_generated_queries(WORKANA_OUTPUT) == [
+        "cobrar pagos proyectos freelancer Workana",
+        "comisión Workana por proyecto",
+    ]
+
+
+def test_strict_json_and_code_fence():
+    raw = '```json\n{"queries": [{"question": "q1", "optmized_question": "o1"}, {"query": "o2"}]}\n```'
+    assert parse_generated_queries(raw) == ["o1", "o2"]
+    assert parse_generated_queries('["a", "b", "a"]') == ["a", "b"]
+
+
+STREAMED_OUTPUTS = [
+    WORKANA_OUTPUT,
+    '```json\n["cómo \\"escalar\\" un agente", "caf\\u00e9 con \\\\ barra", "línea\\nnueva"]\n```',
+    '{"queries": [{"question": "¿Qué es \\u00abRAG\\u00bb?", "optmized_question": "definici\\u00f3n RAG"},'
+    ' {"question": "sin optimizar"}]}',
+]
+
+
+def test_streaming_parser_agrees_with_final_parse():
+    # PipelinedRetrievalStageAgent searches what the stream yields, then the final parse
+    for output in STREAMED_OUTPUTS:
+        for size in (1, 3, 7, len(output)):
+            parser = IncrementalQueryParser()
+            streamed = [q for i in range(0, len(output), size) for q in parser.feed(output[i : i + size])]
+            assert streamed == parse_generated_queries(output), (output, size)
@@ -0,0 +1,66 @@
+"""Cached answers must be the answer text, not its blob reference.
+
+With `AGUI_BLOB_STATE=true` a long final answer is swapped into the blob store
+when it is written to state, and state holds `blob:sha256:<digest>` instead.
+The semantic cache callbacks have to resolve it before storing, or a later hit
+replies with the reference.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from google.genai import types
+
+from agents.agrag import semantic_cache_callbacks as callbacks_module
+from retrieval.semantic_cache import SemanticAnswerCache
+from sessions.blob_store import BlobStore, blob_store
+
+QUESTION = "¿Cómo configuro el índice de IAX?"
+ANSWER = "Paso a paso para configurar el índice. " * 130  # ~5k chars
+FINAL_KEY = "final_response"
+
+
+class _Embeddings:
+    async def aembed_query(self, text: str) -> list[float]:
+        return [1.0, 0.0, 0.0, 0.0]
+
+
+class _Registry:
+    def spec(self, index: str) -> SimpleNamespace:
+        return SimpleNamespace(embedding_model="standin", dimensions=4)
+
+    def embeddings(self, model: str, dimensions: int) -> _Embeddings:
+        return _Embeddings()
+
+
+def _context(state: dict, invocation_id: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        user_content=types.Content(role="user", parts=[types.Part(text=QUESTION)]),
+        state=state,
+        invocation_id=invocation_id,
+    )
+
+
+def test_long_answer_in_blob_state_is_cached_as_text(monkeypatch, tmp_path):
+    monkeypatch.setattr(blob_store, "root", tmp_path)  # What resolve_state_value reads
+    monkeypatch.setattr(callbacks_module, "retriever_registry", _Registry())
+    store = BlobStore(tmp_path, min_chars=4096)
+    cache = SemanticAnswerCache(dimensions=4)
+    before, after = callbacks_module.semantic_cache_callbacks(
+        "iax", "iax", FINAL_KEY, cache=cache
+    )
+
+    async def run() -> types.Content:
+        state: dict = {}
+        assert await before(_context(state, "first")) is None  # Miss: the pipeline runs
+        # The session service externalizes the synthesizer's state delta
+        state.update(store.externalize({FINAL_KEY: ANSWER}))
+        assert state[FINAL_KEY].startswith("blob:sha256:")
+        await after(_context(state, "first"))
+        return await before(_context({}, "second"))
+
+    hit = asyncio.run(run())
+    assert hit is not None
+    assert hit.parts[0].text == ANSWER